@@ -1,21 +1,33 @@
 from PyQt5.QtWidgets import (
-    QFileDialog, QGraphicsScene, QGraphicsPixmapItem,
+    QFileDialog, QGraphicsScene, QGraphicsItem,
     QButtonGroup, QListWidgetItem,
-    QTableWidgetItem, QHeaderView, QMenu, QMessageBox, QDialog
+    QTableWidgetItem, QHeaderView, QMenu, QMessageBox, QDialog,
+    QProgressDialog, QApplication
 )
-from PyQt5.QtGui import QPixmap, QPen, QCursor
-from PyQt5.QtCore import Qt, QEvent, QObject, QSize
+from PyQt5.QtGui import QPen, QCursor
+from PyQt5.QtCore import Qt, QEvent, QObject, QSize, QTimer
 from Model.Proyecto import Proyecto
+from Model.Nodo import Nodo
+from Model.Ruta import Ruta
+from Model.LectorJSON import CargaCancelada
+from Model.GuardadoProyecto import HiloGuardado
+from Model.DiarioCambios import DiarioCambios
 from Model.ExportadorDB import ExportadorDB
 from Model.ExportadorCSV import ExportadorCSV 
+from Model.ImportadorDB import ImportadorDB
+from Model.ImportadorCSV import ImportadorCSV
 from Controller.mover_controller import MoverController
 from Controller.colocar_controller import ColocarController
 from Controller.ruta_controller import RutaController
 from View.view import NodoListItemWidget, RutaListItemWidget
 from View.node_item import NodoItem
+from View.route_item import RutaItem
+from View.grupo_nodos_item import GrupoNodosItem
+from View.mapa_item import HiloPiramideMapa, MapaItem, PiramideMapa
+from View.zoom_view import DETALLE_COMPLETO, DETALLE_LEJOS
 import ast
 import copy
-from Model.schema import NODO_FIELDS, OBJETIVO_FIELDS
+from Model.schema import CLAVES_PROPIEDADES_NODO, TIPOS_CAMPOS_NODO, normalizar_valor
 
 class EditorController(QObject):
     def __init__(self, view, proyecto=None):
@@ -26,6 +38,28 @@ class EditorController(QObject):
         # --- ESCALA GLOBAL: 1 píxel = 0.05 metros ---
         self.ESCALA = 0.05
 
+        # --- Consultas espaciales (índice espacial del proyecto) ---
+        self.RADIO_HIT_NODO = 25        # medio lado del boundingRect de NodoItem (size/2 + margen), en píxeles
+        self.RADIO_SNAP_METROS = 0.5    # distancia para enganchar a un nodo existente / avisar de solapes
+        self._items_por_id = {}         # nodo_id -> NodoItem en la escena
+
+        # --- Nivel de detalle: con el zoom lejano y muchos nodos se dibujan agrupados ---
+        self.UMBRAL_AGRUPAR_NODOS = 2000
+        self._grupo_nodos = None        # GrupoNodosItem de la escena (se crea al necesitarlo)
+        self._nodos_agrupados = False   # los NodoItem no tienen contenido propio (ItemHasNoContents)
+
+        # --- Guardado en segundo plano y autoguardado ---
+        self.ruta_proyecto = None        # archivo del proyecto abierto/guardado (None si no tiene)
+        self.diario = None               # DiarioCambios del proyecto actual
+        self._hilo_guardado = None
+        self._secuencia_guardado = None
+        self._guardado_pendiente = None  # ruta a guardar cuando termine el guardado en curso
+
+        # --- Carga del mapa en segundo plano ---
+        self._mapa_item = None           # MapaItem del fondo (None sin mapa)
+        self._hilo_mapa = None           # HiloPiramideMapa en curso
+        self._hilos_mapa = []            # HiloPiramideMapa sin terminar (incluidos los cancelados)
+
         # --- NUEVO: Estado del cursor ---
         self._cursor_sobre_nodo = False
         self._arrastrando_nodo = False  # Para rastrear si estamos arrastrando un nodo
@@ -60,6 +94,12 @@ class EditorController(QObject):
         exportar_csv_action = self.view.menuProyecto.addAction("Exportar a CSV...")
         exportar_csv_action.triggered.connect(self.exportar_a_csv)
 
+        # --- Importar lo exportado (bases de datos de los vehículos) ---
+        importar_sqlite_action = self.view.menuProyecto.addAction("Importar desde SQLite...")
+        importar_sqlite_action.triggered.connect(lambda: self.importar_proyecto(ImportadorDB))
+        importar_csv_action = self.view.menuProyecto.addAction("Importar desde CSV...")
+        importar_csv_action.triggered.connect(lambda: self.importar_proyecto(ImportadorCSV))
+
         nuevo_action.triggered.connect(self.nuevo_proyecto)
         abrir_action.triggered.connect(self.abrir_proyecto)
         guardar_action.triggered.connect(self.guardar_proyecto)
@@ -123,6 +163,11 @@ class EditorController(QObject):
         self._route_lines = []            
         self._highlight_lines = []        
 
+        try:
+            self.view.marco_trabajo.nivel_detalle_cambiado.connect(self._actualizar_agrupacion_nodos)
+        except Exception:
+            pass
+
         # instalar filtro de eventos en el viewport
         try:
             self.view.marco_trabajo.viewport().installEventFilter(self)
@@ -132,6 +177,11 @@ class EditorController(QObject):
         # Instalar filtro de eventos en la ventana principal para manejo de teclado
         self.view.installEventFilter(self)
 
+        # Al salir se espera a los hilos en curso: destruir un QThread en marcha aborta el proceso
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._al_salir)
+
         if hasattr(self.view, "rutasList"):
             try:
                 self.view.rutasList.itemSelectionChanged.disconnect(self.seleccionar_ruta_desde_lista)
@@ -153,7 +203,7 @@ class EditorController(QObject):
         # --- SISTEMA DE VISIBILIDAD MEJORADO CON RECONSTRUCCIÓN DE RUTAS ---
         self.visibilidad_nodos = {}  # {nodo_id: visible} - Para UI
         self.visibilidad_rutas = {}  # {ruta_index: visible} - Para líneas
-        self.nodo_en_rutas = {}  # {nodo_id: [ruta_index1, ...]} - Relaciones originales
+        # Las relaciones nodo -> rutas las mantiene el índice inverso del proyecto
         
         # Rutas reconstruidas para dibujo (excluyendo nodos ocultos)
         self.rutas_para_dibujo = []  # Lista de rutas reconstruidas para dibujar
@@ -198,9 +248,8 @@ class EditorController(QObject):
             rutas_despues = []
             for idx, ruta in enumerate(self.proyecto.rutas):
                 try:
-                    # Copia profunda de la ruta
-                    ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                    rutas_despues.append(copy.deepcopy(ruta_dict))
+                    # Copia de la secuencia de IDs de la ruta
+                    rutas_despues.append(ruta.copia())
                 except Exception as e:
                     print(f"Error copiando ruta {idx} para historial: {e}")
                     rutas_despues.append(None)
@@ -208,7 +257,6 @@ class EditorController(QObject):
             # 2. Estado de visibilidad después de la eliminación
             visibilidad_nodos_despues = copy.deepcopy(self.visibilidad_nodos)
             visibilidad_rutas_despues = copy.deepcopy(self.visibilidad_rutas)
-            nodo_en_rutas_despues = copy.deepcopy(self.nodo_en_rutas)
             
             # Crear entrada del historial para eliminación
             eliminacion = {
@@ -218,7 +266,6 @@ class EditorController(QObject):
                 'rutas_despues': rutas_despues,       # Para rehacer (estado después)
                 'visibilidad_nodos_despues': visibilidad_nodos_despues,
                 'visibilidad_rutas_despues': visibilidad_rutas_despues,
-                'nodo_en_rutas_despues': nodo_en_rutas_despues,
                 'descripcion': f"Eliminación de nodo ID {nodo_copia.get('id')}"
             }
             
@@ -405,7 +452,14 @@ class EditorController(QObject):
     def _limpiar_ui_completa(self):
         """Limpia toda la UI para nuevo proyecto"""
         # Limpiar escena
+        self._cancelar_carga_mapa()
         self.scene.clear()
+        self._mapa_item = None
+        self._items_por_id.clear()
+        self._route_lines = []
+        self._highlight_lines = []
+        self._grupo_nodos = None
+        self._nodos_agrupados = False
         
         # Limpiar listas
         self.view.nodosList.clear()
@@ -433,7 +487,6 @@ class EditorController(QObject):
         # Limpiar visibilidad
         self.visibilidad_nodos.clear()
         self.visibilidad_rutas.clear()
-        self.nodo_en_rutas.clear()
         
         # Resetear textos y estados de botones de visibilidad
         if hasattr(self.view, "btnOcultarTodo"):
@@ -461,7 +514,7 @@ class EditorController(QObject):
             if not hasattr(self.proyecto, 'parametros'):
                 self.proyecto.parametros = {}
             
-            self.proyecto.parametros = nuevos_parametros
+            self.proyecto.actualizar_parametros(nuevos_parametros)
             
             print("Parámetros guardados:", nuevos_parametros)
             QMessageBox.information(self.view, "Parámetros", 
@@ -483,7 +536,7 @@ class EditorController(QObject):
             if not hasattr(self.proyecto, 'parametros_playa'):
                 self.proyecto.parametros_playa = {}
             
-            self.proyecto.parametros_playa = nuevos_parametros
+            self.proyecto.actualizar_parametros_playa(nuevos_parametros)
             
             print("Parámetros de playa guardados:", nuevos_parametros)
             QMessageBox.information(self.view, "Parámetros Playa", 
@@ -505,7 +558,7 @@ class EditorController(QObject):
             if not hasattr(self.proyecto, 'parametros_carga_descarga'):
                 self.proyecto.parametros_carga_descarga = {}
             
-            self.proyecto.parametros_carga_descarga = nuevos_parametros
+            self.proyecto.actualizar_parametros_carga_descarga(nuevos_parametros)
             
             print("Parámetros de carga/descarga guardados:", nuevos_parametros)
             QMessageBox.information(self.view, "Parámetros Carga/Descarga", 
@@ -768,10 +821,7 @@ class EditorController(QObject):
                 if reply == QMessageBox.Yes:
                     print(f"✓ Eliminando nodo ID {nodo_id}")
                     # Buscar el NodoItem en la escena
-                    for item in self.scene.items():
-                        if isinstance(item, NodoItem) and item.nodo.get('id') == nodo_id:
-                            nodo_item_a_eliminar = item
-                            break
+                    nodo_item_a_eliminar = self.obtener_item_nodo(nodo_id)
                     if nodo_item_a_eliminar:
                         self.eliminar_nodo(nodo_a_eliminar, nodo_item_a_eliminar)
                 else:
@@ -988,10 +1038,7 @@ class EditorController(QObject):
             
             # Si no está en la escena, buscar en el proyecto
             if not nodo_en_proyecto:
-                for n in self.proyecto.nodos:
-                    if n.get('id') == nodo_id:
-                        nodo_en_proyecto = n
-                        break
+                nodo_en_proyecto = self.proyecto.obtener_nodo(nodo_id)
             
             # Eliminar el nodo (sin registrar en historial)
             if nodo_en_proyecto:
@@ -1037,25 +1084,21 @@ class EditorController(QObject):
             print(f"Rehaciendo creación: Nodo ID {nodo_id} en ({x}, {y})")
             
             # Verificar si el nodo ya existe (no debería, pero por seguridad)
-            nodo_existente = None
-            for n in self.proyecto.nodos:
-                if n.get('id') == nodo_id:
-                    nodo_existente = n
-                    break
+            nodo_existente = self.proyecto.obtener_nodo(nodo_id)
             
             if nodo_existente:
                 print(f"Nodo ID {nodo_id} ya existe, no es necesario recrearlo")
             else:
                 # Crear nuevo nodo en el proyecto (sin registrar en historial)
-                nuevo_nodo = {
+                nuevo_nodo = Nodo({
                     "id": nodo_id,
                     "X": x,
                     "Y": y,
                     "objetivo": objetivo,
                     "es_cargador": es_cargador,
                     "A": angulo
-                }
-                self.proyecto.nodos.append(nuevo_nodo)
+                })
+                self.proyecto.insertar_nodo(nuevo_nodo)
                 
                 # Crear NodoItem visual
                 nodo_item = self._create_nodo_item(nuevo_nodo)
@@ -1227,96 +1270,98 @@ class EditorController(QObject):
         finally:
             self._ejecutando_deshacer_rehacer = False
 
+    def _parsear_ids_ruta(self, texto):
+        """Convierte un texto "[1, 2, 3]" o "1, 2, 3" en una lista de IDs enteros"""
+        texto = (texto or "").strip()
+        if texto.startswith('[') and texto.endswith(']'):
+            texto = texto[1:-1]
+
+        ids = []
+        for id_str in texto.split(','):
+            id_str = id_str.strip()
+            if not id_str:
+                continue
+            try:
+                ids.append(int(id_str))
+            except ValueError:
+                print(f"Error: ID de ruta debe ser número entero: {id_str}")
+        return ids
+
+    def _aplicar_propiedad_ruta(self, ruta, propiedad, valor):
+        """
+        Aplica un valor (en formato texto) a una propiedad de la ruta.
+        La ruta solo guarda IDs, así que basta con modificar la secuencia.
+        Lanza ValueError si el ID de origen/destino no es un entero.
+        """
+        if propiedad == "nombre":
+            ruta.nombre = valor
+            return
+
+        ids = ruta.ids()
+        if propiedad == "origen":
+            nuevo_id = int(valor)
+            if ids:
+                ids[0] = nuevo_id
+            else:
+                ids = [nuevo_id]
+        elif propiedad == "destino":
+            nuevo_id = int(valor)
+            if len(ids) > 1:
+                ids[-1] = nuevo_id
+            else:
+                # Si solo hay un elemento, agregar el destino
+                ids.append(nuevo_id)
+        elif propiedad == "visita":
+            visita = self._parsear_ids_ruta(valor)
+            ids = ids[:1] + visita + ids[-1:] if len(ids) > 1 else ids + visita
+        elif propiedad == "ruta completa":
+            ids = self._parsear_ids_ruta(valor)
+        else:
+            return
+
+        ruta.set_ids(ids)
+
     def _deshacer_cambio_propiedad_ruta(self, accion):
         """Deshace un cambio de propiedad de ruta"""
         try:
             self._ejecutando_deshacer_rehacer = True
-            
+
             ruta_idx = accion['ruta_idx']
             propiedad = accion['propiedad']
             valor_anterior = accion['valor_anterior']
-            
+
             print(f"Deshaciendo cambio: Ruta {ruta_idx}.{propiedad} = {valor_anterior}")
-            
+
             # Verificar que existe la ruta
             if ruta_idx >= len(self.proyecto.rutas):
                 print(f"Error: Ruta {ruta_idx} no encontrada")
                 self._ejecutando_deshacer_rehacer = False
                 return
-            
+
             ruta = self.proyecto.rutas[ruta_idx]
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-            
+
             # Aplicar el valor anterior según la propiedad
-            if propiedad == "nombre":
-                ruta_dict["nombre"] = valor_anterior
-            elif propiedad == "origen":
-                try:
-                    origen_id = int(valor_anterior)
-                    nodo_existente = next((n for n in self.proyecto.nodos 
-                                        if self._obtener_id_nodo(n) == origen_id), None)
-                    if nodo_existente:
-                        ruta_dict["origen"] = nodo_existente
-                    else:
-                        ruta_dict["origen"] = {"id": origen_id, "X": 0, "Y": 0}
-                except ValueError:
-                    print(f"Error: ID de origen inválido: {valor_anterior}")
-            elif propiedad == "destino":
-                try:
-                    destino_id = int(valor_anterior)
-                    nodo_existente = next((n for n in self.proyecto.nodos 
-                                        if self._obtener_id_nodo(n) == destino_id), None)
-                    if nodo_existente:
-                        ruta_dict["destino"] = nodo_existente
-                    else:
-                        ruta_dict["destino"] = {"id": destino_id, "X": 0, "Y": 0}
-                except ValueError:
-                    print(f"Error: ID de destino inválido: {valor_anterior}")
-            elif propiedad == "visita":
-                try:
-                    # Parsear lista de IDs
-                    if valor_anterior.startswith('[') and valor_anterior.endswith(']'):
-                        valor_anterior = valor_anterior[1:-1]
-                    
-                    ids_texto = [id_str.strip() for id_str in valor_anterior.split(',')] if valor_anterior else []
-                    nueva_visita = []
-                    
-                    for id_str in ids_texto:
-                        if id_str:
-                            try:
-                                nodo_id = int(id_str)
-                                nodo_existente = next((n for n in self.proyecto.nodos 
-                                                    if self._obtener_id_nodo(n) == nodo_id), None)
-                                if nodo_existente:
-                                    nueva_visita.append(nodo_existente)
-                                else:
-                                    nueva_visita.append({"id": nodo_id, "X": 0, "Y": 0})
-                            except ValueError:
-                                pass
-                    
-                    ruta_dict["visita"] = nueva_visita
-                except Exception as e:
-                    print(f"Error procesando visita: {e}")
-            
-            # Actualizar la ruta en el proyecto
-            self.proyecto.actualizar_ruta(ruta_idx, ruta_dict)
-            
+            try:
+                self._aplicar_propiedad_ruta(ruta, propiedad, valor_anterior)
+            except ValueError:
+                print(f"Error: ID de {propiedad} inválido: {valor_anterior}")
+
+            # Actualizar la ruta en el proyecto (reindexa sus nodos)
+            self.proyecto.actualizar_ruta(ruta_idx, ruta)
+
             # Actualizar UI
             self._actualizar_widget_ruta_en_lista(ruta_idx)
             self._dibujar_rutas()
-            
+
             # Si esta ruta está seleccionada, actualizar propiedades
             if self.ruta_actual_idx == ruta_idx:
                 self.mostrar_propiedades_ruta(ruta)
-            
+
             # Decrementar índice del historial
             self.indice_historial -= 1
-            
+
             print(f"✓ Cambio deshecho: Ruta {ruta_idx}.{propiedad}")
-            
+
         except Exception as e:
             print(f"Error deshaciendo cambio de propiedad de ruta: {e}")
         finally:
@@ -1326,89 +1371,40 @@ class EditorController(QObject):
         """Rehace un cambio de propiedad de ruta"""
         try:
             self._ejecutando_deshacer_rehacer = True
-            
+
             ruta_idx = accion['ruta_idx']
             propiedad = accion['propiedad']
             valor_nuevo = accion['valor_nuevo']
-            
+
             print(f"Rehaciendo cambio: Ruta {ruta_idx}.{propiedad} = {valor_nuevo}")
-            
+
             # Verificar que existe la ruta
             if ruta_idx >= len(self.proyecto.rutas):
                 print(f"Error: Ruta {ruta_idx} no encontrada")
                 self._ejecutando_deshacer_rehacer = False
                 return
-            
+
             ruta = self.proyecto.rutas[ruta_idx]
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-            
+
             # Aplicar el valor nuevo según la propiedad
-            if propiedad == "nombre":
-                ruta_dict["nombre"] = valor_nuevo
-            elif propiedad == "origen":
-                try:
-                    origen_id = int(valor_nuevo)
-                    nodo_existente = next((n for n in self.proyecto.nodos 
-                                        if self._obtener_id_nodo(n) == origen_id), None)
-                    if nodo_existente:
-                        ruta_dict["origen"] = nodo_existente
-                    else:
-                        ruta_dict["origen"] = {"id": origen_id, "X": 0, "Y": 0}
-                except ValueError:
-                    print(f"Error: ID de origen inválido: {valor_nuevo}")
-            elif propiedad == "destino":
-                try:
-                    destino_id = int(valor_nuevo)
-                    nodo_existente = next((n for n in self.proyecto.nodos 
-                                        if self._obtener_id_nodo(n) == destino_id), None)
-                    if nodo_existente:
-                        ruta_dict["destino"] = nodo_existente
-                    else:
-                        ruta_dict["destino"] = {"id": destino_id, "X": 0, "Y": 0}
-                except ValueError:
-                    print(f"Error: ID de destino inválido: {valor_nuevo}")
-            elif propiedad == "visita":
-                try:
-                    # Parsear lista de IDs
-                    if valor_nuevo.startswith('[') and valor_nuevo.endswith(']'):
-                        valor_nuevo = valor_nuevo[1:-1]
-                    
-                    ids_texto = [id_str.strip() for id_str in valor_nuevo.split(',')] if valor_nuevo else []
-                    nueva_visita = []
-                    
-                    for id_str in ids_texto:
-                        if id_str:
-                            try:
-                                nodo_id = int(id_str)
-                                nodo_existente = next((n for n in self.proyecto.nodos 
-                                                    if self._obtener_id_nodo(n) == nodo_id), None)
-                                if nodo_existente:
-                                    nueva_visita.append(nodo_existente)
-                                else:
-                                    nueva_visita.append({"id": nodo_id, "X": 0, "Y": 0})
-                            except ValueError:
-                                pass
-                    
-                    ruta_dict["visita"] = nueva_visita
-                except Exception as e:
-                    print(f"Error procesando visita: {e}")
-            
-            # Actualizar la ruta en el proyecto
-            self.proyecto.actualizar_ruta(ruta_idx, ruta_dict)
-            
+            try:
+                self._aplicar_propiedad_ruta(ruta, propiedad, valor_nuevo)
+            except ValueError:
+                print(f"Error: ID de {propiedad} inválido: {valor_nuevo}")
+
+            # Actualizar la ruta en el proyecto (reindexa sus nodos)
+            self.proyecto.actualizar_ruta(ruta_idx, ruta)
+
             # Actualizar UI
             self._actualizar_widget_ruta_en_lista(ruta_idx)
             self._dibujar_rutas()
-            
+
             # Si esta ruta está seleccionada, actualizar propiedades
             if self.ruta_actual_idx == ruta_idx:
                 self.mostrar_propiedades_ruta(ruta)
-            
+
             print(f"✓ Cambio rehecho: Ruta {ruta_idx}.{propiedad}")
-            
+
         except Exception as e:
             print(f"Error rehaciendo cambio de propiedad de ruta: {e}")
         finally:
@@ -1458,6 +1454,9 @@ class EditorController(QObject):
                 self.movimiento_actual = None
                 return
             
+            # Avisar si el nodo ha quedado encima de otros
+            self._advertir_solapamientos(nodo_item.nodo)
+            
             # Si estamos en medio del historial (por deshacer previo), eliminar movimientos futuros
             if self.indice_historial < len(self.historial_movimientos) - 1:
                 self.historial_movimientos = self.historial_movimientos[:self.indice_historial + 1]
@@ -1547,13 +1546,8 @@ class EditorController(QObject):
                     # Mover el nodo a la posición anterior
                     item.setPos(x_anterior - item.size / 2, y_anterior - item.size / 2)
                     
-                    # Actualizar el modelo
-                    if isinstance(item.nodo, dict):
-                        item.nodo["X"] = x_anterior
-                        item.nodo["Y"] = y_anterior
-                    else:
-                        setattr(item.nodo, "X", x_anterior)
-                        setattr(item.nodo, "Y", y_anterior)
+                    # Actualizar el modelo (y el índice espacial)
+                    self.proyecto.mover_nodo(item.nodo, x_anterior, y_anterior)
                     
                     # Actualizar UI
                     self.actualizar_lista_nodo(item.nodo)
@@ -1585,7 +1579,7 @@ class EditorController(QObject):
             print(f"Deshaciendo eliminación: Nodo ID {nodo_id}")
             
             # 1) Restaurar el nodo en el proyecto
-            self.proyecto.nodos.append(nodo)
+            self.proyecto.insertar_nodo(nodo)
             
             # 2) Restaurar las rutas afectadas a su estado original
             for ruta_info in rutas_afectadas:
@@ -1593,30 +1587,13 @@ class EditorController(QObject):
                 ruta_original = ruta_info['ruta_original']
                 
                 if ruta_idx < len(self.proyecto.rutas):
-                    self.proyecto.rutas[ruta_idx] = ruta_original
+                    self.proyecto.reemplazar_ruta(ruta_idx, Ruta.desde_dict(ruta_original))
                 else:
-                    self.proyecto.rutas.append(ruta_original)
+                    self.proyecto.insertar_ruta(Ruta.desde_dict(ruta_original))
             
-            # 3) Restaurar visibilidad y relaciones (usar estado del momento actual)
+            # 3) Restaurar visibilidad (las relaciones nodo-ruta las repone el proyecto)
             self.visibilidad_nodos[nodo_id] = True
             
-            # Reconstruir relaciones para este nodo
-            if nodo_id not in self.nodo_en_rutas:
-                self.nodo_en_rutas[nodo_id] = []
-            
-            # Buscar en qué rutas está este nodo
-            for idx, ruta in enumerate(self.proyecto.rutas):
-                try:
-                    ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                    self._normalize_route_nodes(ruta_dict)
-                    
-                    # Verificar si la ruta contiene el nodo
-                    if self._ruta_contiene_nodo(ruta_dict, nodo_id):
-                        if idx not in self.nodo_en_rutas[nodo_id]:
-                            self.nodo_en_rutas[nodo_id].append(idx)
-                except Exception as e:
-                    print(f"Error verificando ruta {idx}: {e}")
-            
             # 4) Crear y añadir el NodoItem visual a la escena
             nodo_item = self._create_nodo_item(nodo)
             
@@ -1653,24 +1630,18 @@ class EditorController(QObject):
                 pass
             
             # 2) Quitar del modelo
-            for i, n in enumerate(self.proyecto.nodos):
-                if n.get("id") == nodo_id:
-                    self.proyecto.nodos.pop(i)
-                    break
+            self.proyecto.eliminar_nodo(nodo_id)
             
-            # 3) Eliminar de visibilidad y relaciones
+            # 3) Eliminar de visibilidad y del mapa de items
             if nodo_id in self.visibilidad_nodos:
                 del self.visibilidad_nodos[nodo_id]
-            if nodo_id in self.nodo_en_rutas:
-                del self.nodo_en_rutas[nodo_id]
+            if self._items_por_id.get(nodo_id) is nodo_item:
+                del self._items_por_id[nodo_id]
             
-            # 4) Reconfigurar rutas
+            # 4) Reconfigurar rutas (el índice inverso se actualiza en el proyecto)
             self._reconfigurar_rutas_por_eliminacion(nodo_id)
             
-            # 5) IMPORTANTE: Reconstruir relaciones de TODAS las rutas después de la eliminación
-            self._actualizar_todas_relaciones_nodo_ruta()
-            
-            # 6) Actualizar UI
+            # 5) Actualizar UI
             self._actualizar_lista_nodos_con_widgets()
             self._dibujar_rutas()
             self._actualizar_lista_rutas_con_widgets()
@@ -1691,19 +1662,15 @@ class EditorController(QObject):
             
             print(f"Rehaciendo eliminación: Nodo ID {nodo_id}")
             
-            # 1) RESTAURAR ESTADO COMPLETO DE LAS RUTAS
-            self.proyecto.rutas = []
-            for ruta_dict in rutas_despues:
-                if ruta_dict is not None:
-                    self.proyecto.rutas.append(ruta_dict)
+            # 1) RESTAURAR ESTADO COMPLETO DE LAS RUTAS (reconstruye el índice inverso)
+            self.proyecto.rutas = [Ruta.desde_dict(ruta) for ruta in rutas_despues if ruta is not None]
             
             # 2) RESTAURAR ESTADO COMPLETO DE VISIBILIDAD
             self.visibilidad_nodos = eliminacion.get('visibilidad_nodos_despues', {})
             self.visibilidad_rutas = eliminacion.get('visibilidad_rutas_despues', {})
-            self.nodo_en_rutas = eliminacion.get('nodo_en_rutas_despues', {})
             
             # 3) ACTUALIZAR NODOS DEL PROYECTO (eliminar el nodo reinsertado)
-            self.proyecto.nodos = [n for n in self.proyecto.nodos if n.get('id') != nodo_id]
+            self.proyecto.eliminar_nodo(nodo_id)
             
             # 4) ELIMINAR NODOITEM DE LA ESCENA
             nodo_item_a_eliminar = None
@@ -1752,13 +1719,8 @@ class EditorController(QObject):
                     # Mover el nodo a la nueva posición
                     item.setPos(x_nueva - item.size / 2, y_nueva - item.size / 2)
                     
-                    # Actualizar el modelo
-                    if isinstance(item.nodo, dict):
-                        item.nodo["X"] = x_nueva
-                        item.nodo["Y"] = y_nueva
-                    else:
-                        setattr(item.nodo, "X", x_nueva)
-                        setattr(item.nodo, "Y", y_nueva)
+                    # Actualizar el modelo (y el índice espacial)
+                    self.proyecto.mover_nodo(item.nodo, x_nueva, y_nueva)
                     
                     # Actualizar UI
                     self.actualizar_lista_nodo(item.nodo)
@@ -1810,28 +1772,6 @@ class EditorController(QObject):
             if self.indice_historial > 0:
                 self.indice_historial -= 1
 
-    def _ruta_contiene_nodo(self, ruta_dict, nodo_id):
-        """Verifica si una ruta contiene un nodo específico"""
-        try:
-            # Origen
-            origen = ruta_dict.get("origen")
-            if origen and isinstance(origen, dict) and origen.get('id') == nodo_id:
-                return True
-            
-            # Destino
-            destino = ruta_dict.get("destino")
-            if destino and isinstance(destino, dict) and destino.get('id') == nodo_id:
-                return True
-            
-            # Visita
-            for nodo_visita in ruta_dict.get("visita", []):
-                if isinstance(nodo_visita, dict) and nodo_visita.get('id') == nodo_id:
-                    return True
-            
-            return False
-        except Exception:
-            return False
-
     # --- FUNCIONES DE PROYECTO ---
     
     def nuevo_proyecto(self):
@@ -1841,11 +1781,23 @@ class EditorController(QObject):
         if not ruta_mapa:
             return
         
+        # Un proyecto sin título anterior que no se llegó a guardar se puede recuperar
+        if self._preguntar_recuperacion(None):
+            # El diario recuperado pasa a ser el sin título de esta sesión
+            if self.diario is not None:
+                self.diario.cerrar()
+                self.diario = None
+            self._cargar_proyecto_en_editor(DiarioCambios.recuperar(None), None, recuperado=True)
+            return
+        
         # Crear nuevo proyecto
         self.proyecto = Proyecto(ruta_mapa)
+        self.ruta_proyecto = None
         
         # Actualizar referencias en TODOS los subcontroladores
         self._actualizar_referencias_proyecto(self.proyecto)
+        # Instantánea inicial para poder recuperar el mapa del proyecto sin título
+        self._iniciar_diario(compactar=True, vaciar=True)
         
         # Limpiar UI (esto también limpia el historial)
         self._limpiar_ui_completa()
@@ -1864,13 +1816,83 @@ class EditorController(QObject):
 
     def abrir_proyecto(self):
         ruta_archivo, _ = QFileDialog.getOpenFileName(
-            self.view, "Abrir proyecto", "", "JSON Files (*.json)"
+            self.view, "Abrir proyecto", "",
+            "Proyectos (*.json *.sqlite);;JSON Files (*.json);;Proyecto SQLite (*.sqlite)"
         )
         if not ruta_archivo:
             return
         try:
-            # Cargar proyecto
-            self.proyecto = Proyecto.cargar(ruta_archivo)
+            # Cambios sin guardar de una sesión anterior que terminó de forma inesperada
+            if self._preguntar_recuperacion(ruta_archivo):
+                self._cargar_proyecto_en_editor(DiarioCambios.recuperar(ruta_archivo), ruta_archivo, recuperado=True)
+                return
+
+            # Cargar proyecto (lectura incremental con progreso y opción de cancelar)
+            dialogo = QProgressDialog("Cargando proyecto...", "Cancelar", 0, 100, self.view)
+            dialogo.setWindowTitle("Abrir proyecto")
+            dialogo.setWindowModality(Qt.WindowModal)
+            dialogo.setMinimumDuration(500)
+
+            def progreso(leidos, total):
+                if total:
+                    dialogo.setValue(min(99, int(leidos * 100 / total)))
+                QApplication.processEvents()
+                return not dialogo.wasCanceled()
+
+            try:
+                proyecto = Proyecto.cargar(ruta_archivo, progreso)
+            except CargaCancelada:
+                print("✗ Carga del proyecto cancelada por el usuario")
+                return
+            finally:
+                dialogo.close()
+            self._cargar_proyecto_en_editor(proyecto, ruta_archivo)
+        except Exception as err:
+            print("✗ Error al abrir proyecto:", err)
+
+    def _preguntar_recuperacion(self, ruta_archivo):
+        """
+        Si hay un diario de autoguardado pendiente para el proyecto, pregunta
+        si se recupera. Devuelve True si hay que recuperarlo; si no, lo descarta.
+        """
+        if not DiarioCambios.hay_recuperacion(ruta_archivo):
+            return False
+        nombre = ruta_archivo or "el proyecto sin título"
+        respuesta = QMessageBox.question(
+            self.view, "Recuperar cambios",
+            f"Se han encontrado cambios sin guardar de una sesión anterior en {nombre}.\n\n"
+            "¿Quieres recuperarlos?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        if respuesta == QMessageBox.Yes:
+            return True
+        DiarioCambios.descartar_recuperacion(ruta_archivo)
+        print("✓ Autoguardado anterior descartado")
+        return False
+
+    def _iniciar_diario(self, compactar=False, vaciar=False):
+        """
+        Sustituye el diario de autoguardado por uno para el proyecto y ruta
+        actuales. Con vaciar=True se empieza sin las entradas que ya hubiera
+        (p. ej. las del proyecto sin título anterior de esta sesión).
+        """
+        if self.diario is not None:
+            self.diario.cerrar()
+            self.diario = None
+        try:
+            if vaciar:
+                DiarioCambios.descartar(self.ruta_proyecto)
+            self.diario = DiarioCambios(self.proyecto, self.ruta_proyecto, self)
+            if compactar:
+                self.diario.compactar()
+        except Exception as err:
+            print("✗ No se pudo iniciar el autoguardado:", err)
+
+    def _cargar_proyecto_en_editor(self, proyecto, ruta_archivo, recuperado=False):
+        """Muestra en el editor un proyecto ya cargado (abierto o recuperado)."""
+        try:
+            self.proyecto = proyecto
+            self.ruta_proyecto = ruta_archivo
             
             # Asegurarse de que todos los nodos tengan campo "objetivo"
             for nodo in self.proyecto.nodos:
@@ -1882,6 +1904,10 @@ class EditorController(QObject):
             
             # Usar el mismo método para actualizar referencias
             self._actualizar_referencias_proyecto(self.proyecto)
+            # Autoguardado: tras una recuperación (o sin archivo del que partir,
+            # como en un proyecto importado) se parte de una instantánea nueva
+            self._iniciar_diario(compactar=recuperado or ruta_archivo is None,
+                                 vaciar=ruta_archivo is None and not recuperado)
             
             # Limpiar UI primero (esto también limpia el historial)
             self._limpiar_ui_completa()
@@ -1915,42 +1941,182 @@ class EditorController(QObject):
             
             # Actualizar listas con widgets
             self._actualizar_lista_nodos_con_widgets()
+
+            # Las rutas se dibujan tras pintar los nodos: en un contenedor SQLite
+            # es entonces cuando se leen del archivo
+            QTimer.singleShot(0, lambda: self._completar_apertura_proyecto(ruta_archivo))
+        except Exception as err:
+            print("✗ Error al mostrar el proyecto:", err)
+
+    def _completar_apertura_proyecto(self, ruta_archivo):
+        """Segunda fase de abrir_proyecto: rutas, diagnóstico y avisos."""
+        try:
             self._dibujar_rutas()
             self._mostrar_rutas_lateral()
+            self._actualizar_agrupacion_nodos()
 
-            print("✓ Proyecto cargado desde:", ruta_archivo)
+            print("✓ Proyecto cargado desde:", ruta_archivo or "autoguardado")
             self.diagnosticar_estado_proyecto()
+
+            # Avisar de nodos superpuestos en el proyecto cargado
+            solapes = self.proyecto.nodos_superpuestos(self.metros_a_pixeles(self.RADIO_SNAP_METROS))
+            if solapes:
+                print(f"⚠ {len(solapes)} pares de nodos a menos de {self.RADIO_SNAP_METROS} m entre sí")
         except Exception as err:
-            print("✗ Error al abrir proyecto:", err)
+            print("✗ Error al completar la apertura del proyecto:", err)
 
     def guardar_proyecto(self):
         if not self.proyecto:
             print("No hay proyecto cargado para guardar")
             return
-        ruta_archivo, _ = QFileDialog.getSaveFileName(
-            self.view, "Guardar proyecto", "", "JSON Files (*.json)"
+        ruta_archivo, filtro = QFileDialog.getSaveFileName(
+            self.view, "Guardar proyecto", "", "JSON Files (*.json);;Proyecto SQLite (*.sqlite)"
         )
         if not ruta_archivo:
             return
-        if not ruta_archivo.lower().endswith(".json"):
-            ruta_archivo += ".json"
+        if not ruta_archivo.lower().endswith((".json", ".sqlite")):
+            ruta_archivo += ".sqlite" if "sqlite" in filtro else ".json"
+        self._guardar_en_segundo_plano(ruta_archivo)
+
+    def _guardar_en_segundo_plano(self, ruta_archivo):
+        """
+        Toma una instantánea del proyecto y la escribe en un hilo aparte
+        (temporal + renombrado atómico). Si ya hay un guardado en curso, se
+        repite al terminar con una instantánea nueva.
+        """
+        if self._hilo_guardado is not None and self._hilo_guardado.isRunning():
+            self._guardado_pendiente = ruta_archivo
+            print("⚠ Guardado en curso; se volverá a guardar al terminar")
+            return
         try:
-            # El método guardar() de Proyecto ahora guarda rutas simplificadas (solo IDs)
-            self.proyecto.guardar(ruta_archivo)
-            print("✓ Proyecto guardado en:", ruta_archivo)
+            datos = self.proyecto.instantanea()
+            # Posición del diario que refleja esta instantánea
+            self._secuencia_guardado = self.diario.secuencia() if self.diario else None
         except Exception as err:
-            print("✗ Error al guardar proyecto:", err)
+            print("✗ Error al preparar el guardado del proyecto:", err)
+            return
+        self._hilo_guardado = HiloGuardado(ruta_archivo, datos, self)
+        self._hilo_guardado.guardado_terminado.connect(self._on_guardado_terminado)
+        self._hilo_guardado.start()
+        print(f"Guardando proyecto en segundo plano: {ruta_archivo}")
+
+    def _al_salir(self):
+        """
+        Espera a los hilos en curso (guardado, compactación del diario y
+        mapas) antes de que se destruyan, y cierra el diario de autoguardado.
+        """
+        if self._hilo_guardado is not None and self._hilo_guardado.isRunning():
+            print("Esperando a que termine el guardado en curso...")
+        while self._hilo_guardado is not None:
+            self._hilo_guardado.wait()
+            # guardado_terminado llega encolado: se entrega ahora para que el
+            # diario olvide lo ya guardado (y se lance el guardado pendiente)
+            QApplication.processEvents()
+            if not self._hilo_guardado.isRunning():
+                break
+        # Vuelca los nodos pendientes y espera a la compactación en curso
+        if self.diario is not None:
+            self.diario.cerrar()
+            self.diario = None
+        # Las construcciones de mapas se cancelan: la caché solo guarda pirámides completas
+        for hilo in list(self._hilos_mapa):
+            hilo.requestInterruption()
+            hilo.wait()
+        self._hilo_mapa = None
+
+    def _on_guardado_terminado(self, ruta_archivo, exito, error):
+        """Slot ejecutado en el hilo de la interfaz al acabar HiloGuardado."""
+        if exito:
+            print("✓ Proyecto guardado en:", ruta_archivo)
+            # El proyecto pasa a ser el del archivo guardado ("Guardar como"
+            # incluido), aunque se haya editado durante el guardado
+            sin_cambios = self.diario is None or self.diario.secuencia() == self._secuencia_guardado
+            ruta_anterior, self.ruta_proyecto = self.ruta_proyecto, ruta_archivo
+            if sin_cambios or ruta_anterior != ruta_archivo:
+                # Diario nuevo para esta ruta. Si no hubo cambios durante el
+                # guardado, el archivo ya lo contiene todo; si los hubo, la
+                # instantánea inicial del diario nuevo los conserva
+                if self.diario is not None:
+                    self.diario.cerrar(descartar=True)
+                    self.diario = None
+                DiarioCambios.descartar(ruta_archivo)
+                self._iniciar_diario(compactar=not sin_cambios)
+            elif self._secuencia_guardado is not None:
+                # Con cambios en la misma ruta, el diario se queda solo con
+                # ellos: lo anterior ya está en el archivo guardado
+                self.diario.descartar_hasta(self._secuencia_guardado)
+        else:
+            print("✗ Error al guardar proyecto:", error)
+            QMessageBox.critical(self.view, "Error al guardar",
+                                 f"No se pudo guardar el proyecto en:\n{ruta_archivo}\n\n{error}")
+        if self._guardado_pendiente:
+            ruta_pendiente, self._guardado_pendiente = self._guardado_pendiente, None
+            self._hilo_guardado.wait()
+            self._guardar_en_segundo_plano(ruta_pendiente)
 
     def _mostrar_mapa(self, ruta_mapa):
         # Limpia la escena y coloca el mapa al fondo sin interceptar clics
         self.scene.clear()
-        pixmap = QPixmap(ruta_mapa)
-        pm_item = QGraphicsPixmapItem(pixmap)
-        pm_item.setAcceptedMouseButtons(Qt.NoButton)
-        pm_item.setFlag(QGraphicsPixmapItem.ItemIsSelectable, False)
-        pm_item.setFlag(QGraphicsPixmapItem.ItemIsFocusable, False)
-        pm_item.setZValue(0)
-        self.scene.addItem(pm_item)
+        self._items_por_id.clear()
+        self._route_lines = []
+        self._highlight_lines = []
+        self._grupo_nodos = None
+        self._nodos_agrupados = False
+        # El plano se corta en teselas multirresolución en otro hilo: la
+        # escena tiene ya el tamaño del mapa (leído de la cabecera) y muestra
+        # una vista previa hasta que están las teselas
+        self._cancelar_carga_mapa()
+        try:
+            tamano = PiramideMapa.tamano_imagen(ruta_mapa)
+        except Exception as err:
+            print(f"✗ Error al cargar el mapa {ruta_mapa}: {err}")
+            return
+        self._mapa_item = MapaItem(tamano.width(), tamano.height())
+        self.scene.addItem(self._mapa_item)
+
+        hilo = HiloPiramideMapa(ruta_mapa, self)
+        hilo.vista_previa_lista.connect(self._on_vista_previa_mapa)
+        hilo.piramide_lista.connect(self._on_piramide_mapa_lista)
+        hilo.error.connect(self._on_error_mapa)
+        # Se conserva hasta que termina, aunque se cancele, para esperarlo al salir
+        hilo.finished.connect(lambda: self._hilos_mapa.remove(hilo))
+        hilo.finished.connect(hilo.deleteLater)
+        self._hilos_mapa.append(hilo)
+        self._hilo_mapa = hilo
+        hilo.start()
+
+    def _cancelar_carga_mapa(self):
+        """
+        Pide parar la construcción del mapa en curso; lo que emita después se
+        ignora. El hilo sigue en _hilos_mapa hasta que termina.
+        """
+        if self._hilo_mapa is not None:
+            try:
+                self._hilo_mapa.requestInterruption()
+            except RuntimeError:
+                pass  # El hilo ya terminó y se destruyó
+            self._hilo_mapa = None
+
+    def _mapa_en_curso(self):
+        """MapaItem al que van los resultados del hilo que llama al slot; None si ya no es el actual."""
+        if self._hilo_mapa is None or self.sender() is not self._hilo_mapa:
+            return None
+        return self._mapa_item if self._item_en_escena(self._mapa_item) else None
+
+    def _on_vista_previa_mapa(self, ruta_mapa, imagen):
+        mapa_item = self._mapa_en_curso()
+        if mapa_item is not None:
+            mapa_item.establecer_vista_previa(imagen)
+
+    def _on_piramide_mapa_lista(self, ruta_mapa, piramide):
+        mapa_item = self._mapa_en_curso()
+        if mapa_item is not None:
+            mapa_item.establecer_piramide(piramide)
+            print(f"✓ Mapa cargado: {ruta_mapa} ({piramide.ancho}x{piramide.alto} px, {piramide.niveles} niveles)")
+
+    def _on_error_mapa(self, ruta_mapa, error):
+        if self._mapa_en_curso() is not None:
+            print(f"✗ Error al cargar el mapa {ruta_mapa}: {error}")
 
     # --- Helper centralizado para crear NodoItem ---
     def _create_nodo_item(self, nodo, size=30):
@@ -1960,9 +2126,9 @@ class EditorController(QObject):
         Devuelve el NodoItem creado.
         """
         # Si ya existe un NodoItem en la escena para este nodo, devolverlo
-        for it in self.scene.items():
-            if isinstance(it, NodoItem) and getattr(it, "nodo", None) == nodo:
-                return it
+        existente = self.obtener_item_nodo(nodo.get("id"))
+        if existente is not None and existente.nodo is nodo:
+            return existente
 
         # Asegurar que el nodo tenga campo objetivo
         if isinstance(nodo, dict):
@@ -1993,6 +2159,8 @@ class EditorController(QObject):
             nodo_item.setFlag(nodo_item.ItemIsMovable, (self.modo_actual == "mover"))
             nodo_item.setAcceptedMouseButtons(Qt.LeftButton)
             nodo_item.setZValue(1)
+            # Si los nodos se están dibujando agrupados, este también
+            nodo_item.setFlag(QGraphicsItem.ItemHasNoContents, self._nodos_agrupados)
         except Exception:
             pass
 
@@ -2009,14 +2177,60 @@ class EditorController(QObject):
         except Exception as e:
             print(f"Error conectando señales hover: {e}")
 
-        # Añadir a la escena y devolver
+        # Añadir a la escena, registrar por ID y devolver
         try:
             self.scene.addItem(nodo_item)
+            self._items_por_id[nodo.get("id")] = nodo_item
         except Exception:
             pass
 
         return nodo_item
 
+    def obtener_item_nodo(self, nodo_id):
+        """Devuelve el NodoItem de la escena para el ID indicado (O(1)) o None"""
+        item = self._items_por_id.get(nodo_id)
+        if item is not None and item.scene() is self.scene:
+            return item
+        return None
+
+    def _nodo_items_en_posicion(self, x, y):
+        """
+        NodoItems visibles bajo el punto (x, y) de la escena. Usa el índice
+        espacial del proyecto en lugar de scene.items(pos) + filtrado por tipo.
+        """
+        if not getattr(self, "proyecto", None):
+            return []
+        r = self.RADIO_HIT_NODO
+        items = []
+        for nodo in self.proyecto.nodos_en_rectangulo(x - r, y - r, x + r, y + r):
+            item = self.obtener_item_nodo(nodo.get("id"))
+            if item is not None and item.isVisible():
+                items.append(item)
+        return items
+
+    def nodo_para_enganchar(self, x, y):
+        """
+        Nodo visible más cercano a (x, y) dentro de RADIO_SNAP_METROS, para
+        enganchar clics a nodos existentes al dibujar rutas. None si no hay.
+        """
+        if not getattr(self, "proyecto", None):
+            return None
+        radio = self.metros_a_pixeles(self.RADIO_SNAP_METROS)
+        ocultos = [i for i, visible in self.visibilidad_nodos.items() if not visible]
+        return self.proyecto.nodo_mas_cercano(x, y, radio, excluir=set(ocultos))
+
+    def _advertir_solapamientos(self, nodo):
+        """Avisa si el nodo queda a menos de RADIO_SNAP_METROS de otros nodos"""
+        if not getattr(self, "proyecto", None) or nodo is None:
+            return []
+        radio = self.metros_a_pixeles(self.RADIO_SNAP_METROS)
+        solapados = self.proyecto.nodos_superpuestos(radio, nodo.get("id"))
+        if solapados:
+            ids = ", ".join(str(n.get("id")) for n in solapados)
+            print(f"⚠ El nodo {nodo.get('id')} se solapa con los nodos: {ids} "
+                  f"(distancia < {self.RADIO_SNAP_METROS} m)")
+        return solapados
+
     def crear_nodo(self, x=100, y=100, registrar_historial=True):
         """
         Crea un nuevo nodo en las coordenadas especificadas.
@@ -2068,10 +2282,6 @@ class EditorController(QObject):
             print(f"DEBUG crear_nodo: Llamando a _inicializar_nodo_visibilidad para nodo {nodo.get('id')}")
             self._inicializar_nodo_visibilidad(nodo, agregar_a_lista=True)
             
-            # Si hay rutas, actualizar todas las relaciones (para consistencia)
-            if hasattr(self.proyecto, 'rutas') and self.proyecto.rutas:
-                self._actualizar_todas_relaciones_nodo_ruta()
-
             # Mostrar en metros
             x_m = self.pixeles_a_metros(x)
             y_m = self.pixeles_a_metros(y)
@@ -2092,6 +2302,7 @@ class EditorController(QObject):
                 
             print(f"✓ Nodo ID {nodo.get('id')} ({tipo}) creado con botón de visibilidad en ({x_m:.2f}, {y_m:.2f}) metros")
             print("Nodo creado:", getattr(nodo, "to_dict", lambda: nodo)())
+            self._advertir_solapamientos(nodo)
             
             # REGISTRAR CREACIÓN EN HISTORIAL (NUEVO)
             if registrar_historial:
@@ -2130,44 +2341,9 @@ class EditorController(QObject):
                 self.visibilidad_nodos[nodo_id] = True
                 print(f"  - Visibilidad inicializada para nodo {nodo_id}: True")
             
-            # 2. Inicializar relaciones nodo-ruta si no existen
-            if nodo_id not in self.nodo_en_rutas:
-                self.nodo_en_rutas[nodo_id] = []
-            
-            # 3. Buscar en rutas existentes si este nodo está en alguna
-            for idx, ruta in enumerate(self.proyecto.rutas):
-                try:
-                    ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                except Exception:
-                    ruta_dict = ruta
-                
-                self._normalize_route_nodes(ruta_dict)
-                
-                # Verificar si la ruta contiene este nodo
-                contiene_nodo = False
-                
-                # Origen
-                origen = ruta_dict.get("origen")
-                if origen and isinstance(origen, dict) and origen.get('id') == nodo_id:
-                    contiene_nodo = True
-                
-                # Destino
-                destino = ruta_dict.get("destino")
-                if not contiene_nodo and destino and isinstance(destino, dict) and destino.get('id') == nodo_id:
-                    contiene_nodo = True
-                
-                # Visita
-                if not contiene_nodo:
-                    for nodo_visita in ruta_dict.get("visita", []):
-                        if isinstance(nodo_visita, dict) and nodo_visita.get('id') == nodo_id:
-                            contiene_nodo = True
-                            break
-                
-                if contiene_nodo:
-                    if idx not in self.nodo_en_rutas[nodo_id]:
-                        self.nodo_en_rutas[nodo_id].append(idx)
+            # 2. Las relaciones nodo-ruta las mantiene el índice inverso del proyecto
             
-            # 4. Agregar a la lista lateral con widget de visibilidad
+            # 3. Agregar a la lista lateral con widget de visibilidad
             if agregar_a_lista:
                 x_px = nodo.get('X', 0)
                 y_px = nodo.get('Y', 0)
@@ -2249,119 +2425,22 @@ class EditorController(QObject):
             if self.ruta_actual_idx >= len(self.proyecto.rutas):
                 return
             ruta = self.proyecto.rutas[self.ruta_actual_idx]
-        
-        try:
-            ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-        except Exception:
-            ruta_dict = ruta
-        
-        self._normalize_route_nodes(ruta_dict)
-        
-        # Coleccionar todos los nodos de la ruta
-        nodos_ruta = []
-        if ruta_dict.get("origen"):
-            nodos_ruta.append(ruta_dict["origen"])
-        if ruta_dict.get("visita"):
-            nodos_ruta.extend(ruta_dict["visita"])
-        if ruta_dict.get("destino"):
-            nodos_ruta.append(ruta_dict["destino"])
-        
+
         # Resaltar cada nodo de la ruta - FORZAR color de ruta incluso si está seleccionado
-        for nodo in nodos_ruta:
-            for item in self.scene.items():
-                if isinstance(item, NodoItem):
-                    if item.nodo == nodo or (
-                        isinstance(item.nodo, dict) and isinstance(nodo, dict) and
-                        item.nodo.get('id') == nodo.get('id')
-                    ):
-                        item.set_route_selected_color()
-                        break
+        ids_ruta = set(ruta)
+        for item in self.scene.items():
+            if isinstance(item, NodoItem) and item.nodo.get('id') in ids_ruta:
+                item.set_route_selected_color()
 
     def _resaltar_nodos_de_ruta(self, ruta):
-        """Método mejorado para resaltar nodos de una ruta específica"""
-        try:
-            # Convertir ruta a diccionario si es necesario
-            ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-        except Exception:
-            ruta_dict = ruta
-        
-        # Normalizar la ruta
-        self._normalize_route_nodes(ruta_dict)
-        
-        # Obtener todos los nodos de la ruta
-        nodos_ruta = []
-        
-        # Origen
-        origen = ruta_dict.get("origen")
-        if origen:
-            if isinstance(origen, dict):
-                nodos_ruta.append(origen)
-            else:
-                # Intentar obtener como objeto Nodo
-                try:
-                    nodo_id = origen.get('id') if hasattr(origen, 'get') else getattr(origen, 'id', None)
-                    if nodo_id:
-                        nodos_ruta.append(origen)
-                except:
-                    pass
-        
-        # Visita
-        visita = ruta_dict.get("visita", [])
-        for nodo_visita in visita:
-            if isinstance(nodo_visita, dict):
-                nodos_ruta.append(nodo_visita)
-            else:
-                try:
-                    nodo_id = nodo_visita.get('id') if hasattr(nodo_visita, 'get') else getattr(nodo_visita, 'id', None)
-                    if nodo_id:
-                        nodos_ruta.append(nodo_visita)
-                except:
-                    pass
-        
-        # Destino
-        destino = ruta_dict.get("destino")
-        if destino:
-            if isinstance(destino, dict):
-                nodos_ruta.append(destino)
-            else:
-                try:
-                    nodo_id = destino.get('id') if hasattr(destino, 'get') else getattr(destino, 'id', None)
-                    if nodo_id:
-                        nodos_ruta.append(destino)
-                except:
-                    pass
-        
-        # Resaltar cada nodo en la escena
-        for nodo_ruta in nodos_ruta:
-            # Obtener el ID del nodo de la ruta
-            if isinstance(nodo_ruta, dict):
-                nodo_ruta_id = nodo_ruta.get('id')
-            else:
-                try:
-                    nodo_ruta_id = nodo_ruta.get('id') if hasattr(nodo_ruta, 'get') else getattr(nodo_ruta, 'id', None)
-                except:
-                    nodo_ruta_id = None
-            
-            if nodo_ruta_id is None:
-                continue
-                
-            # Buscar el NodoItem correspondiente en la escena
-            for item in self.scene.items():
-                if isinstance(item, NodoItem):
-                    # Obtener el ID del nodo del item
-                    item_nodo = item.nodo
-                    if isinstance(item_nodo, dict):
-                        item_id = item_nodo.get('id')
-                    else:
-                        try:
-                            item_id = item_nodo.get('id') if hasattr(item_nodo, 'get') else getattr(item_nodo, 'id', None)
-                        except:
-                            item_id = None
-                    
-                    # Si los IDs coinciden, resaltar el nodo
-                    if item_id is not None and str(item_id) == str(nodo_ruta_id):
-                        item.set_route_selected_color()
-                        break
+        """Resalta en la escena los nodos cuyos IDs forman parte de la ruta"""
+        ids_ruta = set(ruta)
+        if not ids_ruta:
+            return
+
+        for item in self.scene.items():
+            if isinstance(item, NodoItem) and item.nodo.get('id') in ids_ruta:
+                item.set_route_selected_color()
 
     def restaurar_colores_nodos(self):
         """Restaura todos los nodos a su color normal"""
@@ -2424,20 +2503,13 @@ class EditorController(QObject):
         # --- DETECCIÓN DE NODOS SUPERPUESTOS ---
         # Verificar si hay más nodos en la misma posición (o muy cerca)
         pos = nodo_item.scenePos()
-        # Usar un rectángulo pequeño alrededor del punto para detectar nodos cercanos
-        search_rect = nodo_item.boundingRect().translated(pos)
-        search_rect.adjust(-5, -5, 5, 5)  # Expandir un poco el área de búsqueda
-        
-        items_en_pos = self.scene.items(search_rect)
+        # Consultar el índice espacial por nodos a menos de 10 px del centro
+        cx, cy = nodo.get("X", 0), nodo.get("Y", 0)
         nodos_en_pos = []
-        
-        for item in items_en_pos:
-            if isinstance(item, NodoItem):
-                # Verificar si está realmente superpuesto (misma posición aproximada)
-                item_pos = item.scenePos()
-                if (abs(item_pos.x() - pos.x()) < 10 and 
-                    abs(item_pos.y() - pos.y()) < 10):
-                    nodos_en_pos.append(item)
+        for nodo_cercano in self.proyecto.nodos_en_rectangulo(cx - 10, cy - 10, cx + 10, cy + 10):
+            item = self.obtener_item_nodo(nodo_cercano.get("id"))
+            if item is not None and item.isVisible():
+                nodos_en_pos.append(item)
         
         if len(nodos_en_pos) > 1:
             # Hay nodos superpuestos, mostrar menú
@@ -2650,91 +2722,49 @@ class EditorController(QObject):
         # Resaltar nodos de la ruta - VERSIÓN MEJORADA
         self._resaltar_nodos_de_ruta(ruta)
 
-        # resaltar la ruta seleccionada con líneas amarillas
+        # resaltar la ruta seleccionada con un RutaItem amarillo (trazo continuo)
         try:
             highlight_pen = QPen(Qt.yellow, 3)
-            ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            self._normalize_route_nodes(ruta_dict)
-            puntos = []
-            if ruta_dict.get("origen"):
-                puntos.append(ruta_dict.get("origen"))
-            puntos.extend(ruta_dict.get("visita", []) or [])
-            if ruta_dict.get("destino"):
-                puntos.append(ruta_dict.get("destino"))
-
-            for i in range(len(puntos) - 1):
-                n1, n2 = puntos[i], puntos[i + 1]
-                try:
-                    l = self.scene.addLine(n1["X"], n1["Y"], n2["X"], n2["Y"], highlight_pen)
-                    l.setZValue(0.7)
-                    l.setData(0, ("route_highlight", i))
-                    self._highlight_lines.append(l)
-                except Exception:
-                    pass
+            puntos = self.proyecto.nodos_de_ruta(ruta)
+
+            if len(puntos) >= 2:
+                l = RutaItem(puntos, highlight_pen, discontinuas=False)
+                l.setZValue(0.7)
+                l.setData(0, ("route_highlight", self.ruta_actual_idx))
+                self.scene.addItem(l)
+                self._highlight_lines.append(l)
         except Exception:
             pass
 
-    def _obtener_ruta_completa(self, ruta_dict):
-        """Obtiene todos los nodos de la ruta en orden: origen, visitas, destino"""
-        nodos = []
-        
-        # Origen
-        origen = ruta_dict.get("origen")
-        if origen:
-            nodos.append(origen)
-        
-        # Visita
-        visita = ruta_dict.get("visita", [])
-        nodos.extend(visita)
-        
-        # Destino
-        destino = ruta_dict.get("destino")
-        if destino:
-            nodos.append(destino)
-        
-        return nodos
-
     def mostrar_propiedades_ruta(self, ruta):
         """
         Muestra la ruta en propertiesTable con el formato:
         Nombre: nombre_ruta
         Origen: id_origen
-        Destino: id_destino  
+        Destino: id_destino
         Ruta completa: [id_origen, id1, id2, id3, id_destino]
         """
         if not ruta:
             return
 
-        try:
-            ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-        except Exception:
-            ruta_dict = ruta
-
-        self._normalize_route_nodes(ruta_dict)
-
         try:
             self.view.propertiesTable.itemChanged.disconnect(self._actualizar_propiedad_ruta)
         except Exception:
             pass
-        
+
         self.view.propertiesTable.blockSignals(True)
         self.view.propertiesTable.clear()
         self.view.propertiesTable.setColumnCount(2)
         self.view.propertiesTable.setHorizontalHeaderLabels(["Propiedad", "Valor"])
 
-        # Obtener IDs de la ruta completa
-        ruta_completa_ids = self._obtener_ids_ruta_completa(ruta_dict)
-        ruta_completa_str = f"[{', '.join(str(id) for id in ruta_completa_ids)}]"
-        
-        # Obtener origen y destino actuales
-        origen_id = self._obtener_id_nodo(ruta_dict.get("origen"))
-        destino_id = self._obtener_id_nodo(ruta_dict.get("destino"))
-        
+        # IDs de la ruta completa
+        ruta_completa_str = f"[{', '.join(str(id) for id in ruta.ids())}]"
+
         # Mostrar propiedades
         propiedades = [
-            ("Nombre", ruta_dict.get("nombre", "Ruta")),
-            ("Origen", origen_id),
-            ("Destino", destino_id),
+            ("Nombre", ruta.nombre),
+            ("Origen", ruta.origen_id if ruta.origen_id is not None else ""),
+            ("Destino", ruta.destino_id if ruta.destino_id is not None else ""),
             ("Ruta completa", ruta_completa_str)
         ]
 
@@ -2747,7 +2777,7 @@ class EditorController(QObject):
 
             val_item = QTableWidgetItem(str(valor))
             val_item.setFlags(val_item.flags() | Qt.ItemIsEditable)
-            val_item.setData(Qt.UserRole, (ruta_dict, clave.lower()))
+            val_item.setData(Qt.UserRole, (ruta, clave.lower()))
             self.view.propertiesTable.setItem(row, 1, val_item)
 
         self.view.propertiesTable.blockSignals(False)
@@ -2760,6 +2790,8 @@ class EditorController(QObject):
         
         if isinstance(nodo, dict):
             return nodo.get("id", "")
+        elif hasattr(nodo, "get"):
+            return nodo.get("id", "")
         elif hasattr(nodo, "id"):
             return getattr(nodo, "id", "")
         else:
@@ -2775,85 +2807,11 @@ class EditorController(QObject):
             ids.append(self._obtener_id_nodo(nodo))
         return f"[{', '.join(str(id) for id in ids)}]"
 
-    def _obtener_ids_ruta_completa(self, ruta_dict):
-        """Devuelve una lista de IDs de la ruta completa (origen + visita + destino)"""
-        ids = []
-        
-        # Origen
-        origen = ruta_dict.get("origen")
-        if origen:
-            origen_id = self._obtener_id_nodo(origen)
-            if origen_id:
-                ids.append(origen_id)
-        
-        # Visita (nodos intermedios)
-        visita = ruta_dict.get("visita", [])
-        for nodo_visita in visita:
-            nodo_id = self._obtener_id_nodo(nodo_visita)
-            if nodo_id:
-                ids.append(nodo_id)
-        
-        # Destino
-        destino = ruta_dict.get("destino")
-        if destino:
-            destino_id = self._obtener_id_nodo(destino)
-            if destino_id and (not ids or destino_id != ids[0]):  # No agregar si es igual al origen
-                ids.append(destino_id)
-        
-        return ids
-
-    def _actualizar_ruta_desde_ids(self, ruta_dict, ids_ruta):
-        """
-        Actualiza la estructura de ruta (origen, visita, destino) a partir de una lista de IDs.
-        Mantiene compatibilidad con la estructura existente.
-        """
-        if not ids_ruta:
-            ruta_dict["origen"] = None
-            ruta_dict["destino"] = None
-            ruta_dict["visita"] = []
-            return
-        
-        # Primer elemento es el origen
-        primer_id = ids_ruta[0]
-        nodo_existente = next((n for n in self.proyecto.nodos 
-                            if self._obtener_id_nodo(n) == primer_id), None)
-        if nodo_existente:
-            ruta_dict["origen"] = nodo_existente
-        else:
-            ruta_dict["origen"] = {"id": primer_id, "X": 0, "Y": 0}
-        
-        # Último elemento es el destino (si hay más de un elemento)
-        if len(ids_ruta) > 1:
-            ultimo_id = ids_ruta[-1]
-            nodo_existente = next((n for n in self.proyecto.nodos 
-                                if self._obtener_id_nodo(n) == ultimo_id), None)
-            if nodo_existente:
-                ruta_dict["destino"] = nodo_existente
-            else:
-                ruta_dict["destino"] = {"id": ultimo_id, "X": 0, "Y": 0}
-        else:
-            # Si solo hay un elemento, el destino es el mismo que el origen
-            ruta_dict["destino"] = ruta_dict["origen"]
-        
-        # Elementos intermedios son la visita
-        if len(ids_ruta) > 2:
-            nueva_visita = []
-            for id_intermedio in ids_ruta[1:-1]:
-                nodo_existente = next((n for n in self.proyecto.nodos 
-                                    if self._obtener_id_nodo(n) == id_intermedio), None)
-                if nodo_existente:
-                    nueva_visita.append(nodo_existente)
-                else:
-                    nueva_visita.append({"id": id_intermedio, "X": 0, "Y": 0})
-            ruta_dict["visita"] = nueva_visita
-        else:
-            ruta_dict["visita"] = []
-            
     def _actualizar_propiedad_ruta(self, item):
         """Actualiza la ruta a través del proyecto para notificar cambios"""
         if item.column() != 1:
             return
-            
+
         try:
             # Verificar que tenemos una ruta seleccionada
             if self.ruta_actual_idx is None:
@@ -2865,12 +2823,7 @@ class EditorController(QObject):
                 print("Índice de ruta inválido")
                 return
 
-            ruta_original = self.proyecto.rutas[self.ruta_actual_idx]
-            # Convertir a diccionario
-            try:
-                ruta_dict = ruta_original.to_dict() if hasattr(ruta_original, "to_dict") else ruta_original
-            except Exception:
-                ruta_dict = ruta_original
+            ruta = self.proyecto.rutas[self.ruta_actual_idx]
 
             # Obtener el campo y el valor del item de la tabla
             data = item.data(Qt.UserRole)
@@ -2878,196 +2831,139 @@ class EditorController(QObject):
                 return
             campo = data[1]
             texto = item.text().strip()
-            
+
             # Obtener el valor anterior ANTES de cambiarlo
-            valor_anterior = None
-            if campo == "nombre":
-                valor_anterior = ruta_dict.get("nombre", "")
-            elif campo == "origen":
-                valor_anterior = self._obtener_id_nodo(ruta_dict.get("origen"))
-            elif campo == "destino":
-                valor_anterior = self._obtener_id_nodo(ruta_dict.get("destino"))
-            elif campo == "ruta completa":
-                # Obtener la ruta completa actual como string
-                ruta_completa_ids = self._obtener_ids_ruta_completa(ruta_dict)
-                valor_anterior = f"[{', '.join(str(id) for id in ruta_completa_ids)}]"
-            
+            valor_anterior = self._valor_propiedad_ruta(ruta, campo)
+
             print(f"Actualizando ruta - Campo: {campo}, Valor: {texto}")
-            
-            # Procesar según el campo
-            valor_nuevo = None
-            if campo == "nombre":
-                valor_nuevo = texto
-                ruta_dict["nombre"] = texto
-                
-            elif campo == "origen":
-                try:
-                    nuevo_origen_id = int(texto)
-                    # Obtener la ruta completa actual
-                    ruta_completa_ids = self._obtener_ids_ruta_completa(ruta_dict)
-                    
-                    if ruta_completa_ids:
-                        # Actualizar solo el primer elemento
-                        ruta_completa_ids[0] = nuevo_origen_id
-                    else:
-                        # Si no hay ruta, crear una nueva
-                        ruta_completa_ids = [nuevo_origen_id]
-                    
-                    # Reconstruir ruta a partir de la lista de IDs
-                    self._actualizar_ruta_desde_ids(ruta_dict, ruta_completa_ids)
-                    valor_nuevo = nuevo_origen_id
-                except ValueError:
-                    print(f"Error: ID de origen debe ser un número entero")
-                    return
-                    
-            elif campo == "destino":
-                try:
-                    nuevo_destino_id = int(texto)
-                    # Obtener la ruta completa actual
-                    ruta_completa_ids = self._obtener_ids_ruta_completa(ruta_dict)
-                    
-                    if ruta_completa_ids:
-                        # Actualizar solo el último elemento
-                        if len(ruta_completa_ids) > 1:
-                            ruta_completa_ids[-1] = nuevo_destino_id
-                        else:
-                            # Si solo hay un elemento, agregar el destino
-                            ruta_completa_ids.append(nuevo_destino_id)
-                    else:
-                        # Si no hay ruta, crear una nueva
-                        ruta_completa_ids = [nuevo_destino_id]
-                    
-                    # Reconstruir ruta a partir de la lista de IDs
-                    self._actualizar_ruta_desde_ids(ruta_dict, ruta_completa_ids)
-                    valor_nuevo = nuevo_destino_id
-                except ValueError:
-                    print(f"Error: ID de destino debe ser un número entero")
-                    return
-                    
-            elif campo == "ruta completa":
-                try:
-                    # Parsear lista de IDs: [1, 2, 3] o 1, 2, 3
-                    if texto.startswith('[') and texto.endswith(']'):
-                        texto = texto[1:-1]
-                    
-                    ids_texto = [id_str.strip() for id_str in texto.split(',')] if texto else []
-                    nueva_ruta_completa = []
-                    
-                    for id_str in ids_texto:
-                        if id_str:  # Ignorar strings vacíos
-                            try:
-                                nodo_id = int(id_str)
-                                nueva_ruta_completa.append(nodo_id)
-                            except ValueError:
-                                print(f"Error: ID de ruta debe ser número entero: {id_str}")
-                    
-                    # Reconstruir ruta a partir de la lista de IDs
-                    self._actualizar_ruta_desde_ids(ruta_dict, nueva_ruta_completa)
-                    valor_nuevo = f"[{', '.join(str(id) for id in nueva_ruta_completa)}]"
-                    
-                except Exception as e:
-                    print(f"Error procesando ruta completa: {e}")
-                    return
+
+            # Aplicar el cambio sobre la secuencia de IDs
+            try:
+                self._aplicar_propiedad_ruta(ruta, campo, texto)
+            except ValueError:
+                print(f"Error: ID de {campo} debe ser un número entero")
+                return
+            valor_nuevo = self._valor_propiedad_ruta(ruta, campo)
 
             # Registrar cambio en historial
             if valor_anterior is not None and valor_nuevo is not None and valor_anterior != valor_nuevo:
                 self.registrar_cambio_propiedad_ruta(
                     self.ruta_actual_idx,
                     campo,
-                    str(valor_anterior) if valor_anterior is not None else "",
-                    str(valor_nuevo) if valor_nuevo is not None else ""
+                    str(valor_anterior),
+                    str(valor_nuevo)
                 )
 
-            # Normalizar y actualizar referencia en proyecto.rutas usando el método del proyecto
-            self._normalize_route_nodes(ruta_dict)
-            self.proyecto.actualizar_ruta(self.ruta_actual_idx, ruta_dict)
-            
+            # Actualizar la ruta usando el método del proyecto (reindexa sus nodos)
+            self.proyecto.actualizar_ruta(self.ruta_actual_idx, ruta)
+
             # Actualizar el texto en la lista lateral de rutas
             self._actualizar_widget_ruta_en_lista(self.ruta_actual_idx)
-            
+
             # Redibujar rutas
             self._dibujar_rutas()
-            
+
             # Actualizar la tabla de propiedades para mostrar cambios
-            if self.ruta_actual_idx == self.ruta_actual_idx:
-                self.mostrar_propiedades_ruta(ruta_dict)
-            
+            self.mostrar_propiedades_ruta(ruta)
+
             print(f"Ruta actualizada exitosamente")
-            
+
         except Exception as err:
             print("Error en _actualizar_propiedad_ruta:", err)
 
-    def _dibujar_rutas(self):
-        try:
-            self._clear_route_lines()
-        except Exception as e:
-            print(f"Error en clear: {e}")
+    def _valor_propiedad_ruta(self, ruta, campo):
+        """Devuelve el valor mostrado en la tabla para una propiedad de la ruta"""
+        if campo == "nombre":
+            return ruta.nombre
+        if campo == "origen":
+            return ruta.origen_id
+        if campo == "destino":
+            return ruta.destino_id
+        if campo == "ruta completa":
+            return f"[{', '.join(str(id) for id in ruta.ids())}]"
+        return None
 
+    def _dibujar_rutas(self):
         if not getattr(self, "proyecto", None) or not hasattr(self.proyecto, "rutas"):
+            self._clear_route_lines()
             return
 
-        self._reparar_referencias_rutas()
         self.rutas_para_dibujo = self._reconstruir_rutas_para_dibujo()
         
         base_pen = QPen(Qt.red, 2)
         base_pen.setCosmetic(True)
+
+        # Un RutaItem por ruta; los que ya están en la escena se reutilizan
+        # cambiando solo sus caminos
+        anteriores = self._route_lines
         self._route_lines = []
 
         for ruta_idx, ruta_reconstruida in enumerate(self.rutas_para_dibujo):
+            route_item = anteriores[ruta_idx] if ruta_idx < len(anteriores) else None
+            if not self._item_en_escena(route_item):
+                route_item = None
+
             if not ruta_reconstruida or len(ruta_reconstruida) < 2:
-                self._route_lines.append([])
+                self._quitar_item_de_escena(route_item)
+                self._route_lines.append(None)
                 continue
 
-            route_line_items = []
-            
-            for i in range(len(ruta_reconstruida) - 1):
-                n1, n2 = ruta_reconstruida[i], ruta_reconstruida[i + 1]
-                
-                # --- OBTENER ES_CURVA DEL NODO ACTUAL (desde el proyecto) ---
-                es_curva_valor = 0
-                # Extraer ID del nodo destino
-                nodo_id = None
-                if isinstance(n2, dict):
-                    nodo_id = n2.get('id')
-                elif hasattr(n2, 'get'):
-                    nodo_id = n2.get('id')
-                
-                if nodo_id is not None:
-                    nodo_actual = self._obtener_nodo_actual(nodo_id)
-                    if nodo_actual:
-                        # Obtener el valor actual de es_curva (convertir a entero)
-                        raw = nodo_actual.get('Tipo_curva', 0)
-                        try:
-                            es_curva_valor = int(raw)
-                        except (ValueError, TypeError):
-                            es_curva_valor = 0
-                # -------------------------------------------------------------
-                
-                segment_pen = QPen(base_pen)
-                if es_curva_valor != 0:
-                    segment_pen.setStyle(Qt.DashLine)
+            try:
+                if route_item is None:
+                    route_item = RutaItem(ruta_reconstruida, base_pen)
+                    route_item.setZValue(0.5)
+                    self.scene.addItem(route_item)
                 else:
-                    segment_pen.setStyle(Qt.SolidLine)
-                
-                try:
-                    x1 = n1.get("X", 0) if isinstance(n1, dict) else getattr(n1, "X", 0)
-                    y1 = n1.get("Y", 0) if isinstance(n1, dict) else getattr(n1, "Y", 0)
-                    x2 = n2.get("X", 0) if isinstance(n2, dict) else getattr(n2, "X", 0)
-                    y2 = n2.get("Y", 0) if isinstance(n2, dict) else getattr(n2, "Y", 0)
-                    
-                    line_item = self.scene.addLine(x1, y1, x2, y2, segment_pen)
-                    line_item.setZValue(0.5)
-                    line_item.setData(0, ("route_line", ruta_idx, i))
-                    line_item.setVisible(True)
-                    route_line_items.append(line_item)
-                except Exception as e:
-                    print(f"Error dibujando segmento: {e}")
-                    continue
-            
-            self._route_lines.append(route_line_items)
+                    route_item.establecer_nodos(ruta_reconstruida)
+                route_item.setData(0, ("route_line", ruta_idx))
+                route_item.setVisible(True)
+            except Exception as e:
+                print(f"Error dibujando ruta {ruta_idx}: {e}")
+                self._quitar_item_de_escena(route_item)
+                route_item = None
+            self._route_lines.append(route_item)
+
+        # Rutas que ya no existen
+        for route_item in anteriores[len(self.rutas_para_dibujo):]:
+            self._quitar_item_de_escena(route_item)
 
         self.view.marco_trabajo.viewport().update()
 
+    def _actualizar_agrupacion_nodos(self, nivel=None):
+        """
+        Con el zoom lejano y al menos UMBRAL_AGRUPAR_NODOS nodos, los NodoItem
+        dejan de pintarse (siguen recibiendo clics) y GrupoNodosItem los dibuja
+        agrupados; en otro caso cada nodo se pinta con su nivel de detalle.
+        """
+        try:
+            if nivel is None:
+                nivel = getattr(self.view.marco_trabajo, "nivel_detalle", DETALLE_COMPLETO)
+            agrupar = nivel == DETALLE_LEJOS and len(self._items_por_id) >= self.UMBRAL_AGRUPAR_NODOS
+
+            if agrupar and not self._item_en_escena(self._grupo_nodos):
+                self._grupo_nodos = GrupoNodosItem(self._items_por_id)
+                self.scene.addItem(self._grupo_nodos)
+            if self._item_en_escena(self._grupo_nodos):
+                self._grupo_nodos.setVisible(agrupar)
+
+            if agrupar != self._nodos_agrupados:
+                for item in self._items_por_id.values():
+                    item.setFlag(QGraphicsItem.ItemHasNoContents, agrupar)
+                self._nodos_agrupados = agrupar
+        except Exception as err:
+            print("✗ Error al cambiar el nivel de detalle:", err)
+
+    def _item_en_escena(self, item):
+        """Indica si item sigue en la escena (scene.clear() destruye los elementos)."""
+        try:
+            return item is not None and item.scene() is not None
+        except RuntimeError:
+            return False
+
+    def _quitar_item_de_escena(self, item):
+        if self._item_en_escena(item):
+            self.scene.removeItem(item)
+
     # --- Propiedades de nodo en QListWidget editable ---   
     def mostrar_propiedades_nodo(self, nodo):
         if self._updating_ui:
@@ -3088,10 +2984,9 @@ class EditorController(QObject):
 
             propiedades = nodo.to_dict() if hasattr(nodo, "to_dict") else nodo
             
-            # Obtener claves de NODO_FIELDS que no son 'id' ni pertenecen a OBJETIVO_FIELDS
+            # Claves de NODO_FIELDS que no son 'id' ni pertenecen a OBJETIVO_FIELDS
             # (los campos de objetivo se muestran en el diálogo avanzado)
-            claves_basicas = [k for k in NODO_FIELDS.keys() if k != 'id' and k not in OBJETIVO_FIELDS]
-            propiedades_basicas = claves_basicas
+            propiedades_basicas = CLAVES_PROPIEDADES_NODO
                         
             # Filtrar también las propiedades de objetivo para no mostrarlas aquí
             claves_filtradas = [k for k in propiedades_basicas if k in propiedades]
@@ -3183,6 +3078,17 @@ class EditorController(QObject):
         if dialogo.exec_() == QDialog.Accepted:
             # Obtener las propiedades del diálogo
             nuevas_propiedades = dialogo.obtener_propiedades()
+
+            # Con el tipo del esquema, como en la tabla de propiedades
+            for clave, valor in list(nuevas_propiedades.items()):
+                tipo = TIPOS_CAMPOS_NODO.get(clave)
+                if tipo is None:
+                    continue
+                try:
+                    nuevas_propiedades[clave] = normalizar_valor(valor, tipo)
+                except ValueError as e:
+                    print(f"✗ Valor no válido para {clave}: {e}")
+                    del nuevas_propiedades[clave]  # se conserva el valor anterior
             
             # Registrar cada cambio individual en el historial
             for clave, valor in nuevas_propiedades.items():
@@ -3202,6 +3108,14 @@ class EditorController(QObject):
             
             print(f"✓ Propiedades de objetivo actualizadas para nodo {nodo.get('id')}")
 
+    def _restaurar_celda(self, item, valor):
+        """Vuelve a mostrar valor en la celda de propiedades sin tratarlo como una edición."""
+        self._updating_ui = True
+        try:
+            item.setText(str(valor))
+        finally:
+            self._updating_ui = False
+
     def _actualizar_propiedad_nodo(self, item):
         """Actualiza la propiedad de un nodo a través del proyecto para notificar cambios"""
         if self._updating_ui or item.column() != 1:
@@ -3224,7 +3138,7 @@ class EditorController(QObject):
         # Detectar si estamos editando el campo "objetivo"
         if clave == "objetivo":
             try:
-                nuevo_objetivo = int(texto)
+                nuevo_objetivo = normalizar_valor(texto, int)
                 valor_anterior_int = int(valor_anterior) if valor_anterior is not None else 0
                 
                 # Solo proceder si realmente hay un cambio
@@ -3262,7 +3176,7 @@ class EditorController(QObject):
                 print(f"Error: objetivo debe ser un número entero")
                 # Restaurar el valor anterior
                 if valor_anterior is not None:
-                    item.setText(str(valor_anterior))
+                    self._restaurar_celda(item, valor_anterior)
                 return
         
         # Para todas las demás propiedades, comportamiento normal
@@ -3273,11 +3187,25 @@ class EditorController(QObject):
             # Si falla, usar el texto como string
             valor = texto
 
+        # Los campos del esquema se guardan ya con su tipo: el resto del
+        # código (dibujo, exportación) no vuelve a convertirlos
+        tipo = TIPOS_CAMPOS_NODO.get(clave)
+        if tipo is not None and clave not in ("X", "Y"):
+            try:
+                # Un campo de texto se guarda tal cual se escribió ("1e3" no es 1000.0)
+                valor = normalizar_valor(texto if tipo is str else valor, tipo)
+            except ValueError as e:
+                print(f"✗ Valor no válido para {clave}: {e}")
+                # Restaurar el valor anterior
+                if valor_anterior is not None:
+                    self._restaurar_celda(item, valor_anterior)
+                return
+
         try:
             # Si la clave es X o Y, convertir de metros a píxeles
             if clave in ["X", "Y"]:
                 try:
-                    valor_metros = float(valor)
+                    valor_metros = normalizar_valor(valor, float)
                     valor_pixeles = self.metros_a_pixeles(valor_metros)
                     
                     # Registrar en historial (en metros para el usuario)
@@ -3298,6 +3226,9 @@ class EditorController(QObject):
                     
                 except ValueError:
                     print(f"Error: Valor de {clave} debe ser un número")
+                    # Restaurar el valor anterior (en metros, como se muestra)
+                    if isinstance(valor_anterior, (int, float)):
+                        self._restaurar_celda(item, self.pixeles_a_metros(valor_anterior))
                     return
             else:
                 # Para otras propiedades
@@ -3334,43 +3265,18 @@ class EditorController(QObject):
             # Guardar una copia profunda del nodo y rutas afectadas
             nodo_copia = copy.deepcopy(nodo)
             
-            # Encontrar todas las rutas que contienen este nodo
+            # Encontrar las rutas que contienen este nodo (índice inverso del proyecto)
             rutas_afectadas = []
-            if hasattr(self.proyecto, 'rutas'):
-                for idx, ruta in enumerate(self.proyecto.rutas):
-                    try:
-                        ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                        self._normalize_route_nodes(ruta_dict)
-                        
-                        # Verificar si la ruta contiene el nodo
-                        contiene_nodo = False
-                        
-                        # Origen
-                        origen = ruta_dict.get("origen")
-                        if origen and isinstance(origen, dict) and origen.get('id') == nodo.get('id'):
-                            contiene_nodo = True
-                        
-                        # Destino
-                        destino = ruta_dict.get("destino")
-                        if not contiene_nodo and destino and isinstance(destino, dict) and destino.get('id') == nodo.get('id'):
-                            contiene_nodo = True
-                        
-                        # Visita
-                        if not contiene_nodo:
-                            for nodo_visita in ruta_dict.get("visita", []):
-                                if isinstance(nodo_visita, dict) and nodo_visita.get('id') == nodo.get('id'):
-                                    contiene_nodo = True
-                                    break
-                        
-                        if contiene_nodo:
-                            # Guardar una copia de la ruta antes de modificar
-                            rutas_afectadas.append({
-                                'indice': idx,
-                                'ruta_original': copy.deepcopy(ruta_dict)
-                            })
-                    except Exception as e:
-                        print(f"Error al procesar ruta para undo: {e}")
-                        continue
+            for idx in self.proyecto.rutas_con_nodo(nodo.get('id')):
+                try:
+                    # Guardar una copia de la ruta antes de modificar
+                    rutas_afectadas.append({
+                        'indice': idx,
+                        'ruta_original': self.proyecto.rutas[idx].copia()
+                    })
+                except Exception as e:
+                    print(f"Error al procesar ruta para undo: {e}")
+                    continue
             
             # 1) Quitar de la escena el NodoItem visual si sigue vivo
             try:
@@ -3381,32 +3287,17 @@ class EditorController(QObject):
 
             nodo_id = nodo.get("id")
 
-            # 2) Quitar del modelo por identidad o por id
-            nodo_encontrado = False
-            try:
-                if nodo in self.proyecto.nodos:
-                    self.proyecto.nodos.remove(nodo)
-                    nodo_encontrado = True
-                else:
-                    # Buscar por ID
-                    for i, n in enumerate(self.proyecto.nodos):
-                        if n.get("id") == nodo_id:
-                            self.proyecto.nodos.pop(i)
-                            nodo_encontrado = True
-                            break
-            except Exception:
-                # fallback por id
-                self.proyecto.nodos = [n for n in getattr(self.proyecto, "nodos", []) if n.get("id") != nodo_id]
-                nodo_encontrado = True
+            # 2) Quitar del modelo (índice por ID del proyecto)
+            nodo_encontrado = self.proyecto.eliminar_nodo(nodo_id) is not None
 
             if not nodo_encontrado:
                 print(f"Advertencia: Nodo {nodo_id} no encontrado en proyecto.nodos")
 
-            # 3) Eliminar de visibilidad y relaciones
+            # 3) Eliminar de visibilidad y del mapa de items
             if nodo_id in self.visibilidad_nodos:
                 del self.visibilidad_nodos[nodo_id]
-            if nodo_id in self.nodo_en_rutas:
-                del self.nodo_en_rutas[nodo_id]
+            if self._items_por_id.get(nodo_id) is nodo_item:
+                del self._items_por_id[nodo_id]
 
             # 4) RECONFIGURAR RUTAS en lugar de eliminarlas
             try:
@@ -3448,168 +3339,42 @@ class EditorController(QObject):
 
     def _reconfigurar_rutas_por_eliminacion(self, nodo_id_eliminado):
         """
-        Reconfigura las rutas que contienen el nodo eliminado según su posición:
-        - Si es origen: primer elemento de visita como nuevo origen
-        - Si es destino: último elemento de visita como nuevo destino
-        - Si es intermedio: elimina el nodo de la visita y reconecta
+        Reconfigura las rutas que contienen el nodo eliminado quitando su ID
+        de la secuencia:
+        - Si es origen: el siguiente nodo pasa a ser el nuevo origen
+        - Si es destino: el nodo anterior pasa a ser el nuevo destino
+        - Si es intermedio: se quita de la visita y se reconecta
         - Si la ruta queda con solo un nodo, se elimina automáticamente
         """
         if not getattr(self, "proyecto", None):
             return
 
-        nuevas_rutas = []
-        
-        for ruta in getattr(self.proyecto, "rutas", []) or []:
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-
-            # Normalizar la ruta primero
-            self._normalize_route_nodes(ruta_dict)
-            
-            origen = ruta_dict.get("origen")
-            visita = ruta_dict.get("visita", []) or []
-            destino = ruta_dict.get("destino")
-            
-            # Verificar si la ruta contiene el nodo eliminado
-            contiene_nodo = False
-            posicion_en_ruta = None
-            
-            # Verificar origen
-            if origen and isinstance(origen, dict) and origen.get("id") == nodo_id_eliminado:
-                contiene_nodo = True
-                posicion_en_ruta = "origen"
-            
-            # Verificar destino
-            if not contiene_nodo and destino and isinstance(destino, dict) and destino.get("id") == nodo_id_eliminado:
-                contiene_nodo = True
-                posicion_en_ruta = "destino"
-            
-            # Verificar visita
-            if not contiene_nodo:
-                for i, nodo_visita in enumerate(visita):
-                    if isinstance(nodo_visita, dict) and nodo_visita.get("id") == nodo_id_eliminado:
-                        contiene_nodo = True
-                        posicion_en_ruta = f"visita_{i}"
-                        break
-            
-            if not contiene_nodo:
-                # La ruta no contiene el nodo eliminado, se mantiene igual
-                nuevas_rutas.append(ruta)
-                continue
-            
-            print(f"Reconfigurando ruta - Nodo eliminado en posición: {posicion_en_ruta}")
-            
-            # RECONFIGURACIÓN SEGÚN POSICIÓN
-            if posicion_en_ruta == "origen":
-                # Si es el origen: tomar primer elemento de visita como nuevo origen
-                if visita:
-                    nuevo_origen = visita[0]
-                    nueva_visita = visita[1:]  # resto de la visita
-                    nuevo_destino = destino
-                    
-                    ruta_dict["origen"] = nuevo_origen
-                    ruta_dict["visita"] = nueva_visita
-                    ruta_dict["destino"] = nuevo_destino
-                    
-                    # Verificar si la ruta queda con al menos 2 nodos
-                    if self._ruta_tiene_al_menos_dos_nodos(ruta_dict):
-                        nuevas_rutas.append(ruta_dict)
-                        print(f"  -> Nuevo origen: {nuevo_origen.get('id')}")
-                    else:
-                        print("  -> Ruta eliminada (queda con menos de 2 nodos)")
-                else:
-                    # No hay visita, el destino pasa a ser el nuevo origen
-                    if destino:
-                        ruta_dict["origen"] = destino
-                        ruta_dict["visita"] = []
-                        ruta_dict["destino"] = None
-                        
-                        # Verificar si la ruta queda con al menos 2 nodos
-                        if self._ruta_tiene_al_menos_dos_nodos(ruta_dict):
-                            nuevas_rutas.append(ruta_dict)
-                            print(f"  -> Destino {destino.get('id')} pasa a ser origen")
-                        else:
-                            print("  -> Ruta eliminada (queda con solo un nodo)")
-                    else:
-                        # No hay destino, la ruta queda inválida - se elimina
-                        print("  -> Ruta eliminada (sin origen ni destino válido)")
-            
-            elif posicion_en_ruta == "destino":
-                # Si es el destino: tomar último elemento de visita como nuevo destino
-                if visita:
-                    nuevo_origen = origen
-                    nueva_visita = visita[:-1]  # todos menos el último
-                    nuevo_destino = visita[-1]  # último elemento
-                    
-                    ruta_dict["origen"] = nuevo_origen
-                    ruta_dict["visita"] = nueva_visita
-                    ruta_dict["destino"] = nuevo_destino
-                    
-                    # Verificar si la ruta queda con al menos 2 nodos
-                    if self._ruta_tiene_al_menos_dos_nodos(ruta_dict):
-                        nuevas_rutas.append(ruta_dict)
-                        print(f"  -> Nuevo destino: {nuevo_destino.get('id')}")
-                    else:
-                        print("  -> Ruta eliminada (queda con menos de 2 nodos)")
-                else:
-                    # No hay visita, el origen pasa a ser el nuevo destino
-                    if origen:
-                        ruta_dict["origen"] = None
-                        ruta_dict["visita"] = []
-                        ruta_dict["destino"] = origen
-                        
-                        # Verificar si la ruta queda con al menos 2 nodos
-                        if self._ruta_tiene_al_menos_dos_nodos(ruta_dict):
-                            nuevas_rutas.append(ruta_dict)
-                            print(f"  -> Origen {origen.get('id')} pasa a ser destino")
-                        else:
-                            print("  -> Ruta eliminada (queda con solo un nodo)")
-                    else:
-                        # No hay origen, la ruta queda inválida - se elimina
-                        print("  -> Ruta eliminada (sin origen ni destino válido)")
-            
-            elif posicion_en_ruta.startswith("visita_"):
-                # Si es intermedio: eliminar de la visita y mantener conexión
-                posicion = int(posicion_en_ruta.split("_")[1])
-                
-                nuevo_origen = origen
-                nueva_visita = [n for i, n in enumerate(visita) if i != posicion]
-                nuevo_destino = destino
-                
-                ruta_dict["origen"] = nuevo_origen
-                ruta_dict["visita"] = nueva_visita
-                ruta_dict["destino"] = nuevo_destino
-                
-                # Verificar si la ruta queda con al menos 2 nodos
-                if self._ruta_tiene_al_menos_dos_nodos(ruta_dict):
-                    nuevas_rutas.append(ruta_dict)
-                    print(f"  -> Nodo intermedio eliminado de visita, nueva longitud: {len(nueva_visita)}")
-                else:
-                    print("  -> Ruta eliminada (queda con menos de 2 nodos después de eliminar visita)")
-            
+        # Solo se recorren las rutas que contienen el nodo (índice inverso del proyecto)
+        rutas_a_eliminar = []
+
+        for ruta_idx in self.proyecto.rutas_con_nodo(nodo_id_eliminado):
+            ruta = self.proyecto.rutas[ruta_idx]
+            posiciones = sorted(pos for idx, pos in self.proyecto.posiciones_nodo(nodo_id_eliminado) if idx == ruta_idx)
+            print(f"Reconfigurando ruta {ruta_idx} - Nodo eliminado en posiciones: {posiciones}")
+
+            ruta.set_ids([nodo_id for nodo_id in ruta if nodo_id != nodo_id_eliminado])
+
+            if self._ruta_tiene_al_menos_dos_nodos(ruta):
+                self.proyecto.reemplazar_ruta(ruta_idx, ruta)
+                print(f"  -> Ruta reconectada: {ruta.ids()}")
             else:
-                # Caso por defecto - mantener la ruta si tiene al menos 2 nodos
-                if self._ruta_tiene_al_menos_dos_nodos(ruta_dict):
-                    nuevas_rutas.append(ruta)
-                else:
-                    print("  -> Ruta eliminada (queda con menos de 2 nodos)")
-        
-        # Actualizar las rutas del proyecto
-        try:
-            self.proyecto.rutas = nuevas_rutas
-        except Exception:
-            setattr(self.proyecto, "rutas", nuevas_rutas)
-        
-        # Actualizar visibilidad de rutas y relaciones
+                print("  -> Ruta eliminada (queda con menos de 2 nodos)")
+                rutas_a_eliminar.append(ruta_idx)
+
+        # Eliminar de mayor a menor índice para no desplazar las pendientes
+        for ruta_idx in reversed(rutas_a_eliminar):
+            self.proyecto.eliminar_ruta(ruta_idx)
+
+        # Actualizar visibilidad de rutas
         self.visibilidad_rutas.clear()
-        self.nodo_en_rutas.clear()
-        for idx in range(len(nuevas_rutas)):
+        for idx in range(len(self.proyecto.rutas)):
             self.visibilidad_rutas[idx] = True
-            # Reconstruir relaciones
-            self._actualizar_relaciones_nodo_ruta(idx, nuevas_rutas[idx])
-        
+
         # Redibujar rutas y actualizar UI
         try:
             self._dibujar_rutas()
@@ -3617,225 +3382,12 @@ class EditorController(QObject):
         except Exception as err:
             print("Error actualizando UI después de reconfigurar rutas:", err)
 
-    def _ruta_tiene_al_menos_dos_nodos(self, ruta_dict):
+    def _ruta_tiene_al_menos_dos_nodos(self, ruta):
         """
-        Verifica si una ruta tiene al menos 2 nodos (origen, destino o nodos en visita).
+        Verifica si una ruta tiene al menos 2 nodos.
         Una ruta necesita al menos 2 nodos para poder trazar líneas entre ellos.
         """
-        try:
-            # Contar nodos en origen, destino y visita
-            count = 0
-            
-            if ruta_dict.get("origen") is not None:
-                count += 1
-            
-            if ruta_dict.get("destino") is not None:
-                count += 1
-            
-            count += len(ruta_dict.get("visita", []) or [])
-            
-            return count >= 2
-        except Exception:
-            return False
-
-    # --- Normalizador mejorado para rutas ---
-    def _normalize_route_nodes(self, ruta_dict):
-        """
-        RECONSTRUYE COMPLETAMENTE las referencias de nodos en las rutas
-        usando los nodos actuales del proyecto. VERSIÓN CORREGIDA.
-        """
-        try:
-            # 1. NORMALIZAR ORIGEN - Buscar el nodo actual en self.proyecto.nodos
-            origen = ruta_dict.get("origen")
-            if origen:
-                if isinstance(origen, dict) and 'id' in origen:
-                    origen_id = origen['id']
-                    
-                    # Buscar el nodo ACTUAL en el proyecto
-                    nodo_actual = None
-                    for nodo in getattr(self.proyecto, "nodos", []):
-                        try:
-                            # Usar nodo.get() para objetos Nodo
-                            if hasattr(nodo, 'get'):
-                                if nodo.get('id') == origen_id:
-                                    nodo_actual = nodo
-                                    break
-                            elif isinstance(nodo, dict) and nodo.get('id') == origen_id:
-                                nodo_actual = nodo
-                                break
-                        except Exception as e:
-                            continue
-                    
-                    if nodo_actual:
-                        # Actualizar las coordenadas del origen con las del nodo actual
-                        if hasattr(nodo_actual, 'get'):
-                            origen['X'] = nodo_actual.get('X')
-                            origen['Y'] = nodo_actual.get('Y')
-                        else:
-                            origen['X'] = nodo_actual.get('X', origen.get('X', 0))
-                            origen['Y'] = nodo_actual.get('Y', origen.get('Y', 0))
-                        ruta_dict["origen"] = origen
-            
-            # 2. NORMALIZAR DESTINO 
-            destino = ruta_dict.get("destino")
-            if destino:
-                if isinstance(destino, dict) and 'id' in destino:
-                    destino_id = destino['id']
-                    
-                    # Buscar el nodo ACTUAL en el proyecto
-                    nodo_actual = None
-                    for nodo in getattr(self.proyecto, "nodos", []):
-                        try:
-                            # Usar nodo.get() para objetos Nodo
-                            if hasattr(nodo, 'get'):
-                                if nodo.get('id') == destino_id:
-                                    nodo_actual = nodo
-                                    break
-                            elif isinstance(nodo, dict) and nodo.get('id') == destino_id:
-                                nodo_actual = nodo
-                                break
-                        except Exception as e:
-                            continue
-                    
-                    if nodo_actual:
-                        # Actualizar las coordenadas del destino con las del nodo actual
-                        if hasattr(nodo_actual, 'get'):
-                            destino['X'] = nodo_actual.get('X')
-                            destino['Y'] = nodo_actual.get('Y')
-                        else:
-                            destino['X'] = nodo_actual.get('X', destino.get('X', 0))
-                            destino['Y'] = nodo_actual.get('Y', destino.get('Y', 0))
-                        ruta_dict["destino"] = destino
-            
-            # 3. NORMALIZAR VISITA
-            visita = ruta_dict.get("visita", []) or []
-            nueva_visita = []
-            
-            for v in visita:
-                if isinstance(v, dict) and 'id' in v:
-                    visita_id = v['id']
-                    
-                    # Buscar el nodo ACTUAL en el proyecto
-                    nodo_actual = None
-                    for nodo in getattr(self.proyecto, "nodos", []):
-                        try:
-                            # Usar nodo.get() para objetos Nodo
-                            if hasattr(nodo, 'get'):
-                                if nodo.get('id') == visita_id:
-                                    nodo_actual = nodo
-                                    break
-                            elif isinstance(nodo, dict) and nodo.get('id') == visita_id:
-                                nodo_actual = nodo
-                                break
-                        except Exception as e:
-                            continue
-                    
-                    if nodo_actual:
-                        # Actualizar las coordenadas de la visita con las del nodo actual
-                        if hasattr(nodo_actual, 'get'):
-                            v['X'] = nodo_actual.get('X')
-                            v['Y'] = nodo_actual.get('Y')
-                        else:
-                            v['X'] = nodo_actual.get('X', v.get('X', 0))
-                            v['Y'] = nodo_actual.get('Y', v.get('Y', 0))
-                        nueva_visita.append(v)
-                    else:
-                        nueva_visita.append(v)
-                else:
-                    nueva_visita.append(v)
-            
-            ruta_dict["visita"] = nueva_visita
-            
-        except Exception as e:
-            print(f"ERROR CRÍTICO en _normalize_route_nodes: {e}")
-
-    # --- MÉTODOS NUEVOS PARA REPARACIÓN DE REFERENCIAS ---
-    
-    def _reparar_referencias_rutas(self):
-        """
-        REPARA LAS RUTAS: Asegura que todos los nodos en las rutas existan en el proyecto
-        y actualiza las referencias con los nodos actuales. VERSIÓN CORREGIDA.
-        """
-        if not hasattr(self.proyecto, "nodos") or not hasattr(self.proyecto, "rutas"):
-            return
-
-        # Crear mapa de nodos por ID para búsqueda rápida 
-        mapa_nodos = {}
-        for nodo in self.proyecto.nodos:
-            try:
-                # CORRECCIÓN: Usar nodo.get() para objetos Nodo
-                if hasattr(nodo, 'get'):
-                    nodo_id = nodo.get('id')
-                else:
-                    nodo_id = nodo.get('id') if isinstance(nodo, dict) else None
-                    
-                if nodo_id is not None:
-                    mapa_nodos[nodo_id] = nodo
-            except Exception as e:
-                pass
-
-        for ruta_idx, ruta in enumerate(self.proyecto.rutas):
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                
-                # Reparar ORIGEN 
-                origen = ruta_dict.get("origen")
-                if origen and isinstance(origen, dict) and 'id' in origen:
-                    origen_id = origen['id']
-                    if origen_id in mapa_nodos:
-                        # Actualizar coordenadas en lugar de reemplazar el objeto
-                        nodo_actual = mapa_nodos[origen_id]
-                        if hasattr(nodo_actual, 'get'):
-                            origen['X'] = nodo_actual.get('X')
-                            origen['Y'] = nodo_actual.get('Y')
-                        else:
-                            origen['X'] = nodo_actual.get('X', origen.get('X', 0))
-                            origen['Y'] = nodo_actual.get('Y', origen.get('Y', 0))
-                
-                # Reparar DESTINO 
-                destino = ruta_dict.get("destino")
-                if destino and isinstance(destino, dict) and 'id' in destino:
-                    destino_id = destino['id']
-                    if destino_id in mapa_nodos:
-                        # Actualizar coordenadas en lugar de reemplazar el objeto
-                        nodo_actual = mapa_nodos[destino_id]
-                        if hasattr(nodo_actual, 'get'):
-                            destino['X'] = nodo_actual.get('X')
-                            destino['Y'] = nodo_actual.get('Y')
-                        else:
-                            destino['X'] = nodo_actual.get('X', destino.get('X', 0))
-                            destino['Y'] = nodo_actual.get('Y', destino.get('Y', 0))
-                
-                # Reparar VISITA
-                visita = ruta_dict.get("visita", [])
-                nueva_visita = []
-                for v in visita:
-                    if isinstance(v, dict) and 'id' in v:
-                        visita_id = v['id']
-                        if visita_id in mapa_nodos:
-                            # Actualizar coordenadas en lugar de reemplazar el objeto
-                            nodo_actual = mapa_nodos[visita_id]
-                            if hasattr(nodo_actual, 'get'):
-                                v['X'] = nodo_actual.get('X')
-                                v['Y'] = nodo_actual.get('Y')
-                            else:
-                                v['X'] = nodo_actual.get('X', v.get('X', 0))
-                                v['Y'] = nodo_actual.get('Y', v.get('Y', 0))
-                            nueva_visita.append(v)
-                        else:
-                            nueva_visita.append(v)
-                    else:
-                        nueva_visita.append(v)
-                
-                ruta_dict["visita"] = nueva_visita
-                
-                # Actualizar la ruta en el proyecto
-                self.proyecto.rutas[ruta_idx] = ruta_dict
-                    
-            except Exception as e:
-                print(f"Error reparando ruta {ruta_idx}: {e}")
-
-    # --- Actualizar líneas cuando un nodo se mueve ---
+        return len(ruta) >= 2
     def on_nodo_moved(self, nodo_item):
         """Versión CORREGIDA para actualización en tiempo real durante arrastre"""
         try:
@@ -3874,15 +3426,6 @@ class EditorController(QObject):
                 nodo_id = getattr(nodo_item, "nodo_id", None)
                 print(f"DEBUG on_nodo_moved: Obteniendo de nodo_item.nodo_id={nodo_id}")
             
-            # Método 3: Último recurso - buscar en el proyecto
-            if nodo_id is None and self.proyecto:
-                for n in self.proyecto.nodos:
-                    # Comparar por referencia o por posición
-                    if n is nodo or (isinstance(n, dict) and n.get('X') == x and n.get('Y') == y):
-                        nodo_id = n.get('id') if isinstance(n, dict) else getattr(n, 'id', None)
-                        print(f"DEBUG on_nodo_moved: Encontrado por referencia, id={nodo_id}")
-                        break
-
             if nodo_id is None:
                 print(f"ERROR: No se pudo obtener ID del nodo. Tipo nodo: {type(nodo)}")
                 # Intentar una última opción: si el nodo tiene __dict__
@@ -3910,69 +3453,19 @@ class EditorController(QObject):
         if not getattr(self, "proyecto", None) or not hasattr(self.proyecto, "rutas"):
             print("DEBUG: No hay proyecto o rutas")
             return
-        
+
         print(f"DEBUG: Actualizando rutas para nodo {nodo_id} en ({x}, {y})")
-        
-        # Buscar todas las rutas que contienen este nodo
-        rutas_a_actualizar = []
-        for idx, ruta in enumerate(self.proyecto.rutas):
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                
-                # Verificar si la ruta contiene el nodo movido
-                contiene_nodo = False
-                
-                # Función auxiliar para comparar IDs
-                def comparar_ids(nodo_ruta, target_id):
-                    if nodo_ruta is None:
-                        return False
-                    if isinstance(nodo_ruta, dict):
-                        return nodo_ruta.get("id") == target_id
-                    elif hasattr(nodo_ruta, "get"):
-                        return nodo_ruta.get("id") == target_id
-                    elif hasattr(nodo_ruta, "id"):
-                        return getattr(nodo_ruta, "id") == target_id
-                    return False
-                
-                # Verificar origen
-                if ruta_dict.get("origen") and comparar_ids(ruta_dict["origen"], nodo_id):
-                    contiene_nodo = True
-                    print(f"DEBUG: Ruta {idx} contiene nodo {nodo_id} como ORIGEN")
-                
-                # Verificar destino
-                if not contiene_nodo and ruta_dict.get("destino") and comparar_ids(ruta_dict["destino"], nodo_id):
-                    contiene_nodo = True
-                    print(f"DEBUG: Ruta {idx} contiene nodo {nodo_id} como DESTINO")
-                
-                # Verificar visita
-                if not contiene_nodo:
-                    for nodo_visita in ruta_dict.get("visita", []):
-                        if comparar_ids(nodo_visita, nodo_id):
-                            contiene_nodo = True
-                            print(f"DEBUG: Ruta {idx} contiene nodo {nodo_id} en VISITA")
-                            break
-                
-                if contiene_nodo:
-                    rutas_a_actualizar.append((idx, ruta_dict))
-            except Exception as e:
-                print(f"Error verificando ruta {idx}: {e}")
-                continue
-        
+
+        # Rutas que contienen este nodo según el índice inverso del proyecto
+        rutas_a_actualizar = [(idx, self.proyecto.rutas[idx]) for idx in self.proyecto.rutas_con_nodo(nodo_id)]
+
         # Si no hay rutas que actualizar, salir
         if not rutas_a_actualizar:
             print(f"DEBUG: No se encontraron rutas que contengan el nodo {nodo_id}")
-            # Mostrar todas las rutas para debug
-            print("DEBUG: Rutas disponibles:")
-            for idx, ruta in enumerate(self.proyecto.rutas):
-                try:
-                    ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                    print(f"  Ruta {idx}: {ruta_dict}")
-                except:
-                    print(f"  Ruta {idx}: ERROR al convertir")
             return
-        
+
         print(f"DEBUG: Encontradas {len(rutas_a_actualizar)} rutas para actualizar")
-        
+
         # Actualizar las líneas de TODAS las rutas afectadas
         self._actualizar_lineas_rutas_en_tiempo_real(rutas_a_actualizar, nodo_id, x, y)
 
@@ -3990,304 +3483,25 @@ class EditorController(QObject):
         return None
 
     def _actualizar_lineas_rutas_en_tiempo_real(self, rutas_info, nodo_id, x, y):
-        base_pen = QPen(Qt.red, 2)
-        base_pen.setCosmetic(True)
-        
-        # Eliminar líneas de las rutas afectadas
-        for idx, ruta_dict in rutas_info:
-            if idx < len(self._route_lines):
-                for line_item in self._route_lines[idx]:
-                    try:
-                        if line_item and line_item.scene() is not None:
-                            self.scene.removeItem(line_item)
-                    except Exception:
-                        pass
-                self._route_lines[idx] = []
-        
-        for idx, ruta_dict in rutas_info:
-            ruta_actualizada = dict(ruta_dict)
-            self._actualizar_coordenadas_en_ruta(ruta_actualizada, nodo_id, x, y)
-            puntos = self._obtener_puntos_de_ruta(ruta_actualizada)
-            
-            if len(puntos) < 2 or not self._ruta_es_visible(ruta_actualizada):
-                continue
-            
-            route_line_items = []
-            for i in range(len(puntos) - 1):
-                n1, n2 = puntos[i], puntos[i + 1]
-                
-                # --- OBTENER ES_CURVA DEL NODO ACTUAL ---
-                es_curva_valor = 0
-                # Extraer ID del nodo destino
-                nodo_id_dest = None
-                if isinstance(n2, dict):
-                    nodo_id_dest = n2.get('id')
-                elif hasattr(n2, 'get'):
-                    nodo_id_dest = n2.get('id')
-                
-                if nodo_id_dest is not None:
-                    nodo_actual = self._obtener_nodo_actual(nodo_id_dest)
-                    if nodo_actual:
-                        raw = nodo_actual.get('Tipo_curva', 0)
-                        try:
-                            es_curva_valor = int(raw)
-                        except (ValueError, TypeError):
-                            es_curva_valor = 0
-                # -----------------------------------------
-                
-                segment_pen = QPen(base_pen)
-                if es_curva_valor != 0:
-                    segment_pen.setStyle(Qt.DashLine)
-                else:
-                    segment_pen.setStyle(Qt.SolidLine)
-                
-                try:
-                    x1 = self._obtener_coordenada_x(n1)
-                    y1 = self._obtener_coordenada_y(n1)
-                    x2 = self._obtener_coordenada_x(n2)
-                    y2 = self._obtener_coordenada_y(n2)
-                    
-                    if x1 is not None and y1 is not None and x2 is not None and y2 is not None:
-                        line_item = self.scene.addLine(x1, y1, x2, y2, segment_pen)
-                        line_item.setZValue(0.5)
-                        line_item.setData(0, ("route_line", idx, i))
-                        line_item.setVisible(True)
-                        route_line_items.append(line_item)
-                except Exception as e:
-                    print(f"Error dibujando segmento {i}: {e}")
-                    continue
-            
-            while len(self._route_lines) <= idx:
-                self._route_lines.append([])
-            self._route_lines[idx] = route_line_items
-        
-        self.view.marco_trabajo.viewport().update()
-
-    def _actualizar_coordenadas_en_ruta(self, ruta_dict, nodo_id, x, y):
-        """Actualiza las coordenadas de un nodo específico en una ruta"""
-        # Actualizar origen
-        if ruta_dict.get("origen") and self._obtener_id_de_nodo(ruta_dict["origen"]) == nodo_id:
-            if isinstance(ruta_dict["origen"], dict):
-                ruta_dict["origen"]["X"] = x
-                ruta_dict["origen"]["Y"] = y
-            elif hasattr(ruta_dict["origen"], "update"):
-                ruta_dict["origen"].update({"X": x, "Y": y})
-        
-        # Actualizar destino
-        elif ruta_dict.get("destino") and self._obtener_id_de_nodo(ruta_dict["destino"]) == nodo_id:
-            if isinstance(ruta_dict["destino"], dict):
-                ruta_dict["destino"]["X"] = x
-                ruta_dict["destino"]["Y"] = y
-            elif hasattr(ruta_dict["destino"], "update"):
-                ruta_dict["destino"].update({"X": x, "Y": y})
-        
-        # Actualizar visita
-        else:
-            for nodo_visita in ruta_dict.get("visita", []):
-                if self._obtener_id_de_nodo(nodo_visita) == nodo_id:
-                    if isinstance(nodo_visita, dict):
-                        nodo_visita["X"] = x
-                        nodo_visita["Y"] = y
-                    elif hasattr(nodo_visita, "update"):
-                        nodo_visita.update({"X": x, "Y": y})
-                    break
-
-    def _obtener_puntos_de_ruta(self, ruta_dict):
-        """Obtiene todos los puntos de una ruta en orden"""
-        puntos = []
-        
-        if ruta_dict.get("origen"):
-            puntos.append(ruta_dict["origen"])
-        
-        if ruta_dict.get("visita"):
-            puntos.extend(ruta_dict["visita"])
-        
-        if ruta_dict.get("destino"):
-            puntos.append(ruta_dict["destino"])
-        
-        return puntos
+        # Solo se mueven los vértices del nodo en el RutaItem de cada ruta;
+        # las rutas ocultas (sin RutaItem) o que saltan el nodo no cambian
+        for idx, ruta in rutas_info:
+            route_item = self._route_lines[idx] if idx < len(self._route_lines) else None
+            if self._item_en_escena(route_item):
+                route_item.mover_nodo(nodo_id, x, y)
 
-    def _ruta_es_visible(self, ruta_dict):
-        """Verifica si todos los nodos de una ruta están visibles"""
-        puntos = self._obtener_puntos_de_ruta(ruta_dict)
-        
-        for punto in puntos:
-            nodo_id = self._obtener_id_de_nodo(punto)
-            if nodo_id is not None and not self.visibilidad_nodos.get(nodo_id, True):
-                return False
-        
-        return True
-
-    def _obtener_coordenada_x(self, nodo):
-        """Obtiene la coordenada X de un nodo de manera segura"""
-        if isinstance(nodo, dict):
-            return nodo.get("X", 0)
-        elif hasattr(nodo, "get"):
-            return nodo.get("X", 0)
-        elif hasattr(nodo, "X"):
-            return getattr(nodo, "X", 0)
-        return 0
-
-    def _obtener_coordenada_y(self, nodo):
-        """Obtiene la coordenada Y de un nodo de manera segura"""
-        if isinstance(nodo, dict):
-            return nodo.get("Y", 0)
-        elif hasattr(nodo, "get"):
-            return nodo.get("Y", 0)
-        elif hasattr(nodo, "Y"):
-            return getattr(nodo, "Y", 0)
-        return 0
-
-    def _actualizar_rutas_con_nodo(self, nodo_id, nueva_x, nueva_y):
-        """Actualiza solo las rutas que contienen el nodo movido (más eficiente)"""
-        if not getattr(self, "proyecto", None) or not hasattr(self.proyecto, "rutas"):
-            return
-        
-        # Buscar rutas que contienen este nodo
-        rutas_a_actualizar = []
-        for idx, ruta in enumerate(self.proyecto.rutas):
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                self._normalize_route_nodes(ruta_dict)
-                
-                # Verificar si la ruta contiene el nodo movido
-                contiene_nodo = False
-                if ruta_dict.get("origen") and ruta_dict["origen"].get("id") == nodo_id:
-                    contiene_nodo = True
-                elif ruta_dict.get("destino") and ruta_dict["destino"].get("id") == nodo_id:
-                    contiene_nodo = True
-                else:
-                    for nodo_visita in ruta_dict.get("visita", []):
-                        if nodo_visita.get("id") == nodo_id:
-                            contiene_nodo = True
-                            break
-                
-                if contiene_nodo:
-                    rutas_a_actualizar.append(idx)
-            except Exception:
-                continue
-        
-        # Actualizar solo las líneas de las rutas afectadas
-        self._actualizar_lineas_rutas_especificas(rutas_a_actualizar, nodo_id, nueva_x, nueva_y)
-
-    def _actualizar_lineas_rutas_especificas(self, indices_rutas, nodo_id=None, nueva_x=None, nueva_y=None):
-        """Actualiza solo las líneas de las rutas especificadas por sus índices"""
-        if not indices_rutas:
-            return
-        
-        # Eliminar líneas de estas rutas específicas
-        for idx in indices_rutas:
-            if idx < len(self._route_lines):
-                for line_item in self._route_lines[idx]:
-                    try:
-                        if line_item and line_item.scene() is not None:
-                            self.scene.removeItem(line_item)
-                    except Exception:
-                        pass
-                self._route_lines[idx] = []
-        
-        # Volver a dibujar estas rutas
-        pen = QPen(Qt.red, 2)
-        pen.setCosmetic(True)
-        
-        for idx in indices_rutas:
-            if idx >= len(self.proyecto.rutas):
-                continue
-                
-            ruta = self.proyecto.rutas[idx]
-            
-            # Verificar si la ruta está visible
-            if not self.visibilidad_rutas.get(idx, True):
-                continue
-                
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-
-            self._normalize_route_nodes(ruta_dict)
-            
-            # Si estamos actualizando un nodo específico, actualizar sus coordenadas en la ruta
-            if nodo_id and nueva_x is not None and nueva_y is not None:
-                if ruta_dict.get("origen") and ruta_dict["origen"].get("id") == nodo_id:
-                    ruta_dict["origen"]["X"] = nueva_x
-                    ruta_dict["origen"]["Y"] = nueva_y
-                elif ruta_dict.get("destino") and ruta_dict["destino"].get("id") == nodo_id:
-                    ruta_dict["destino"]["X"] = nueva_x
-                    ruta_dict["destino"]["Y"] = nueva_y
-                else:
-                    for nodo_visita in ruta_dict.get("visita", []):
-                        if nodo_visita.get("id") == nodo_id:
-                            nodo_visita["X"] = nueva_x
-                            nodo_visita["Y"] = nueva_y
-                            break
-            
-            # Obtener puntos
-            puntos = []
-            if ruta_dict.get("origen"):
-                puntos.append(ruta_dict["origen"])
-            puntos.extend(ruta_dict.get("visita", []) or [])
-            if ruta_dict.get("destino"):
-                puntos.append(ruta_dict["destino"])
-
-            if len(puntos) < 2:
-                continue
-
-            # Verificar que todos los nodos de la ruta estén visibles
-            todos_visibles = True
-            for punto in puntos:
-                if isinstance(punto, dict):
-                    nodo_id_punto = punto.get('id')
-                    if nodo_id_punto is not None and not self.visibilidad_nodos.get(nodo_id_punto, True):
-                        todos_visibles = False
-                        break
-            
-            if not todos_visibles:
-                continue
-
-            route_line_items = []
-            for i in range(len(puntos) - 1):
-                n1, n2 = puntos[i], puntos[i + 1]
-                
-                try:
-                    x1 = n1.get("X", 0) if isinstance(n1, dict) else getattr(n1, "X", 0)
-                    y1 = n1.get("Y", 0) if isinstance(n1, dict) else getattr(n1, "Y", 0)
-                    x2 = n2.get("X", 0) if isinstance(n2, dict) else getattr(n2, "X", 0)
-                    y2 = n2.get("Y", 0) if isinstance(n2, dict) else getattr(n2, "Y", 0)
-                    
-                    line_item = self.scene.addLine(x1, y1, x2, y2, pen)
-                    line_item.setZValue(0.5)
-                    line_item.setData(0, ("route_line", idx, i))
-                    line_item.setVisible(True)
-                    
-                    route_line_items.append(line_item)
-                    
-                except Exception:
-                    continue
-            
-            if idx >= len(self._route_lines):
-                self._route_lines.extend([[]] * (idx - len(self._route_lines) + 1))
-            
-            self._route_lines[idx] = route_line_items
-
-        # Forzar actualización de la vista
-        self.view.marco_trabajo.viewport().update()
-
-    # --- Utilidades para líneas y rutas ---
     def _clear_route_lines(self):
         """
         Elimina todas las líneas de rutas guardadas en self._route_lines de la escena.
         Versión mejorada.
         """
         try:
-            # eliminar líneas rojas
-            for route_lines in getattr(self, "_route_lines", []) or []:
-                for li in (route_lines or []):
-                    try:
-                        if li and li.scene() is not None:
-                            self.scene.removeItem(li)
-                    except Exception:
-                        pass
+            # eliminar las rutas (un RutaItem por ruta)
+            for route_item in getattr(self, "_route_lines", []) or []:
+                try:
+                    self._quitar_item_de_escena(route_item)
+                except Exception:
+                    pass
         except Exception:
             pass
         
@@ -4325,10 +3539,9 @@ class EditorController(QObject):
         if event.type() == QEvent.MouseMove:
             # Obtener posición actual del ratón
             pos = self.view.marco_trabajo.mapToScene(event.pos())
-            items = self.scene.items(pos)
             
-            # Verificar si hay nodos en la posición actual
-            hay_nodo = any(isinstance(it, NodoItem) for it in items)
+            # Verificar si hay nodos en la posición actual (índice espacial)
+            hay_nodo = bool(self._nodo_items_en_posicion(pos.x(), pos.y()))
             
             # Actualizar estado de hover
             if hay_nodo and not self._cursor_sobre_nodo:
@@ -4353,8 +3566,7 @@ class EditorController(QObject):
                 return False  # Dejar que el controlador respectivo maneje el clic
             
             # SEGUNDO: Comportamiento normal (solo si NO estamos en modo ruta o colocar)
-            items = self.scene.items(pos)
-            if not any(isinstance(it, NodoItem) for it in items):
+            if not self._nodo_items_en_posicion(pos.x(), pos.y()):
                 # Click fuera de nodo
                 print("CLICK FUERA DE NODO - Forzar estado normal")
                 
@@ -4456,14 +3668,9 @@ class EditorController(QObject):
         print(f"Rutas en proyecto: {len(getattr(self.proyecto, 'rutas', []))}")
         for i, ruta in enumerate(getattr(self.proyecto, "rutas", [])):
             try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                origen = ruta_dict.get("origen", {})
-                destino = ruta_dict.get("destino", {})
-                
-                # Usar .get() para diccionarios
-                origen_id = origen.get("id", "N/A") if isinstance(origen, dict) else "N/A"
-                destino_id = destino.get("id", "N/A") if isinstance(destino, dict) else "N/A"
-                print(f"  Ruta {i}: Origen {origen_id} -> Destino {destino_id}")
+                origen_id = ruta.origen_id if ruta.origen_id is not None else "N/A"
+                destino_id = ruta.destino_id if ruta.destino_id is not None else "N/A"
+                print(f"  Ruta {i}: Origen {origen_id} -> Destino {destino_id} ({len(ruta)} nodos)")
             except Exception as e:
                 print(f"  Ruta {i}: ERROR - {e}")
         
@@ -4489,9 +3696,6 @@ class EditorController(QObject):
             self.visibilidad_rutas[idx] = True  # Inicialmente visibles
             print(f"  - Ruta {idx}: visibilidad = True")
             
-        # Inicializar relaciones nodo-ruta
-        self._actualizar_todas_relaciones_nodo_ruta()
-        
         # Actualizar listas con widgets
         self._actualizar_lista_nodos_con_widgets()
         self._actualizar_lista_rutas_con_widgets()
@@ -4684,80 +3888,18 @@ class EditorController(QObject):
             self.view.btnMostrarTodo.setEnabled(True)
             self.view.btnMostrarTodo.setText("Ocultar Rutas")
     
-    def _actualizar_todas_relaciones_nodo_ruta(self):
-        """Actualiza todas las relaciones entre nodos y rutas"""
-        self.nodo_en_rutas.clear()
-        
-        for idx, ruta in enumerate(self.proyecto.rutas):
-            self._actualizar_relaciones_nodo_ruta(idx, ruta)
-    
-    def _actualizar_relaciones_nodo_ruta(self, ruta_idx, ruta):
-        """Actualiza las relaciones para una ruta específica"""
-        try:
-            ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-        except Exception:
-            ruta_dict = ruta
-        
-        self._normalize_route_nodes(ruta_dict)
-        
-        # Obtener todos los nodos de la ruta
-        nodos = []
-        if ruta_dict.get("origen"):
-            nodos.append(ruta_dict["origen"])
-        nodos.extend(ruta_dict.get("visita", []) or [])
-        if ruta_dict.get("destino"):
-            nodos.append(ruta_dict["destino"])
-        
-        # Actualizar relaciones
-        for nodo in nodos:
-            if isinstance(nodo, dict):
-                nodo_id = nodo.get('id')
-                if nodo_id is not None:
-                    if nodo_id not in self.nodo_en_rutas:
-                        self.nodo_en_rutas[nodo_id] = []
-                    if ruta_idx not in self.nodo_en_rutas[nodo_id]:
-                        self.nodo_en_rutas[nodo_id].append(ruta_idx)
-    
     def _obtener_nodo_actual(self, nodo_id):
         """Devuelve el nodo actual del proyecto dado su ID, o None si no existe."""
-        for nodo in self.proyecto.nodos:
-            if nodo.get('id') == nodo_id:
-                return nodo
-        return None
+        return self.proyecto.obtener_nodo(nodo_id)
 
     def _obtener_nodos_de_ruta(self, ruta_idx, solo_visibles=False):
         """Obtiene todos los nodos de una ruta específica, opcionalmente solo los visibles"""
         if ruta_idx >= len(self.proyecto.rutas):
             return []
-        
-        ruta = self.proyecto.rutas[ruta_idx]
-        try:
-            ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-        except Exception:
-            ruta_dict = ruta
-        
-        self._normalize_route_nodes(ruta_dict)
-        
-        nodos = []
-        
-        # Origen
-        origen = ruta_dict.get("origen")
-        if origen:
-            if not solo_visibles or (isinstance(origen, dict) and self.visibilidad_nodos.get(origen.get('id'), True)):
-                nodos.append(origen)
-        
-        # Visita
-        visita = ruta_dict.get("visita", []) or []
-        for nodo_visita in visita:
-            if not solo_visibles or (isinstance(nodo_visita, dict) and self.visibilidad_nodos.get(nodo_visita.get('id'), True)):
-                nodos.append(nodo_visita)
-        
-        # Destino
-        destino = ruta_dict.get("destino")
-        if destino:
-            if not solo_visibles or (isinstance(destino, dict) and self.visibilidad_nodos.get(destino.get('id'), True)):
-                nodos.append(destino)
-        
+
+        nodos = self.proyecto.nodos_de_ruta(self.proyecto.rutas[ruta_idx])
+        if solo_visibles:
+            nodos = [n for n in nodos if self.visibilidad_nodos.get(n.get('id'), True)]
         return nodos
     
     def _actualizar_lista_nodos_con_widgets(self):
@@ -4777,27 +3919,14 @@ class EditorController(QObject):
         self.view.rutasList.clear()
         
         for idx, ruta in enumerate(self.proyecto.rutas):
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-
-            # Normalizar para obtener ids legibles
-            self._normalize_route_nodes(ruta_dict)
-            origen = ruta_dict.get("origen")
-            destino = ruta_dict.get("destino")
-
-            origen_id = origen.get("id", "?") if isinstance(origen, dict) else str(origen)
-            destino_id = destino.get("id", "?") if isinstance(destino, dict) else str(destino)
-            
-            # Obtener el nombre de la ruta, por defecto "Ruta"
-            nombre_ruta = ruta_dict.get("nombre", "Ruta")
+            origen_id = ruta.origen_id if ruta.origen_id is not None else "?"
+            destino_id = ruta.destino_id if ruta.destino_id is not None else "?"
             
             # Texto en formato: "nombre: id_origen -> id_destino"
-            item_text = f"{nombre_ruta}: {origen_id}→{destino_id}"
+            item_text = f"{ruta.nombre}: {origen_id}→{destino_id}"
             
             item = QListWidgetItem()
-            item.setData(Qt.UserRole, ruta_dict)
+            item.setData(Qt.UserRole, ruta)
             item.setFlags(item.flags() | Qt.ItemIsSelectable | Qt.ItemIsEnabled)
             item.setSizeHint(QSize(0, 24))
             
@@ -4911,7 +4040,7 @@ class EditorController(QObject):
                     break
         
         # Obtener lista de rutas que contienen este nodo
-        rutas_con_nodo = self.nodo_en_rutas.get(nodo_id, [])
+        rutas_con_nodo = self.proyecto.rutas_con_nodo(nodo_id)
         
         if not nuevo_estado:
             # Si estamos OCULTANDO el nodo
@@ -4960,53 +4089,6 @@ class EditorController(QObject):
         print(f"✓ Visibilidad nodo {nodo_id}: {nuevo_estado}")
         print(f"  Rutas reconstruidas: {[i for i in rutas_con_nodo if i < len(self.rutas_para_dibujo) and self.rutas_para_dibujo[i]]}")
         
-    def _actualizar_relaciones_nodo_visible(self, nodo_id):
-        """Reconstruye relaciones cuando un nodo se vuelve visible"""
-        if not self.proyecto:
-            return
-        
-        # Limpiar relaciones antiguas
-        if nodo_id in self.nodo_en_rutas:
-            self.nodo_en_rutas[nodo_id] = []
-        
-        # Buscar en todas las rutas si contienen este nodo
-        for idx, ruta in enumerate(self.proyecto.rutas):
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-            
-            self._normalize_route_nodes(ruta_dict)
-            
-            # Verificar si la ruta contiene el nodo
-            nodo_encontrado = False
-            
-            # Verificar origen
-            origen = ruta_dict.get("origen")
-            if origen and isinstance(origen, dict) and origen.get('id') == nodo_id:
-                nodo_encontrado = True
-            
-            # Verificar destino
-            destino = ruta_dict.get("destino")
-            if not nodo_encontrado and destino and isinstance(destino, dict) and destino.get('id') == nodo_id:
-                nodo_encontrado = True
-            
-            # Verificar visita
-            if not nodo_encontrado:
-                for nodo_visita in ruta_dict.get("visita", []):
-                    if isinstance(nodo_visita, dict) and nodo_visita.get('id') == nodo_id:
-                        nodo_encontrado = True
-                        break
-            
-            # Si la ruta contiene el nodo, agregar a relaciones
-            if nodo_encontrado:
-                if nodo_id not in self.nodo_en_rutas:
-                    self.nodo_en_rutas[nodo_id] = []
-                if idx not in self.nodo_en_rutas[nodo_id]:
-                    self.nodo_en_rutas[nodo_id].append(idx)
-        
-        print(f"✓ Relaciones actualizadas para nodo {nodo_id}: {self.nodo_en_rutas.get(nodo_id, [])}")
-
     def toggle_visibilidad_ruta(self, ruta_index):
         """Alterna la visibilidad de una ruta específica (SOLO líneas, como el botón global)"""
         if not self.proyecto or ruta_index >= len(self.proyecto.rutas):
@@ -5034,7 +4116,7 @@ class EditorController(QObject):
             # Restaurar colores normales de los nodos de esta ruta (pero los nodos siguen visibles)
             nodos_ruta = self._obtener_nodos_de_ruta(ruta_index)
             for nodo in nodos_ruta:
-                if isinstance(nodo, dict):
+                if nodo is not None:
                     nodo_id = nodo.get('id')
                     if nodo_id is not None:
                         for item in self.scene.items():
@@ -5069,27 +4151,16 @@ class EditorController(QObject):
             if widget and hasattr(widget, 'ruta_index') and widget.ruta_index == ruta_index:
                 # Actualizar el texto del widget
                 ruta = self.proyecto.rutas[ruta_index]
-                try:
-                    ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                except Exception:
-                    ruta_dict = ruta
-                self._normalize_route_nodes(ruta_dict)
-                origen = ruta_dict.get("origen")
-                destino = ruta_dict.get("destino")
-                origen_id = origen.get("id", "?") if isinstance(origen, dict) else str(origen)
-                destino_id = destino.get("id", "?") if isinstance(destino, dict) else str(destino)
-                nombre_ruta = ruta_dict.get("nombre", "Ruta")
-                item_text = f"{nombre_ruta}: {origen_id}→{destino_id}"
+                origen_id = ruta.origen_id if ruta.origen_id is not None else "?"
+                destino_id = ruta.destino_id if ruta.destino_id is not None else "?"
+                item_text = f"{ruta.nombre}: {origen_id}→{destino_id}"
                 widget.lbl_texto.setText(item_text)
                 widget.set_visible(self.visibilidad_rutas.get(ruta_index, True))
                 break
     
     def obtener_nodo_por_id(self, nodo_id):
         """Busca un nodo por su ID"""
-        for nodo in self.proyecto.nodos:
-            if nodo.get('id') == nodo_id:
-                return nodo
-        return None
+        return self.proyecto.obtener_nodo(nodo_id)
     
     def obtener_ruta_por_indice(self, ruta_index):
         """Busca una ruta por su índice"""
@@ -5161,6 +4232,23 @@ class EditorController(QObject):
             # Llamar al exportador pasando la escala
             ExportadorDB.exportar(self.proyecto, self.view, self.ESCALA)
 
+    def importar_proyecto(self, importador):
+        """
+        Crea un proyecto sin título a partir de lo exportado a SQLite o CSV
+        (ImportadorDB / ImportadorCSV). Las exportaciones no incluyen el mapa:
+        se reutiliza el del proyecto abierto o se pide uno.
+        """
+        mapa = self.proyecto.mapa if self.proyecto and self.proyecto.mapa else ""
+        if not mapa:
+            mapa, _ = QFileDialog.getOpenFileName(
+                self.view, "Seleccionar mapa (opcional)", "", "Imagenes (*.png *.jpg *.jpeg)"
+            )
+        proyecto = importador.importar(self.view, self.ESCALA, mapa or "")
+        if proyecto is None:
+            return
+        self._cargar_proyecto_en_editor(proyecto, None)
+        print(f"✓ Proyecto importado con {len(proyecto.nodos)} nodos y {len(proyecto.rutas)} rutas")
+
     # En el método exportar_a_csv del EditorController:
     def exportar_a_csv(self):
         """Exporta el proyecto actual a archivos CSV separados."""
@@ -5490,6 +4578,7 @@ class EditorController(QObject):
         self.proyecto.ruta_agregada.connect(self._on_ruta_agregada)
         self.proyecto.ruta_modificada.connect(self._on_ruta_modificada)
         self.proyecto.proyecto_cambiado.connect(self._on_proyecto_cambiado)
+        self.proyecto.nodos_transformados.connect(self._on_nodos_transformados)
     
     def _on_nodo_agregado(self, nodo):
         """Se llama automáticamente cuando se agrega un nuevo nodo"""
@@ -5549,6 +4638,18 @@ class EditorController(QObject):
                 print(f"✓ NodoItem actualizado visualmente para nodo {nodo.get('id')}")
                 break
     
+    def _on_nodos_transformados(self, nodos):
+        """Se llama cuando una operación en bloque (trasladar, rotar, escalar...) mueve nodos"""
+        print(f"Observer: {len(nodos)} nodos transformados en bloque, actualizando UI...")
+
+        ids = {nodo.get('id') for nodo in nodos}
+        for item in self.scene.items():
+            if isinstance(item, NodoItem) and item.nodo.get('id') in ids:
+                item.actualizar_posicion()
+                item.update()  # La orientación puede cambiar sin que cambie la posición
+
+        self._dibujar_rutas()
+
     def _on_ruta_agregada(self, ruta):
         """Se llama automáticamente cuando se agrega una nueva ruta"""
         print("Observer: Ruta agregada, actualizando UI...")
@@ -5558,9 +4659,6 @@ class EditorController(QObject):
         
         # Redibujar rutas
         self._dibujar_rutas()
-        
-        # Actualizar relaciones nodo-ruta
-        self._actualizar_todas_relaciones_nodo_ruta()
     
     def _on_ruta_modificada(self, ruta):
         """Se llama automáticamente cuando se modifica una ruta"""
@@ -5584,10 +4682,9 @@ class EditorController(QObject):
     
     def _on_proyecto_cambiado(self):
         """Se llama automáticamente cuando hay cambios generales en el proyecto"""
-        print("Observer: Proyecto cambiado, actualizando relaciones...")
+        print("Observer: Proyecto cambiado, actualizando vista...")
         
-        # Actualizar relaciones nodo-ruta
-        self._actualizar_todas_relaciones_nodo_ruta()
+        # Las relaciones nodo-ruta ya las mantiene el índice inverso del proyecto
         
         # Forzar actualización visual
         self.view.marco_trabajo.viewport().update()
@@ -5623,43 +4720,28 @@ class EditorController(QObject):
         """
         if not self.proyecto:
             return []
-        
+
         rutas_reconstruidas = []
-        
+
         for ruta_idx, ruta in enumerate(self.proyecto.rutas):
             # Verificar si la ruta está visible globalmente
             if not self.visibilidad_rutas.get(ruta_idx, True):
                 rutas_reconstruidas.append([])  # Ruta completamente oculta
                 continue
-                
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-            
-            # Normalizar la ruta
-            self._normalize_route_nodes(ruta_dict)
-            
-            # Obtener todos los nodos de la ruta en orden
-            puntos_completos = []
-            if ruta_dict.get("origen"):
-                puntos_completos.append(ruta_dict["origen"])
-            puntos_completos.extend(ruta_dict.get("visita", []) or [])
-            if ruta_dict.get("destino"):
-                puntos_completos.append(ruta_dict["destino"])
-            
+
+            # Obtener todos los nodos de la ruta en orden (resueltos por ID)
+            puntos_completos = self.proyecto.nodos_de_ruta(ruta)
+
             # Filtrar solo nodos visibles
-            puntos_visibles = []
-            for punto in puntos_completos:
-                if isinstance(punto, dict):
-                    nodo_id = punto.get('id')
-                    if nodo_id is not None and self.visibilidad_nodos.get(nodo_id, True):
-                        puntos_visibles.append(punto)
-            
+            puntos_visibles = [
+                punto for punto in puntos_completos
+                if self.visibilidad_nodos.get(punto.get('id'), True)
+            ]
+
             # Reconstruir ruta excluyendo nodos ocultos
             ruta_reconstruida = self._reconstruir_ruta_saltando_nodos_ocultos(puntos_completos, puntos_visibles)
             rutas_reconstruidas.append(ruta_reconstruida)
-        
+
         return rutas_reconstruidas
     
     def _reconstruir_ruta_saltando_nodos_ocultos(self, puntos_completos, puntos_visibles):
@@ -5684,11 +4766,8 @@ class EditorController(QObject):
         # Crear mapa de visibilidad por índice
         visibilidad_por_indice = []
         for punto in puntos_completos:
-            if isinstance(punto, dict):
-                nodo_id = punto.get('id')
-                visible = nodo_id is not None and self.visibilidad_nodos.get(nodo_id, True)
-            else:
-                visible = False
+            nodo_id = punto.get('id')
+            visible = nodo_id is not None and self.visibilidad_nodos.get(nodo_id, True)
             visibilidad_por_indice.append(visible)
         
         # Reconstruir ruta saltando nodos ocultos
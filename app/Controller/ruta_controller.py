@@ -2,6 +2,7 @@ from PyQt5.QtCore import Qt, QObject, QEvent
 from PyQt5.QtWidgets import QListWidgetItem, QGraphicsLineItem, QMenu  # Añadimos QMenu
 from PyQt5.QtGui import QPen
 from View.node_item import NodoItem
+from Model.Ruta import Ruta
 
 class RutaController(QObject):
     def __init__(self, proyecto, view, editor):
@@ -62,11 +63,8 @@ class RutaController(QObject):
                 scene_pos = self.view.marco_trabajo.mapToScene(event.pos())
                 
                 # --- INICIO MEJORA: DETECCIÓN DE NODOS SUPERPUESTOS ---
-                # Obtener TODOS los items en la posición del clic
-                items_en_pos = self.view.marco_trabajo.scene().items(scene_pos)
-                
-                # Filtrar solo los que son NodoItem
-                nodos_en_pos = [item for item in items_en_pos if isinstance(item, NodoItem)]
+                # NodoItems bajo el clic según el índice espacial del proyecto
+                nodos_en_pos = self.editor._nodo_items_en_posicion(scene_pos.x(), scene_pos.y())
                 
                 if len(nodos_en_pos) > 1:
                     # CASO: Hay nodos superpuestos -> Mostrar menú de selección
@@ -80,13 +78,20 @@ class RutaController(QObject):
                     self._add_existing_node(nodos_en_pos[0])
                     return True
                     
-                else:
-                    # CASO: No hay nodos -> Crear nuevo nodo
-                    x_m = self.editor.pixeles_a_metros(scene_pos.x())
-                    y_m = self.editor.pixeles_a_metros(scene_pos.y())
-                    print(f"✓ Creando nuevo nodo en posición ({x_m:.2f}, {y_m:.2f}) metros")
-                    self._create_and_add_node(int(scene_pos.x()), int(scene_pos.y()))
+                # CASO: Clic cerca de un nodo existente -> Enganchar a ese nodo
+                nodo_cercano = self.editor.nodo_para_enganchar(scene_pos.x(), scene_pos.y())
+                nodo_item_cercano = self.editor.obtener_item_nodo(nodo_cercano.get('id')) if nodo_cercano else None
+                if nodo_item_cercano is not None:
+                    print(f"✓ Enganchado al nodo existente ID {nodo_cercano.get('id')}")
+                    self._add_existing_node(nodo_item_cercano)
                     return True
+
+                # CASO: No hay nodos -> Crear nuevo nodo
+                x_m = self.editor.pixeles_a_metros(scene_pos.x())
+                y_m = self.editor.pixeles_a_metros(scene_pos.y())
+                print(f"✓ Creando nuevo nodo en posición ({x_m:.2f}, {y_m:.2f}) metros")
+                self._create_and_add_node(int(scene_pos.x()), int(scene_pos.y()))
+                return True
                 # --- FIN MEJORA ---
 
         return False
@@ -248,29 +253,17 @@ class RutaController(QObject):
 
         print(f"✓ Guardando ruta con {len(self._nodes_seq)} nodos")
         
-        ruta_nodes = []
-        for n in self._nodes_seq:
-            try:
-                if hasattr(n, "to_dict"):
-                    ruta_nodes.append(n.to_dict())
-                elif isinstance(n, dict):
-                    ruta_nodes.append(n)
-                else:
-                    ruta_nodes.append({"id": getattr(n, "id", None), 
-                                     "X": getattr(n, "X", 0), 
-                                     "Y": getattr(n, "Y", 0)})
-            except Exception:
-                ruta_nodes.append({"id": None, "X": 0, "Y": 0})
-
-        origen = ruta_nodes[0]
-        destino = ruta_nodes[-1]
-        visita = ruta_nodes[1:-1] if len(ruta_nodes) > 2 else []
+        # La ruta solo guarda la secuencia de IDs (origen, visita..., destino)
+        ids = [n.get("id") for n in self._nodes_seq]
+        if any(nodo_id is None for nodo_id in ids):
+            print("⚠ No se puede guardar: hay nodos sin ID en la ruta")
+            self._clear_temp_lines()
+            self._clear_state()
+            return
 
-        ruta_dict = {"origen": origen, "visita": visita, "destino": destino}
-        self.proyecto.agregar_ruta(ruta_dict)
+        self.proyecto.agregar_ruta(Ruta(ids))
 
         if self.editor:
-            self.editor._actualizar_todas_relaciones_nodo_ruta()
             self.editor._actualizar_lista_rutas_con_widgets()
             self.editor._dibujar_rutas()
         
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Vista columnar (estructura de arrays) de los nodos de un proyecto.
+
+Extrae los campos indicados de una lista de Nodo a columnas (arrays de
+NumPy si está instalado, listas de Python si no), permite aplicar
+transformaciones geométricas vectorizadas sobre X/Y (y la orientación A
+en rotaciones y reflexiones, si la vista la incluye) y devuelve los
+resultados a los objetos Nodo con aplicar().
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: se usa la implementación en Python puro
+    np = None
+
+from .schema import CODEC_NODO, CODEC_OBJETIVO
+
+
+class ColumnasNodos:
+    CAMPOS_POR_DEFECTO = ('id', 'X', 'Y', 'A', 'objetivo')
+
+    def __init__(self, nodos, campos=CAMPOS_POR_DEFECTO):
+        self.nodos = list(nodos)
+        self.campos = tuple(campos)
+        self._columnas = {}
+        for campo in self.campos:
+            valores = [nodo.get(campo) for nodo in self.nodos]
+            self._columnas[campo] = self._crear_columna(campo, valores)
+
+    @classmethod
+    def desde_columnas(cls, columnas):
+        """
+        Vista creada directamente de {campo: valores}, sin objetos Nodo (p. ej.
+        las columnas de los nodos de Proyecto.instantanea()). Sirve para los
+        cálculos por columnas; aplicar() no tiene nodos a los que escribir.
+        """
+        vista = cls([], ())
+        vista.campos = tuple(columnas)
+        for campo, valores in columnas.items():
+            vista._columnas[campo] = cls._crear_columna(campo, list(valores))
+        return vista
+
+    @staticmethod
+    def _crear_columna(campo, valores):
+        if np is None:
+            return valores
+        tipo = CODEC_NODO.tipos_por_clave.get(campo) or CODEC_OBJETIVO.tipos_por_clave.get(campo)
+        if tipo is float:
+            return np.asarray(valores, dtype=np.float64)
+        if tipo is int and None not in valores:
+            return np.asarray(valores, dtype=np.int64)
+        return np.asarray(valores, dtype=object)
+
+    def __len__(self):
+        return len(self.nodos)
+
+    def __getitem__(self, campo):
+        return self._columnas[campo]
+
+    def __setitem__(self, campo, valores):
+        if campo not in self._columnas:
+            raise KeyError(f"Campo no incluido en la vista columnar: {campo}")
+        self._columnas[campo] = self._crear_columna(campo, list(valores))
+
+    # --- SELECCIÓN ---
+    def seleccion(self, ids=None):
+        """
+        Devuelve los índices (posiciones en la vista) de los nodos con los
+        IDs indicados. Con ids=None se seleccionan todos.
+        """
+        if ids is None:
+            return None
+        ids = set(ids)
+        columna_ids = self._columnas['id'] if 'id' in self._columnas else [n.get('id') for n in self.nodos]
+        indices = [i for i, nodo_id in enumerate(columna_ids) if nodo_id in ids]
+        return np.asarray(indices, dtype=np.intp) if np is not None else indices
+
+    def centro(self, indices=None):
+        """Centroide (x, y) de la selección."""
+        xs, ys = self._columnas['X'], self._columnas['Y']
+        if np is not None:
+            if indices is not None:
+                xs, ys = xs[indices], ys[indices]
+            if len(xs) == 0:
+                return 0.0, 0.0
+            return float(xs.mean()), float(ys.mean())
+
+        if indices is not None:
+            xs = [xs[i] for i in indices]
+            ys = [ys[i] for i in indices]
+        if not xs:
+            return 0.0, 0.0
+        return sum(xs) / len(xs), sum(ys) / len(ys)
+
+    # --- TRANSFORMACIONES ---
+    def transformar(self, a, b, c, d, tx=0.0, ty=0.0, indices=None):
+        """
+        Aplica la transformación afín x' = a*x + b*y + tx, y' = c*x + d*y + ty
+        a los nodos seleccionados (todos si indices es None).
+        """
+        xs, ys = self._columnas['X'], self._columnas['Y']
+        if np is not None:
+            if indices is None:
+                self._columnas['X'], self._columnas['Y'] = a * xs + b * ys + tx, c * xs + d * ys + ty
+            else:
+                x_sel, y_sel = xs[indices], ys[indices]
+                xs[indices] = a * x_sel + b * y_sel + tx
+                ys[indices] = c * x_sel + d * y_sel + ty
+            return
+
+        posiciones = range(len(xs)) if indices is None else indices
+        for i in posiciones:
+            x, y = xs[i], ys[i]
+            xs[i] = a * x + b * y + tx
+            ys[i] = c * x + d * y + ty
+
+    def trasladar(self, dx, dy, indices=None):
+        self.transformar(1.0, 0.0, 0.0, 1.0, dx, dy, indices)
+
+    def escalar(self, fx, fy=None, centro=None, indices=None):
+        """Escala respecto a centro (por defecto el centroide de la selección)."""
+        fy = fx if fy is None else fy
+        cx, cy = centro if centro is not None else self.centro(indices)
+        self.transformar(fx, 0.0, 0.0, fy, cx - fx * cx, cy - fy * cy, indices)
+
+    def _transformar_orientacion(self, funcion, indices=None):
+        """Aplica funcion(A) a la orientación de la selección, normalizada a [0, 360) (si la vista incluye 'A')."""
+        if 'A' not in self._columnas:
+            return
+        columna = self._columnas['A']
+        if np is not None:
+            angulos = columna.astype(np.float64)
+            if indices is None:
+                angulos = funcion(angulos) % 360
+            else:
+                angulos[indices] = funcion(angulos[indices]) % 360
+            self._columnas['A'] = angulos
+            return
+
+        # Como con NumPy, la columna pasa a ser de float (los grados pueden tener decimales)
+        angulos = [float(a) for a in columna]
+        posiciones = range(len(angulos)) if indices is None else indices
+        for i in posiciones:
+            angulos[i] = funcion(angulos[i]) % 360
+        self._columnas['A'] = angulos
+
+    def rotar(self, grados, centro=None, indices=None):
+        """
+        Rota en grados alrededor de centro (por defecto el centroide de la
+        selección). Con Y hacia abajo, grados positivos giran en sentido
+        horario en pantalla; A se mide en sentido antihorario (NodoItem
+        pinta con rotate(360 - A)), así que la orientación gira restando.
+        """
+        cx, cy = centro if centro is not None else self.centro(indices)
+        rad = math.radians(grados)
+        cos_a, sin_a = math.cos(rad), math.sin(rad)
+        self.transformar(cos_a, -sin_a, sin_a, cos_a,
+                         cx - cos_a * cx + sin_a * cy,
+                         cy - sin_a * cx - cos_a * cy,
+                         indices)
+        self._transformar_orientacion(lambda a: a - grados, indices)
+
+    def reflejar(self, eje='x', centro=None, indices=None):
+        """
+        Refleja respecto a la recta horizontal (eje='x') o vertical (eje='y')
+        que pasa por centro. La orientación A se refleja igual: -A respecto
+        a la horizontal, 180 - A respecto a la vertical.
+        """
+        if eje == 'x':
+            self.escalar(1.0, -1.0, centro, indices)
+            self._transformar_orientacion(lambda a: -a, indices)
+        elif eje == 'y':
+            self.escalar(-1.0, 1.0, centro, indices)
+            self._transformar_orientacion(lambda a: 180 - a, indices)
+        else:
+            raise ValueError(f"Eje de reflexión no válido: {eje}")
+
+    def escalada(self, campo, factor):
+        """Devuelve una lista con la columna multiplicada por factor (p. ej. píxeles -> metros)."""
+        columna = self._columnas[campo]
+        if np is not None:
+            return (columna * factor).tolist()
+        return [valor * factor for valor in columna]
+
+    # --- SINCRONIZACIÓN CON LOS NODOS ---
+    def aplicar(self, campos=('X', 'Y')):
+        """Escribe las columnas indicadas de vuelta en los objetos Nodo."""
+        columnas = [self._columnas[campo] for campo in campos]
+        if np is not None:
+            columnas = [columna.tolist() for columna in columnas]
+
+        if tuple(campos) == ('X', 'Y'):
+            for nodo, x, y in zip(self.nodos, columnas[0], columnas[1]):
+                nodo.set_posicion(x, y)
+            return
+
+        for posicion, nodo in enumerate(self.nodos):
+            nodo.update({campo: columna[posicion] for campo, columna in zip(campos, columnas)})
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Contenedor binario de proyecto en un único archivo SQLite.
+
+Cada parte del proyecto se guarda en su propia sección (tabla), de modo que
+se puede abrir la tabla de nodos, mostrar el mapa y cargar las rutas y los
+parámetros más tarde, solo cuando se necesitan:
+
+    meta(clave, valor)            versión del contenedor y mapa
+    nodos(id, datos)              un nodo por fila (JSON sin campos por defecto), en el orden del proyecto
+    rutas(orden, nombre, ids)     secuencia de IDs como enteros de 64 bits (little-endian)
+    secciones(nombre, datos)      parametros, parametros_playa, parametros_carga_descarga (JSON)
+"""
+import json
+import os
+import sqlite3
+import sys
+from array import array
+
+from .Nodo import Nodo
+from .Ruta import Ruta
+
+_CABECERA_SQLITE = b"SQLite format 3\x00"
+
+
+class ContenedorProyecto:
+    EXTENSION = ".sqlite"
+    VERSION = 1
+    SECCIONES_JSON = ("parametros", "parametros_playa", "parametros_carga_descarga")
+
+    def __init__(self, ruta_archivo):
+        self.ruta_archivo = ruta_archivo
+
+    @staticmethod
+    def es_contenedor(ruta_archivo):
+        """Indica si el archivo es un contenedor SQLite (por su cabecera, no por la extensión)."""
+        try:
+            with open(ruta_archivo, "rb") as f:
+                return f.read(len(_CABECERA_SQLITE)) == _CABECERA_SQLITE
+        except OSError:
+            return False
+
+    def _conectar(self):
+        # Solo lectura: cada sección abre y cierra su propia conexión
+        uri = "file:" + os.path.abspath(self.ruta_archivo).replace("?", "%3f").replace("#", "%23")
+        return sqlite3.connect(uri + "?mode=ro", uri=True)
+
+    # --- ESCRITURA ---
+    @staticmethod
+    def _ids_a_blob(ids):
+        ids = array('q', ids)
+        if sys.byteorder != "little":
+            ids.byteswap()
+        return ids.tobytes()
+
+    @classmethod
+    def escribir(cls, ruta_archivo, datos):
+        """
+        Escribe en ruta_archivo (que no debe existir) una instantánea del
+        proyecto con la estructura de GuardadoProyecto.datos_serializables().
+        """
+        conn = sqlite3.connect(ruta_archivo)
+        try:
+            conn.executescript("""
+                CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT);
+                CREATE TABLE nodos (id INTEGER, datos TEXT NOT NULL);
+                CREATE TABLE rutas (orden INTEGER PRIMARY KEY, nombre TEXT, ids BLOB NOT NULL);
+                CREATE TABLE secciones (nombre TEXT PRIMARY KEY, datos TEXT NOT NULL);
+            """)
+            separadores = (",", ":")
+            with conn:
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ("version", str(cls.VERSION)),
+                    ("mapa", json.dumps(datos.get("mapa"), ensure_ascii=False)),
+                ])
+                conn.executemany("INSERT INTO nodos VALUES (?, ?)", (
+                    (nodo.get("id"), json.dumps(nodo, separators=separadores, ensure_ascii=False))
+                    for nodo in datos.get("nodos", [])
+                ))
+                conn.executemany("INSERT INTO rutas VALUES (?, ?, ?)", (
+                    (orden, ruta.get("nombre"), cls._ids_a_blob(ruta.get("ids", [])))
+                    for orden, ruta in enumerate(datos.get("rutas", []))
+                ))
+                conn.executemany("INSERT INTO secciones VALUES (?, ?)", (
+                    (nombre, json.dumps(datos[nombre], separators=separadores, ensure_ascii=False))
+                    for nombre in cls.SECCIONES_JSON if nombre in datos
+                ))
+        finally:
+            conn.close()
+
+    # --- LECTURA POR SECCIONES ---
+    def leer_meta(self):
+        conn = self._conectar()
+        try:
+            meta = dict(conn.execute("SELECT clave, valor FROM meta"))
+        finally:
+            conn.close()
+        version = int(meta.get("version", 0))
+        if version > self.VERSION:
+            print(f"⚠ Contenedor de proyecto v{version} más reciente que el soportado (v{self.VERSION})")
+        return {"version": version, "mapa": json.loads(meta.get("mapa", '""'))}
+
+    def leer_nodos(self):
+        conn = self._conectar()
+        try:
+            # id no es clave primaria: como en JSON, un proyecto con IDs repetidos
+            # se guarda y se abre igual (Proyecto avisa de los duplicados). En los
+            # contenedores anteriores rowid es el id, así que el orden se mantiene.
+            return [Nodo(json.loads(datos)) for (datos,) in conn.execute("SELECT datos FROM nodos ORDER BY rowid")]
+        finally:
+            conn.close()
+
+    def leer_rutas(self):
+        conn = self._conectar()
+        try:
+            rutas = []
+            for nombre, blob in conn.execute("SELECT nombre, ids FROM rutas ORDER BY orden"):
+                ids = array('q')
+                ids.frombytes(blob)
+                if sys.byteorder != "little":
+                    ids.byteswap()
+                rutas.append(Ruta(ids, nombre))
+            return rutas
+        finally:
+            conn.close()
+
+    def leer_seccion(self, nombre):
+        """Valor de una sección JSON (parametros, ...) o None si no existe."""
+        conn = self._conectar()
+        try:
+            fila = conn.execute("SELECT datos FROM secciones WHERE nombre = ?", (nombre,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(fila[0]) if fila else None
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+Autoguardado mediante un diario de cambios de solo anexado.
+
+Cada cambio del proyecto (recibido por las señales de Proyecto) se añade
+como una línea JSON al archivo <proyecto>.diario, con un número de
+secuencia creciente. Cada LIMITE_ENTRADAS entradas el diario se compacta:
+se escribe una instantánea completa en <proyecto>.autoguardado (en segundo
+plano y de forma atómica) y se descartan del diario las entradas que ya
+incluye. Tras un cierre inesperado, recuperar() carga la instantánea (o el
+archivo del proyecto si no la hay) y vuelve a aplicar las entradas del
+diario posteriores a ella.
+
+Las modificaciones de nodos se agrupan: se marcan como pendientes y se
+vuelcan cada INTERVALO_VOLCADO_MS con su estado final, de modo que un
+arrastre produce una sola entrada por nodo y no una por cada movimiento.
+
+Los proyectos sin título usan un diario por proceso en el directorio
+temporal, protegido con un QLockFile mientras el editor sigue abierto. Los
+diarios sin título cuyo proceso ya no existe son los recuperables.
+"""
+import glob
+import json
+import os
+import tempfile
+
+from PyQt5.QtCore import QLockFile, QObject, QTimer
+
+from .GuardadoProyecto import HiloGuardado, reemplazar_atomico
+from .LectorJSON import LectorJSON
+from .Nodo import Nodo
+from .Ruta import Ruta
+
+_SEPARADORES = (",", ":")
+
+
+class DiarioCambios(QObject):
+    EXT_DIARIO = ".diario"
+    EXT_INSTANTANEA = ".autoguardado"
+    EXT_BLOQUEO = ".bloqueo"
+    PREFIJO_SIN_TITULO = "editor_trafico_sin_titulo"
+    INTERVALO_VOLCADO_MS = 2000
+    LIMITE_ENTRADAS = 5000  # entradas en el diario antes de compactar
+
+    def __init__(self, proyecto, ruta_proyecto=None, parent=None):
+        """
+        ruta_proyecto: archivo del proyecto (None para un proyecto sin
+        guardar, que usa un diario en el directorio temporal).
+        """
+        super().__init__(parent)
+        self.proyecto = proyecto
+        self.ruta_proyecto = ruta_proyecto
+        self._base = self.ruta_base(ruta_proyecto)
+        self._nodos_pendientes = set()
+        self._entradas = 0
+        self._hilo_compactacion = None
+        self._secuencia_guardada = None  # última entrada ya incluida en el archivo del proyecto
+        self._cerrado = False
+        self._bloqueo = None
+        if not ruta_proyecto:
+            # Mientras el editor esté abierto, otras instancias no lo tratan como huérfano
+            self._bloqueo = self._bloqueo_de(self._base)
+            if not self._bloqueo.tryLock(0):
+                print("⚠ No se pudo bloquear el diario del proyecto sin título")
+        self._secuencia = self._ultima_secuencia(self._base)
+        self._archivo = open(self._base + self.EXT_DIARIO, "a", encoding="utf-8")
+
+        for senal, slot in self._conexiones():
+            senal.connect(slot)
+
+        self._temporizador = QTimer(self)
+        self._temporizador.setInterval(self.INTERVALO_VOLCADO_MS)
+        self._temporizador.timeout.connect(self.volcar)
+        self._temporizador.start()
+
+    # --- ARCHIVOS ---
+    @classmethod
+    def ruta_base(cls, ruta_proyecto):
+        if ruta_proyecto:
+            return ruta_proyecto
+        # Un diario sin título por proceso: dos editores abiertos no se pisan
+        return os.path.join(tempfile.gettempdir(), f"{cls.PREFIJO_SIN_TITULO}_{os.getpid()}")
+
+    @classmethod
+    def _bloqueo_de(cls, base):
+        bloqueo = QLockFile(base + cls.EXT_BLOQUEO)
+        # Sin caducidad por antigüedad: solo se considera abandonado si su proceso ya no existe
+        bloqueo.setStaleLockTime(0)
+        return bloqueo
+
+    @classmethod
+    def _tiene_cambios(cls, base, sin_titulo=False):
+        diario = base + cls.EXT_DIARIO
+        if os.path.exists(diario) and os.path.getsize(diario) > 0:
+            return True
+        if not os.path.exists(base + cls.EXT_INSTANTANEA):
+            return False
+        # La instantánea inicial de un proyecto sin título (secuencia 0) solo
+        # contiene el proyecto recién creado o importado, sin cambios del usuario
+        return not sin_titulo or cls._secuencia_instantanea(base) > 0
+
+    @classmethod
+    def _bases_huerfanas(cls):
+        """
+        Diarios sin título de sesiones que ya terminaron (su bloqueo está
+        libre) y con cambios, del más reciente al más antiguo. Los que no
+        tienen cambios se borran.
+        """
+        propia = cls.ruta_base(None)
+        bases = {}
+        patron = os.path.join(tempfile.gettempdir(), cls.PREFIJO_SIN_TITULO + "*")
+        for ruta in glob.glob(patron):
+            base, ext = os.path.splitext(ruta)
+            if ext in (cls.EXT_DIARIO, cls.EXT_INSTANTANEA) and base != propia:
+                bases[base] = max(bases.get(base, 0), os.path.getmtime(ruta))
+
+        huerfanas = []
+        for base in sorted(bases, key=bases.get, reverse=True):
+            bloqueo = cls._bloqueo_de(base)
+            if not bloqueo.tryLock(0):
+                continue  # otro editor abierto lo está usando
+            bloqueo.unlock()
+            if cls._tiene_cambios(base, sin_titulo=True):
+                huerfanas.append(base)
+            else:
+                cls._borrar(base)  # sesión terminada sin nada que recuperar
+        return huerfanas
+
+    @classmethod
+    def hay_recuperacion(cls, ruta_proyecto=None):
+        """Indica si quedan cambios sin guardar de una sesión anterior."""
+        if ruta_proyecto:
+            return cls._tiene_cambios(ruta_proyecto)
+        return bool(cls._bases_huerfanas())
+
+    @classmethod
+    def descartar(cls, ruta_proyecto=None):
+        """Borra el diario y la instantánea de autoguardado."""
+        cls._borrar(cls.ruta_base(ruta_proyecto))
+
+    @classmethod
+    def descartar_recuperacion(cls, ruta_proyecto=None):
+        """Borra lo que hay_recuperacion() ofrecería recuperar."""
+        if ruta_proyecto:
+            cls.descartar(ruta_proyecto)
+            return
+        for base in cls._bases_huerfanas():
+            cls._borrar(base)
+
+    @classmethod
+    def _borrar(cls, base):
+        for ruta in (base + cls.EXT_DIARIO, base + cls.EXT_INSTANTANEA):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    @classmethod
+    def _adoptar(cls, base):
+        """Pasa los archivos de un diario huérfano al diario sin título de este proceso."""
+        propia = cls.ruta_base(None)
+        for ext in (cls.EXT_DIARIO, cls.EXT_INSTANTANEA):
+            if os.path.exists(base + ext):
+                os.replace(base + ext, propia + ext)
+            elif os.path.exists(propia + ext):
+                os.remove(propia + ext)
+
+    @staticmethod
+    def _leer_entradas(ruta_diario):
+        """Entradas válidas del diario (una línea final incompleta se ignora)."""
+        entradas = []
+        if not os.path.exists(ruta_diario):
+            return entradas
+        with open(ruta_diario, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entradas.append(json.loads(linea))
+                except ValueError:
+                    print("⚠ Entrada incompleta al final del diario, se ignora")
+                    break
+        return entradas
+
+    @classmethod
+    def _secuencia_instantanea(cls, base):
+        """Secuencia guardada en la instantánea (primera clave del archivo) o 0."""
+        ruta = base + cls.EXT_INSTANTANEA
+        if not os.path.exists(ruta):
+            return 0
+        with open(ruta, "rb") as f:
+            for clave, valor in LectorJSON(f).secciones():
+                return valor if clave == "secuencia" else 0
+        return 0
+
+    @classmethod
+    def _ultima_secuencia(cls, base):
+        entradas = cls._leer_entradas(base + cls.EXT_DIARIO)
+        return max([cls._secuencia_instantanea(base)] + [e["s"] for e in entradas])
+
+    # --- REGISTRO ---
+    def _registrar(self, entrada):
+        self._secuencia += 1
+        entrada["s"] = self._secuencia
+        self._archivo.write(json.dumps(entrada, separators=_SEPARADORES, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+        self._entradas += 1
+        if self._entradas >= self.LIMITE_ENTRADAS:
+            self.compactar()
+
+    def _marcar_nodo(self, nodo):
+        self._nodos_pendientes.add(nodo.get("id"))
+
+    def _marcar_nodos(self, nodos):
+        self._nodos_pendientes.update(nodo.get("id") for nodo in nodos)
+
+    def _on_nodo_eliminado(self, nodo_id):
+        self._nodos_pendientes.discard(nodo_id)
+        self._registrar({"op": "nodo_eliminado", "id": nodo_id})
+
+    def _on_ruta_cambiada(self, ruta_idx):
+        ruta = self.proyecto.rutas[ruta_idx]
+        self._registrar({"op": "ruta", "idx": ruta_idx, "datos": ruta.to_dict()})
+
+    def _on_ruta_eliminada(self, ruta_idx):
+        self._registrar({"op": "ruta_eliminada", "idx": ruta_idx})
+
+    def _on_rutas_reemplazadas(self):
+        self._registrar({"op": "rutas", "datos": [ruta.to_dict() for ruta in self.proyecto.rutas]})
+
+    def _on_parametros(self, valor):
+        self._registrar({"op": "seccion", "nombre": "parametros", "datos": valor})
+
+    def _on_parametros_playa(self, valor):
+        self._registrar({"op": "seccion", "nombre": "parametros_playa", "datos": valor})
+
+    def _on_parametros_carga_descarga(self, valor):
+        self._registrar({"op": "seccion", "nombre": "parametros_carga_descarga", "datos": valor})
+
+    def secuencia(self):
+        """Secuencia de la última entrada, tras volcar los nodos pendientes."""
+        self.volcar()
+        return self._secuencia
+
+    def volcar(self):
+        """Escribe el estado actual de los nodos modificados desde el último volcado."""
+        if not self._nodos_pendientes:
+            return
+        pendientes, self._nodos_pendientes = self._nodos_pendientes, set()
+        for nodo_id in pendientes:
+            nodo = self.proyecto.obtener_nodo(nodo_id)
+            if nodo is not None:
+                self._registrar({"op": "nodo", "datos": nodo.to_dict_compacto()})
+
+    # --- COMPACTACIÓN ---
+    def compactar(self):
+        """
+        Escribe una instantánea completa en segundo plano. Las entradas
+        posteriores siguen yendo al diario; al terminar se descartan las que
+        la instantánea ya incluye.
+        """
+        if self._cerrado or (self._hilo_compactacion is not None and self._hilo_compactacion.isRunning()):
+            return
+        self._entradas = 0
+        self.volcar()
+        secuencia = self._secuencia
+        datos = {"secuencia": secuencia}  # primera clave: se lee sin cargar el resto
+        datos.update(self.proyecto.instantanea())
+        self._hilo_compactacion = HiloGuardado(self._base + self.EXT_INSTANTANEA, datos, self)
+        self._hilo_compactacion.guardado_terminado.connect(
+            lambda ruta, exito, error: self._on_compactacion_terminada(secuencia, exito, error))
+        self._hilo_compactacion.start()
+
+    def _on_compactacion_terminada(self, secuencia, exito, error):
+        # La señal llega encolada: el diario puede haberse cerrado (o
+        # descartado) después de que terminara el hilo
+        if self._cerrado:
+            return
+        if not exito:
+            print(f"✗ Error al compactar el diario de autoguardado: {error}")
+            return
+        self._reescribir_diario(secuencia)
+        self._borrar_instantanea_superada()
+        print(f"✓ Diario de autoguardado compactado (secuencia {secuencia})")
+
+    def descartar_hasta(self, secuencia):
+        """
+        Olvida las entradas hasta secuencia, que ya contiene el archivo del
+        proyecto recién guardado: la recuperación parte de ese archivo y
+        algunas entradas (p. ej. las de rutas por índice) no se pueden
+        aplicar dos veces.
+        """
+        self._secuencia_guardada = secuencia
+        self._reescribir_diario(secuencia)
+        self._borrar_instantanea_superada()
+
+    def _borrar_instantanea_superada(self):
+        """Borra la instantánea si el archivo del proyecto guardado ya la incluye."""
+        ruta = self._base + self.EXT_INSTANTANEA
+        if (self._secuencia_guardada is not None and os.path.exists(ruta)
+                and self._secuencia_instantanea(self._base) <= self._secuencia_guardada):
+            os.remove(ruta)
+
+    def _reescribir_diario(self, secuencia):
+        """Deja en el diario solo las entradas posteriores a secuencia."""
+        self._archivo.close()
+        ruta_diario = self._base + self.EXT_DIARIO
+        restantes = [e for e in self._leer_entradas(ruta_diario) if e["s"] > secuencia]
+
+        def escribir(temporal):
+            with open(temporal, "w", encoding="utf-8") as f:
+                for entrada in restantes:
+                    f.write(json.dumps(entrada, separators=_SEPARADORES, ensure_ascii=False) + "\n")
+
+        try:
+            reemplazar_atomico(ruta_diario, escribir)
+        finally:
+            self._archivo = open(ruta_diario, "a", encoding="utf-8")
+        self._entradas = len(restantes)
+
+    def cerrar(self, descartar=False):
+        """Detiene el diario; con descartar=True borra también sus archivos."""
+        self._temporizador.stop()
+        self._cerrado = True
+        if self._hilo_compactacion is not None:
+            self._hilo_compactacion.wait()
+            if not descartar:
+                self._borrar_instantanea_superada()
+        if not descartar:
+            self.volcar()
+        self._archivo.close()
+        if self._bloqueo is not None:
+            self._bloqueo.unlock()
+        for senal, slot in self._conexiones():
+            try:
+                senal.disconnect(slot)
+            except (TypeError, RuntimeError):
+                pass
+        if descartar:
+            self.descartar(self.ruta_proyecto)
+
+    def _conexiones(self):
+        p = self.proyecto
+        return [
+            # Nodos: se marcan y se vuelcan agrupados
+            (p.nodo_agregado, self._marcar_nodo),
+            (p.nodo_modificado, self._marcar_nodo),
+            (p.nodo_insertado, self._marcar_nodo),
+            (p.nodo_movido, self._marcar_nodo),
+            (p.nodos_transformados, self._marcar_nodos),
+            (p.nodo_eliminado, self._on_nodo_eliminado),
+            # Rutas: las señales de bajo nivel llevan el índice de la ruta
+            (p.ruta_insertada, self._on_ruta_cambiada),
+            (p.ruta_reemplazada, self._on_ruta_cambiada),
+            (p.ruta_eliminada, self._on_ruta_eliminada),
+            (p.rutas_reemplazadas, self._on_rutas_reemplazadas),
+            # Parámetros
+            (p.parametros_modificados, self._on_parametros),
+            (p.parametros_playa_modificados, self._on_parametros_playa),
+            (p.parametros_carga_descarga_modificados, self._on_parametros_carga_descarga),
+        ]
+
+    # --- RECUPERACIÓN ---
+    @classmethod
+    def recuperar(cls, ruta_proyecto=None):
+        """
+        Reconstruye el proyecto tras un cierre inesperado: instantánea de
+        autoguardado (o archivo del proyecto) más las entradas del diario
+        posteriores a ella. Sin ruta, recupera el diario sin título huérfano
+        más reciente, que pasa a ser el de este proceso; el diario sin título
+        de este proceso debe estar cerrado.
+        """
+        from .Proyecto import Proyecto  # importación diferida: Proyecto no depende del diario
+
+        if not ruta_proyecto:
+            huerfanas = cls._bases_huerfanas()
+            if huerfanas:
+                cls._adoptar(huerfanas[0])
+        base = cls.ruta_base(ruta_proyecto)
+        if os.path.exists(base + cls.EXT_INSTANTANEA):
+            proyecto = Proyecto.cargar(base + cls.EXT_INSTANTANEA)
+            desde = cls._secuencia_instantanea(base)
+        elif ruta_proyecto and os.path.exists(ruta_proyecto):
+            proyecto = Proyecto.cargar(ruta_proyecto)
+            desde = 0
+        else:
+            proyecto = Proyecto()
+            desde = 0
+
+        aplicadas = 0
+        for entrada in cls._leer_entradas(base + cls.EXT_DIARIO):
+            if entrada["s"] <= desde:
+                continue
+            try:
+                cls._aplicar(proyecto, entrada)
+                aplicadas += 1
+            except Exception as e:
+                print(f"⚠ Entrada {entrada.get('s')} del diario no aplicada: {e}")
+        print(f"✓ Proyecto recuperado: {aplicadas} cambios aplicados desde el diario")
+        return proyecto
+
+    @staticmethod
+    def _aplicar(proyecto, entrada):
+        op = entrada["op"]
+        if op == "nodo":
+            datos = entrada["datos"]
+            nodo = proyecto.obtener_nodo(datos.get("id"))
+            if nodo is None:
+                proyecto.insertar_nodo(Nodo(datos))
+            else:
+                # Los campos omitidos en la entrada vuelven a su valor por defecto
+                nodo.update(Nodo(datos).to_dict())
+                proyecto.mover_nodo(nodo, nodo.get("X", 0), nodo.get("Y", 0))
+        elif op == "nodo_eliminado":
+            proyecto.eliminar_nodo(entrada["id"])
+        elif op == "ruta":
+            ruta = Ruta.desde_dict(entrada["datos"])
+            if not proyecto.reemplazar_ruta(entrada["idx"], ruta):
+                proyecto.insertar_ruta(ruta)
+        elif op == "ruta_eliminada":
+            proyecto.eliminar_ruta(entrada["idx"])
+        elif op == "rutas":
+            proyecto.rutas = [Ruta.desde_dict(datos) for datos in entrada["datos"]]
+        elif op == "seccion":
+            setattr(proyecto, entrada["nombre"], entrada["datos"])
+        else:
+            raise ValueError(f"operación desconocida '{op}'")
@@ -1,15 +1,126 @@
 # -*- coding: utf-8 -*-
 import csv
+import gzip
+import io
 import os
-from PyQt5.QtWidgets import QFileDialog, QMessageBox
-from .schema import NODO_FIELDS, OBJETIVO_FIELDS
+import time
+from .schema import COLUMNAS_NODOS, COLUMNAS_OBJETIVOS
+from .ExportadorDB import ExportadorDB
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional: solo hace falta para la compresión "zstd"
+    zstandard = None
+
 
 class ExportadorCSV:
+    # Compresión -> sufijo añadido a los nombres .csv
+    COMPRESIONES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+    TAM_BUFFER = 1 << 20  # 1 MiB por escritura al archivo
+    FILAS_POR_LOTE = 10000  # filas que se pasan de una vez a writerows
+
+    @staticmethod
+    def archivos_a_generar(datos, carpeta, compresion=None):
+        """Rutas de los archivos CSV que genera la exportación de la instantánea."""
+        sufijo = ".csv" + ExportadorCSV.COMPRESIONES[compresion]
+        nombres = [os.path.splitext(os.path.basename(r))[0] for r in ExportadorDB.archivos_a_generar(datos, carpeta)]
+        return [os.path.join(carpeta, nombre + sufijo) for nombre in nombres]
+
+    @staticmethod
+    def _abrir(ruta_archivo, compresion=None):
+        """Archivo de texto para csv.writer, comprimido según compresion."""
+        if compresion is None:
+            return open(ruta_archivo, 'w', newline='', encoding='utf-8', buffering=ExportadorCSV.TAM_BUFFER)
+        if compresion == "gzip":
+            return gzip.open(ruta_archivo, 'wt', newline='', encoding='utf-8', compresslevel=6)
+        if compresion == "zstd":
+            if zstandard is None:
+                raise RuntimeError("La compresión zstd requiere el paquete 'zstandard'")
+            crudo = zstandard.ZstdCompressor(level=3).stream_writer(open(ruta_archivo, 'wb'))
+            return io.TextIOWrapper(io.BufferedWriter(crudo, ExportadorCSV.TAM_BUFFER),
+                                    encoding='utf-8', newline='')
+        raise ValueError(f"Compresión desconocida: {compresion}")
+
+    @staticmethod
+    def _escribir_csv(ruta_archivo, cabecera, filas, compresion=None):
+        """
+        Escribe la cabecera y las filas (tuplas en el orden de la cabecera)
+        por lotes, sin acumularlas en memoria. Devuelve (filas, segundos).
+        """
+        inicio = time.perf_counter()
+        total = 0
+        with ExportadorCSV._abrir(ruta_archivo, compresion) as f:
+            writer = csv.writer(f)
+            writer.writerow(cabecera)
+            lote = []
+            for fila in filas:
+                lote.append(fila)
+                if len(lote) == ExportadorCSV.FILAS_POR_LOTE:
+                    writer.writerows(lote)
+                    total += len(lote)
+                    lote.clear()
+            writer.writerows(lote)
+            total += len(lote)
+        segundos = time.perf_counter() - inicio
+
+        # Rendimiento: filas y bytes en disco (comprimidos si procede) por segundo
+        megas = os.path.getsize(ruta_archivo) / (1 << 20)
+        ritmo = f"{total / segundos:,.0f} filas/s, {megas / segundos:.1f} MB/s" if segundos > 0 else "-"
+        print(f"✓ {os.path.basename(ruta_archivo)}: {total} filas, {megas:.1f} MB en {segundos:.2f} s ({ritmo})")
+        return total, segundos
+
+    @staticmethod
+    def exportar_a_carpeta(datos, carpeta, escala=0.05, rutas_a_generar=None, compresion=None):
+        """
+        Genera los archivos CSV en carpeta sin interacción con el usuario a
+        partir de una instantánea del proyecto (Proyecto.instantanea()). Las
+        filas salen de los mismos generadores que ExportadorDB, como tuplas
+        en el orden de columnas del esquema. Devuelve {ruta_archivo: (filas, segundos)}.
+        """
+        if rutas_a_generar is None:
+            rutas_a_generar = ExportadorCSV.archivos_a_generar(datos, carpeta, compresion)
+        rutas_por_nombre = {os.path.basename(r).split('.')[0]: r for r in rutas_a_generar}
+        resultado = {}
+
+        def escribir(nombre, cabecera, filas):
+            if nombre in rutas_por_nombre:
+                ruta_archivo = rutas_por_nombre[nombre]
+                resultado[ruta_archivo] = ExportadorCSV._escribir_csv(ruta_archivo, cabecera, filas, compresion)
+
+        # --- Exportar puntos (nodos básicos) usando el esquema ---
+        escribir("puntos", COLUMNAS_NODOS,
+                 ExportadorDB._filas_nodos(datos, escala))
+
+        # --- Exportar objetivos (solo nodos con objetivo != 0), con 'nodo_id' al principio ---
+        escribir("objetivos", COLUMNAS_OBJETIVOS,
+                 ExportadorDB._filas_objetivos(datos))
+
+        # --- Exportar rutas (estructura fija, sin el id de la tabla SQLite) ---
+        escribir("rutas", ['origen_id', 'destino_id', 'visitados'],
+                 (fila[1:] for fila in ExportadorDB._filas_rutas(datos)))
+
+        # --- Exportar parámetros de playa y tipos de carga/descarga (columnas dinámicas) ---
+        for nombre, tabla, clave in (("playas", "parametros_playa", 'parametros_playa'),
+                                     ("tipo_carga_descarga", "tipo_carga_descarga", 'parametros_carga_descarga')):
+            if datos.get(clave):
+                _, columnas, filas = ExportadorDB._tabla_dinamica(tabla, datos[clave])
+                escribir(nombre, columnas, filas)
+
+        # --- Exportar parámetros generales ---
+        escribir("parametros", ['clave', 'valor'],
+                 ((clave, str(valor)) for clave, valor in datos.get('parametros', {}).items()))
+
+        print(f"✓ {len(resultado)} archivos CSV exportados en {carpeta}")
+        return resultado
+
     @staticmethod
     def exportar(proyecto, view, escala=0.05):
         """
         Exporta el proyecto a archivos CSV.
         """
+        # Widgets importados aquí: el resto del módulo se usa sin interfaz (export.py)
+        from PyQt5.QtWidgets import QFileDialog, QMessageBox
+
         if not proyecto:
             QMessageBox.warning(view, "Error", "No hay proyecto cargado.")
             return
@@ -22,27 +133,11 @@ class ExportadorCSV:
         if not carpeta:
             return  # El usuario canceló
 
-        # --- VERIFICAR ARCHIVOS EXISTENTES ---
-        rutas_a_generar = []
-        # Archivos que se generan siempre
-        rutas_a_generar.append(os.path.join(carpeta, "puntos.csv"))
-        rutas_a_generar.append(os.path.join(carpeta, "rutas.csv"))
-
-        # Objetivos (solo si hay nodos con objetivo != 0)
-        if any(n.get("objetivo", 0) != 0 for n in proyecto.nodos):
-            rutas_a_generar.append(os.path.join(carpeta, "objetivos.csv"))
-
-        # Parámetros de playa
-        if getattr(proyecto, 'parametros_playa', []):
-            rutas_a_generar.append(os.path.join(carpeta, "playas.csv"))
+        # Instantánea: las filas se generan sin tocar el modelo
+        datos = proyecto.instantanea()
 
-        # Parámetros generales
-        if getattr(proyecto, 'parametros', {}):
-            rutas_a_generar.append(os.path.join(carpeta, "parametros.csv"))
-
-        # Parámetros de carga/descarga
-        if getattr(proyecto, 'parametros_carga_descarga', []):
-            rutas_a_generar.append(os.path.join(carpeta, "tipo_carga_descarga.csv"))
+        # --- VERIFICAR ARCHIVOS EXISTENTES ---
+        rutas_a_generar = ExportadorCSV.archivos_a_generar(datos, carpeta)
 
         existentes = [r for r in rutas_a_generar if os.path.exists(r)]
         if existentes:
@@ -61,141 +156,10 @@ class ExportadorCSV:
 
         # --- CONTINUAR CON LA EXPORTACIÓN NORMAL ---
         try:
-            # --- Exportar puntos (nodos básicos) usando el esquema ---
-            with open(os.path.join(carpeta, "puntos.csv"), 'w', newline='', encoding='utf-8') as f:
-                # Obtener los nombres de columna según el esquema
-                column_names = [info.get('csv_name', key) for key, info in NODO_FIELDS.items()]
-                writer = csv.DictWriter(f, fieldnames=column_names)
-                writer.writeheader()
-
-                for nodo in proyecto.nodos:
-                    if hasattr(nodo, 'to_dict'):
-                        datos = nodo.to_dict()
-                    else:
-                        datos = nodo
-
-                    fila = {}
-                    for key, info in NODO_FIELDS.items():
-                        col_name = info.get('csv_name', key)
-                        valor = datos.get(key, info['default'])
-                        # Convertir coordenadas a metros
-                        if key == 'X':
-                            valor = valor * escala
-                        elif key == 'Y':
-                            valor = valor * escala
-                        fila[col_name] = valor
-                    writer.writerow(fila)
-
-            # --- Exportar objetivos (solo nodos con objetivo != 0) ---
-            if os.path.join(carpeta, "objetivos.csv") in rutas_a_generar:
-                with open(os.path.join(carpeta, "objetivos.csv"), 'w', newline='', encoding='utf-8') as f:
-                    column_names = [info.get('csv_name', key) for key, info in OBJETIVO_FIELDS.items()]
-                    # Asegurarse de que 'nodo_id' esté al principio (lo añadimos manualmente)
-                    column_names = ['nodo_id'] + column_names
-                    writer = csv.DictWriter(f, fieldnames=column_names)
-                    writer.writeheader()
-
-                    for nodo in proyecto.nodos:
-                        if hasattr(nodo, 'to_dict'):
-                            datos = nodo.to_dict()
-                        else:
-                            datos = nodo
-
-                        if datos.get('objetivo', 0) != 0:
-                            fila = {'nodo_id': datos.get('id')}
-                            for key, info in OBJETIVO_FIELDS.items():
-                                col_name = info.get('csv_name', key)
-                                valor = datos.get(key, info['default'])
-                                fila[col_name] = valor
-                            writer.writerow(fila)
-
-            # --- Exportar rutas (estructura fija, no usa esquema) ---
-            with open(os.path.join(carpeta, "rutas.csv"), 'w', newline='', encoding='utf-8') as f:
-                campos_rutas = ['origen_id', 'destino_id', 'visitados']
-                writer = csv.DictWriter(f, fieldnames=campos_rutas)
-                writer.writeheader()
-
-                for ruta in proyecto.rutas:
-                    if hasattr(ruta, 'to_dict'):
-                        ruta_dict = ruta.to_dict()
-                    else:
-                        ruta_dict = ruta
-
-                    origen = ruta_dict.get('origen', {})
-                    destino = ruta_dict.get('destino', {})
-                    visita = ruta_dict.get('visita', [])
-
-                    origen_id = origen.get('id') if isinstance(origen, dict) else None
-                    destino_id = destino.get('id') if isinstance(destino, dict) else None
-
-                    visitados_ids = []
-                    if origen_id is not None:
-                        visitados_ids.append(str(origen_id))
-                    for v in visita:
-                        if isinstance(v, dict):
-                            visitados_ids.append(str(v.get('id', '')))
-                        else:
-                            visitados_ids.append(str(v))
-                    if destino_id is not None:
-                        visitados_ids.append(str(destino_id))
-
-                    visitados_str = ','.join(visitados_ids)
-
-                    writer.writerow({
-                        'origen_id': origen_id,
-                        'destino_id': destino_id,
-                        'visitados': visitados_str
-                    })
-
-            # --- Exportar parámetros de playa (dinámico, igual que antes) ---
-            if os.path.join(carpeta, "playas.csv") in rutas_a_generar:
-                parametros_playa = getattr(proyecto, 'parametros_playa', [])
-                if parametros_playa:
-                    with open(os.path.join(carpeta, "playas.csv"), 'w', newline='', encoding='utf-8') as f:
-                        todas_las_propiedades = set()
-                        for playa in parametros_playa:
-                            todas_las_propiedades.update(playa.keys())
-                        propiedades_ordenadas = sorted(todas_las_propiedades)
-                        if 'ID' in propiedades_ordenadas:
-                            propiedades_ordenadas.remove('ID')
-                            propiedades_ordenadas = ['ID'] + propiedades_ordenadas
-
-                        writer = csv.DictWriter(f, fieldnames=propiedades_ordenadas)
-                        writer.writeheader()
-
-                        for playa in parametros_playa:
-                            fila = {prop: playa.get(prop, "") for prop in propiedades_ordenadas}
-                            writer.writerow(fila)
-
-            # --- Exportar parámetros generales ---
-            if os.path.join(carpeta, "parametros.csv") in rutas_a_generar:
-                parametros = getattr(proyecto, 'parametros', {})
-                if parametros:
-                    with open(os.path.join(carpeta, "parametros.csv"), 'w', newline='', encoding='utf-8') as f:
-                        writer = csv.DictWriter(f, fieldnames=['clave', 'valor'])
-                        writer.writeheader()
-                        for clave, valor in parametros.items():
-                            writer.writerow({'clave': clave, 'valor': str(valor)})
-
-            # --- Exportar tipo_carga_descarga (dinámico, igual que antes) ---
-            if os.path.join(carpeta, "tipo_carga_descarga.csv") in rutas_a_generar:
-                parametros_carga_descarga = getattr(proyecto, 'parametros_carga_descarga', [])
-                if parametros_carga_descarga:
-                    with open(os.path.join(carpeta, "tipo_carga_descarga.csv"), 'w', newline='', encoding='utf-8') as f:
-                        todas_las_propiedades = set()
-                        for item in parametros_carga_descarga:
-                            todas_las_propiedades.update(item.keys())
-                        propiedades_ordenadas = sorted(todas_las_propiedades)
-                        if 'ID' in propiedades_ordenadas:
-                            propiedades_ordenadas.remove('ID')
-                            propiedades_ordenadas = ['ID'] + propiedades_ordenadas
-
-                        writer = csv.DictWriter(f, fieldnames=propiedades_ordenadas)
-                        writer.writeheader()
-
-                        for item in parametros_carga_descarga:
-                            fila = {prop: item.get(prop, "") for prop in propiedades_ordenadas}
-                            writer.writerow(fila)
+            ExportadorCSV.exportar_a_carpeta(datos, carpeta, escala, rutas_a_generar)
+            parametros_playa = getattr(proyecto, 'parametros_playa', [])
+            parametros = getattr(proyecto, 'parametros', {})
+            parametros_carga_descarga = getattr(proyecto, 'parametros_carga_descarga', [])
 
             # Mostrar mensaje de éxito
             nodos_con_objetivo = sum(1 for n in proyecto.nodos if n.get("objetivo", 0) != 0)
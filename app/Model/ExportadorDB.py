@@ -1,10 +1,455 @@
 # -*- coding: utf-8 -*-
 import sqlite3
 import os
-from PyQt5.QtWidgets import QFileDialog, QMessageBox
-from .schema import NODO_FIELDS, OBJETIVO_FIELDS, PARAMETROS_FIELDS
+from concurrent.futures import ThreadPoolExecutor, wait
+from .ColumnasNodos import ColumnasNodos
+from .GuardadoProyecto import reemplazar_atomico
+from .schema import (CODEC_NODO, CODEC_OBJETIVO, COLUMNAS_NODOS, SQL_CREAR_NODOS,
+                     COLUMNAS_OBJETIVOS, SQL_CREAR_OBJETIVOS)
 
 class ExportadorDB:
+    # Ajustes para la carga masiva: el archivo se regenera entero en un
+    # temporal que solo sustituye al destino al terminar, así que no hace
+    # falta diario de transacciones ni fsync intermedios (un fallo solo
+    # pierde el temporal).
+    PRAGMAS_CARGA = (
+        "PRAGMA journal_mode = OFF",
+        "PRAGMA synchronous = OFF",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -65536",
+    )
+    # En la exportación incremental se modifica un archivo ya válido: se
+    # mantiene el diario para que un fallo no deje la base de datos corrupta.
+    PRAGMAS_INCREMENTAL = (
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+    )
+
+    @staticmethod
+    def _escribir_tabla(ruta_db, tabla, create_sql, columnas, filas, aviso=None, incremental=False):
+        """
+        Regenera ruta_db con la tabla y sus filas (iterable de secuencias),
+        insertadas con una sola sentencia preparada y en una única
+        transacción. Se escribe en un temporal junto a ruta_db que sustituye
+        al destino al terminar (reemplazar_atomico), de modo que un fallo a
+        mitad no deja corrupta una base de datos que ya existía. Devuelve
+        el número de filas insertadas.
+        aviso(n), si se indica, se llama cada CADA_FILAS_PROGRESO filas.
+        Con incremental=True y una tabla existente con las mismas columnas
+        solo se aplican las diferencias (ver _sincronizar_tabla).
+        """
+        if aviso is not None:
+            filas = ExportadorDB._con_progreso(filas, aviso)
+        if incremental and os.path.exists(ruta_db):
+            filas_sincronizadas = ExportadorDB._sincronizar_tabla(ruta_db, tabla, columnas, filas)
+            if filas_sincronizadas is not None:
+                return filas_sincronizadas
+            print(f"⚠ {os.path.basename(ruta_db)}: la tabla {tabla} no existe o ha cambiado de columnas, se regenera")
+        total = 0
+
+        def escribir(temporal):
+            nonlocal total
+            conn = sqlite3.connect(temporal, isolation_level=None)
+            try:
+                for pragma in ExportadorDB.PRAGMAS_CARGA:
+                    conn.execute(pragma)
+                conn.execute("BEGIN")
+                conn.execute(create_sql)
+                insert_sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+                total = conn.executemany(insert_sql, filas).rowcount
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+            # Un diario pendiente de la base anterior se aplicaría sobre la nueva
+            if os.path.exists(ruta_db + "-journal"):
+                os.remove(ruta_db + "-journal")
+
+        # Con synchronous = OFF nada garantiza que los datos estén en disco:
+        # reemplazar_atomico los fuerza (fsync) antes del cambio de nombre
+        reemplazar_atomico(ruta_db, escribir)
+        return total
+
+    @staticmethod
+    def _normalizador_filas(tipos_declarados):
+        """
+        Función que lleva una fila nueva a la forma en que SQLite la
+        devolvería según la afinidad de cada columna, para poder compararla
+        con la fila guardada: los números en columnas TEXT se leen como
+        texto y el texto numérico en columnas INTEGER/REAL como número.
+        """
+        columnas_texto = []
+        columnas_numericas = []
+        for i, tipo in enumerate(tipos_declarados):
+            tipo = tipo.upper()
+            if "INT" in tipo or not any(t in tipo for t in ("CHAR", "CLOB", "TEXT", "BLOB")):
+                columnas_numericas.append(i)
+            elif "BLOB" not in tipo:
+                columnas_texto.append(i)
+        if not columnas_texto and not columnas_numericas:
+            return tuple
+
+        def normalizar(fila):
+            fila = list(fila)
+            for i in columnas_texto:
+                valor = fila[i]
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    fila[i] = str(valor)
+            for i in columnas_numericas:
+                valor = fila[i]
+                if isinstance(valor, str):
+                    try:
+                        fila[i] = int(valor)
+                    except ValueError:
+                        try:
+                            fila[i] = float(valor)
+                        except ValueError:
+                            pass
+            return tuple(fila)
+        return normalizar
+
+    @staticmethod
+    def _sincronizar_tabla(ruta_db, tabla, columnas, filas):
+        """
+        Exportación incremental: compara las filas nuevas con las de la
+        tabla existente por su clave (primera columna) y ejecuta solo los
+        DELETE, UPDATE e INSERT necesarios en una transacción. Las páginas
+        que no cambian no se reescriben, así que sincronizar el archivo con
+        los vehículos transfiere solo lo modificado. Devuelve el número de
+        filas de la tabla, o None si la tabla no existe o sus columnas no
+        coinciden (hay que regenerarla).
+        """
+        conn = sqlite3.connect(ruta_db, isolation_level=None)
+        try:
+            info = conn.execute(f"PRAGMA table_info({tabla})").fetchall()
+            if [fila[1] for fila in info] != list(columnas):
+                return None
+            normalizar = ExportadorDB._normalizador_filas([fila[2] for fila in info])
+
+            clave = columnas[0]
+            lista_columnas = ', '.join(columnas)
+            existentes = {fila[0]: fila for fila in conn.execute(f"SELECT {lista_columnas} FROM {tabla}")}
+            nuevas, cambiadas = [], []
+            total = 0
+            for fila in filas:
+                total += 1
+                # Normalizar solo si hace falta: la mayoría de filas coinciden tal cual
+                fila = tuple(fila)
+                if fila[0] not in existentes:
+                    fila = normalizar(fila)
+                anterior = existentes.pop(fila[0], None)
+                if anterior is not None and anterior != fila:
+                    fila = normalizar(fila)
+                if anterior is None:
+                    nuevas.append(fila)
+                elif anterior != fila:
+                    # UPDATE ... SET resto WHERE clave = ?: la clave va al final
+                    cambiadas.append(fila[1:] + fila[:1])
+            borradas = [(valor_clave,) for valor_clave in existentes]
+
+            if nuevas or cambiadas or borradas:
+                for pragma in ExportadorDB.PRAGMAS_INCREMENTAL:
+                    conn.execute(pragma)
+                conn.execute("BEGIN")
+                conn.executemany(f"DELETE FROM {tabla} WHERE {clave} = ?", borradas)
+                if len(columnas) > 1:
+                    asignaciones = ', '.join(f"{columna} = ?" for columna in columnas[1:])
+                    conn.executemany(f"UPDATE {tabla} SET {asignaciones} WHERE {clave} = ?", cambiadas)
+                conn.executemany(
+                    f"INSERT INTO {tabla} ({lista_columnas}) VALUES ({', '.join('?' * len(columnas))})", nuevas)
+                conn.execute("COMMIT")
+            print(f"✓ {os.path.basename(ruta_db)} (incremental): {len(nuevas)} nuevas, "
+                  f"{len(cambiadas)} modificadas, {len(borradas)} eliminadas")
+            return total
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # --- GENERADORES DE FILAS ---
+    # Trabajan sobre Proyecto.instantanea(): cada nodo es la tupla de
+    # Nodo.instantanea() (valores en el orden de NODO_FIELDS, copia del
+    # diccionario de objetivo o None, extra), de modo que la exportación
+    # puede hacerse en otros hilos sin tocar el modelo que se está editando.
+    _I_ID = CODEC_NODO.indices['id']
+    _I_X = CODEC_NODO.indices['X']
+    _I_Y = CODEC_NODO.indices['Y']
+    _I_OBJETIVO = CODEC_NODO.indices['objetivo']
+    _DEFAULTS_OBJETIVO = CODEC_OBJETIVO.defaults_por_clave
+
+    @staticmethod
+    def _filas_nodos(datos, escala):
+        """
+        Una fila por nodo con los campos de NODO_FIELDS y X/Y en metros. Los
+        valores se trasponen a columnas (zip), X e Y se escalan de una vez
+        con ColumnasNodos.escalada y las filas se vuelven a formar con zip.
+        """
+        if not datos["nodos"]:
+            return iter(())
+        ix, iy = ExportadorDB._I_X, ExportadorDB._I_Y
+        columnas = list(zip(*(valores for valores, _, _ in datos["nodos"])))
+        coordenadas = ColumnasNodos.desde_columnas({'X': columnas[ix], 'Y': columnas[iy]})
+        columnas[ix] = coordenadas.escalada('X', escala)
+        columnas[iy] = coordenadas.escalada('Y', escala)
+        return zip(*columnas)
+
+    @staticmethod
+    def _nodos_con_objetivo(datos):
+        i_objetivo = ExportadorDB._I_OBJETIVO
+        return (nodo for nodo in datos["nodos"] if nodo[0][i_objetivo] != 0)
+
+    @staticmethod
+    def _filas_objetivos(datos):
+        """Una fila por nodo con objetivo != 0: nodo_id y los campos de OBJETIVO_FIELDS."""
+        campos = CODEC_OBJETIVO.claves
+        valores_objetivo = CODEC_OBJETIVO.valores_de
+        i_id = ExportadorDB._I_ID
+        for valores, objetivo, _ in ExportadorDB._nodos_con_objetivo(datos):
+            objetivo = objetivo if objetivo is not None else ExportadorDB._DEFAULTS_OBJETIVO
+            try:
+                yield (valores[i_id],) + valores_objetivo(objetivo)
+            except KeyError:
+                # Objetivo incompleto (no creado por Nodo): los campos que faltan van vacíos
+                yield (valores[i_id],) + tuple(objetivo.get(key) for key in campos)
+
+    @staticmethod
+    def _filas_rutas(datos):
+        """
+        (id, origen_id, destino_id, visitados) por ruta; visitados es origen,
+        visita... y destino. El id es la posición de la ruta empezando en 1,
+        el mismo que asignaría AUTOINCREMENT en una tabla nueva.
+        """
+        for id_ruta, ruta in enumerate(datos["rutas"], 1):
+            origen_id = ruta.origen_id
+            destino_id = ruta.destino_id
+            visitados_ids = []
+            if origen_id is not None:
+                visitados_ids.append(str(origen_id))
+            visitados_ids.extend(str(v) for v in ruta.visita_ids)
+            if destino_id is not None:
+                visitados_ids.append(str(destino_id))
+            yield id_ruta, origen_id, destino_id, ','.join(visitados_ids)
+
+    @staticmethod
+    def _tabla_dinamica(tabla, registros):
+        """
+        CREATE TABLE, columnas y filas para una lista de diccionarios con
+        claves variables (playas, tipos de carga/descarga). La columna ID,
+        si existe, va primero; el resto se guardan como texto.
+        """
+        todas_las_propiedades = set()
+        for registro in registros:
+            todas_las_propiedades.update(registro.keys())
+
+        propiedades_ordenadas = sorted(todas_las_propiedades)
+        if 'ID' in propiedades_ordenadas:
+            propiedades_ordenadas.remove('ID')
+            propiedades_ordenadas = ['ID'] + propiedades_ordenadas
+
+        column_defs = [f"{propiedades_ordenadas[0]} INTEGER PRIMARY KEY"]
+        column_defs += [f"{prop} TEXT" for prop in propiedades_ordenadas[1:]]
+        create_sql = f"CREATE TABLE {tabla} ({', '.join(column_defs)})"
+
+        def filas():
+            for registro in registros:
+                valores = []
+                for prop in propiedades_ordenadas:
+                    valor = registro.get(prop, "")
+                    valores.append(str(valor) if valor is not None else "")
+                yield valores
+
+        return create_sql, propiedades_ordenadas, filas()
+
+    # --- EXPORTACIÓN POR BASE DE DATOS ---
+    @staticmethod
+    def exportar_nodos(datos, ruta_db, escala=0.05, aviso=None, incremental=False):
+        return ExportadorDB._escribir_tabla(ruta_db, "nodos", SQL_CREAR_NODOS, COLUMNAS_NODOS,
+                                            ExportadorDB._filas_nodos(datos, escala), aviso, incremental)
+
+    @staticmethod
+    def exportar_objetivos(datos, ruta_db, aviso=None, incremental=False):
+        return ExportadorDB._escribir_tabla(ruta_db, "objetivos", SQL_CREAR_OBJETIVOS, COLUMNAS_OBJETIVOS,
+                                            ExportadorDB._filas_objetivos(datos), aviso, incremental)
+
+    @staticmethod
+    def exportar_rutas(datos, ruta_db, aviso=None, incremental=False):
+        create_sql = """
+            CREATE TABLE rutas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origen_id INTEGER,
+                destino_id INTEGER,
+                visitados TEXT
+            )
+        """
+        return ExportadorDB._escribir_tabla(ruta_db, "rutas", create_sql,
+                                            ["id", "origen_id", "destino_id", "visitados"],
+                                            ExportadorDB._filas_rutas(datos), aviso, incremental)
+
+    @staticmethod
+    def exportar_playas(datos, ruta_db, aviso=None, incremental=False):
+        create_sql, columnas, filas = ExportadorDB._tabla_dinamica(
+            "parametros_playa", datos.get('parametros_playa', []))
+        return ExportadorDB._escribir_tabla(ruta_db, "parametros_playa", create_sql, columnas, filas, aviso, incremental)
+
+    @staticmethod
+    def exportar_parametros(datos, ruta_db, aviso=None, incremental=False):
+        create_sql = """
+            CREATE TABLE parametros (
+                clave TEXT PRIMARY KEY,
+                valor TEXT
+            )
+        """
+        filas = ((clave, str(valor)) for clave, valor in datos.get('parametros', {}).items())
+        return ExportadorDB._escribir_tabla(ruta_db, "parametros", create_sql, ["clave", "valor"], filas, aviso, incremental)
+
+    @staticmethod
+    def exportar_carga_descarga(datos, ruta_db, aviso=None, incremental=False):
+        create_sql, columnas, filas = ExportadorDB._tabla_dinamica(
+            "tipo_carga_descarga", datos.get('parametros_carga_descarga', []))
+        return ExportadorDB._escribir_tabla(ruta_db, "tipo_carga_descarga", create_sql, columnas, filas, aviso, incremental)
+
+    # Archivo -> función que lo genera (sin argumentos de escala salvo puntos.db)
+    ARCHIVOS = {
+        "puntos.db": "exportar_nodos",
+        "objetivos.db": "exportar_objetivos",
+        "rutas.db": "exportar_rutas",
+        "playas.db": "exportar_playas",
+        "parametros.db": "exportar_parametros",
+        "tipo_carga_descarga.db": "exportar_carga_descarga",
+    }
+    CADA_FILAS_PROGRESO = 5000
+
+    @staticmethod
+    def archivos_a_generar(datos, carpeta):
+        """Rutas de las bases de datos que genera la exportación de la instantánea."""
+        rutas_a_generar = []
+        # Archivos que se generan siempre
+        rutas_a_generar.append(os.path.join(carpeta, "puntos.db"))
+        rutas_a_generar.append(os.path.join(carpeta, "rutas.db"))
+
+        # Objetivos (solo si hay nodos con objetivo != 0)
+        if any(True for _ in ExportadorDB._nodos_con_objetivo(datos)):
+            rutas_a_generar.append(os.path.join(carpeta, "objetivos.db"))
+
+        # Parámetros de playa
+        if datos.get('parametros_playa', []):
+            rutas_a_generar.append(os.path.join(carpeta, "playas.db"))
+
+        # Parámetros generales
+        if datos.get('parametros', {}):
+            rutas_a_generar.append(os.path.join(carpeta, "parametros.db"))
+
+        # Parámetros de carga/descarga
+        if datos.get('parametros_carga_descarga', []):
+            rutas_a_generar.append(os.path.join(carpeta, "tipo_carga_descarga.db"))
+        return rutas_a_generar
+
+    @staticmethod
+    def total_filas(datos):
+        """Número de filas que tendrá cada base de datos, para informar del progreso."""
+        return {
+            "puntos.db": len(datos["nodos"]),
+            "objetivos.db": sum(1 for _ in ExportadorDB._nodos_con_objetivo(datos)),
+            "rutas.db": len(datos["rutas"]),
+            "playas.db": len(datos.get('parametros_playa', [])),
+            "parametros.db": len(datos.get('parametros', {})),
+            "tipo_carga_descarga.db": len(datos.get('parametros_carga_descarga', [])),
+        }
+
+    @staticmethod
+    def _con_progreso(filas, aviso):
+        """Pasa las filas tal cual llamando a aviso(n) cada CADA_FILAS_PROGRESO filas."""
+        n = 0
+        for n, fila in enumerate(filas, 1):
+            if n % ExportadorDB.CADA_FILAS_PROGRESO == 0:
+                aviso(n)
+            yield fila
+
+    @staticmethod
+    def _exportar_archivo(datos, ruta_db, escala, progreso=None, incremental=False):
+        nombre = os.path.basename(ruta_db)
+        funcion = getattr(ExportadorDB, ExportadorDB.ARCHIVOS[nombre])
+        aviso = (lambda n: progreso(nombre, n)) if progreso is not None else None
+        if nombre == "puntos.db":
+            filas = funcion(datos, ruta_db, escala, aviso=aviso, incremental=incremental)
+        else:
+            filas = funcion(datos, ruta_db, aviso=aviso, incremental=incremental)
+        if progreso is not None:
+            progreso(nombre, filas)
+        print(f"✓ {nombre}: {filas} filas")
+        return filas
+
+    @staticmethod
+    def lanzar_exportacion(pool, datos, carpeta, escala=0.05, rutas_a_generar=None, progreso=None,
+                           incremental=False):
+        """
+        Envía al pool una tarea por base de datos. datos es una instantánea
+        del proyecto (Proyecto.instantanea()), que no cambia mientras se
+        edita. progreso(nombre_archivo, filas_escritas) se llama desde los
+        hilos del pool. Con incremental=True las bases de datos existentes
+        se actualizan con solo las diferencias. Devuelve {future: nombre_archivo}.
+        """
+        if rutas_a_generar is None:
+            rutas_a_generar = ExportadorDB.archivos_a_generar(datos, carpeta)
+        return {
+            pool.submit(ExportadorDB._exportar_archivo, datos, ruta_db, escala, progreso, incremental):
+                os.path.basename(ruta_db)
+            for ruta_db in rutas_a_generar
+        }
+
+    @staticmethod
+    def exportar_a_carpeta(datos, carpeta, escala=0.05, rutas_a_generar=None, progreso=None, max_hilos=None,
+                           incremental=False):
+        """
+        Genera las bases de datos en carpeta en paralelo (un hilo por archivo)
+        sin interacción con el usuario. Devuelve {nombre_archivo: filas_insertadas};
+        si alguna falla, se relanza su excepción cuando terminan todas.
+        """
+        if rutas_a_generar is None:
+            rutas_a_generar = ExportadorDB.archivos_a_generar(datos, carpeta)
+        with ThreadPoolExecutor(max_workers=max_hilos or len(ExportadorDB.ARCHIVOS)) as pool:
+            tareas = ExportadorDB.lanzar_exportacion(pool, datos, carpeta, escala, rutas_a_generar, progreso,
+                                                     incremental)
+        return {nombre: futuro.result() for futuro, nombre in tareas.items()}
+
+    @staticmethod
+    def _exportar_con_progreso(datos, carpeta, escala, rutas_a_generar, view, incremental=False):
+        """
+        Lanza la exportación en un pool de hilos y, mientras tanto, mantiene
+        la interfaz viva con un diálogo que muestra las filas escritas de
+        cada archivo. Relanza la primera excepción de los hilos.
+        """
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtWidgets import QProgressDialog, QApplication
+        totales = ExportadorDB.total_filas(datos)
+        nombres = [os.path.basename(r) for r in rutas_a_generar]
+        escritas = dict.fromkeys(nombres, 0)
+
+        def progreso(nombre, filas):
+            # Se llama desde los hilos del pool; el diálogo solo lee el diccionario
+            escritas[nombre] = filas
+
+        dialogo = QProgressDialog("Exportando bases de datos...", None, 0, max(1, sum(totales[n] for n in nombres)), view)
+        dialogo.setWindowTitle("Exportar a SQLite")
+        dialogo.setWindowModality(Qt.WindowModal)
+        dialogo.setMinimumDuration(500)
+        try:
+            with ThreadPoolExecutor(max_workers=len(nombres)) as pool:
+                tareas = ExportadorDB.lanzar_exportacion(pool, datos, carpeta, escala, rutas_a_generar, progreso,
+                                                         incremental)
+                pendientes = set(tareas)
+                while pendientes:
+                    _, pendientes = wait(pendientes, timeout=0.05)
+                    dialogo.setLabelText("Exportando bases de datos...\n\n" + "\n".join(
+                        f"{nombre}: {escritas[nombre]}/{totales[nombre]}" for nombre in nombres))
+                    dialogo.setValue(min(dialogo.maximum() - 1, sum(escritas.values())))
+                    QApplication.processEvents()
+            for futuro in tareas:
+                futuro.result()
+        finally:
+            dialogo.close()
+
     @staticmethod
     def exportar(proyecto, view, escala=0.05):
         """
@@ -16,7 +461,11 @@ class ExportadorDB:
         - parametros.db: parámetros generales del sistema
         - tipo_carga_descarga.db: parámetros de carga/descarga
         Las coordenadas se exportan en metros usando la escala proporcionada.
+        Los archivos se generan en paralelo a partir de una instantánea del
+        proyecto mientras un diálogo muestra el progreso de cada uno.
         """
+        # Widgets importados aquí: el resto del módulo se usa sin interfaz (export.py)
+        from PyQt5.QtWidgets import QFileDialog, QMessageBox
         if not proyecto:
             QMessageBox.warning(view, "Error", "No hay proyecto cargado.")
             return
@@ -29,318 +478,61 @@ class ExportadorDB:
         if not carpeta:
             return  # El usuario canceló
 
-        # --- VERIFICAR ARCHIVOS EXISTENTES ---
-        rutas_a_generar = []
-        # Archivos que se generan siempre
-        rutas_a_generar.append(os.path.join(carpeta, "puntos.db"))
-        rutas_a_generar.append(os.path.join(carpeta, "rutas.db"))
-
-        # Objetivos (solo si hay nodos con objetivo != 0)
-        if any(n.get("objetivo", 0) != 0 for n in proyecto.nodos):
-            rutas_a_generar.append(os.path.join(carpeta, "objetivos.db"))
-
-        # Parámetros de playa
-        if getattr(proyecto, 'parametros_playa', []):
-            rutas_a_generar.append(os.path.join(carpeta, "playas.db"))
-
-        # Parámetros generales
-        if getattr(proyecto, 'parametros', {}):
-            rutas_a_generar.append(os.path.join(carpeta, "parametros.db"))
+        # Instantánea inmutable: los hilos de exportación no tocan el modelo
+        datos = proyecto.instantanea()
 
-        # Parámetros de carga/descarga
-        if getattr(proyecto, 'parametros_carga_descarga', []):
-            rutas_a_generar.append(os.path.join(carpeta, "tipo_carga_descarga.db"))
+        # --- VERIFICAR ARCHIVOS EXISTENTES ---
+        rutas_a_generar = ExportadorDB.archivos_a_generar(datos, carpeta)
 
         # Filtrar los que ya existen
         existentes = [r for r in rutas_a_generar if os.path.exists(r)]
         if existentes:
             msg = "Los siguientes archivos ya existen en la carpeta seleccionada:\n\n"
             msg += "\n".join(f"  • {os.path.basename(r)}" for r in existentes)
-            msg += "\n\n¿Deseas sobrescribirlos?"
-            respuesta = QMessageBox.question(
-                view,
-                "Confirmar sobrescritura",
-                msg,
-                QMessageBox.Yes | QMessageBox.No,
-                QMessageBox.No
-            )
-            if respuesta != QMessageBox.Yes:
+            msg += "\n\n¿Deseas sobrescribirlos o actualizar solo los cambios?"
+            caja = QMessageBox(QMessageBox.Question, "Confirmar sobrescritura", msg, QMessageBox.NoButton, view)
+            boton_actualizar = caja.addButton("Actualizar solo cambios", QMessageBox.AcceptRole)
+            boton_sobrescribir = caja.addButton("Sobrescribir", QMessageBox.DestructiveRole)
+            caja.addButton(QMessageBox.Cancel)
+            caja.setDefaultButton(QMessageBox.Cancel)
+            caja.exec_()
+            if caja.clickedButton() not in (boton_actualizar, boton_sobrescribir):
                 return
+            # Incremental: solo INSERT/UPDATE/DELETE de las filas que han cambiado
+            incremental = caja.clickedButton() is boton_actualizar
+        else:
+            incremental = False
 
         # --- CONTINUAR CON LA EXPORTACIÓN NORMAL ---
         try:
-            # --- Exportar nodos (puntos básicos) usando esquema ---
-            conn_nodos = sqlite3.connect(os.path.join(carpeta, "puntos.db"))
-            cursor_nodos = conn_nodos.cursor()
-
-            # Eliminar tabla si existe
-            cursor_nodos.execute("DROP TABLE IF EXISTS nodos")
-
-            # Construir CREATE TABLE dinámico según NODO_FIELDS
-            column_defs = []
-            for key, info in NODO_FIELDS.items():
-                col_name = info.get('csv_name', key)
-                db_type = info.get('db_type', 'TEXT')
-                # Ajustar PRIMARY KEY si es id
-                if key == 'id':
-                    # Quitar 'PRIMARY KEY' si ya está incluido en db_type y añadirlo al final
-                    if 'PRIMARY KEY' in db_type:
-                        db_type = db_type.replace('PRIMARY KEY', '').strip()
-                    column_defs.append(f"{col_name} {db_type} PRIMARY KEY")
-                else:
-                    column_defs.append(f"{col_name} {db_type}")
-            create_sql = f"CREATE TABLE nodos ({', '.join(column_defs)})"
-            cursor_nodos.execute(create_sql)
-
-            # Insertar datos
-            for nodo in proyecto.nodos:
-                if hasattr(nodo, 'to_dict'):
-                    datos = nodo.to_dict()
-                else:
-                    datos = nodo
-
-                valores = []
-                for key, info in NODO_FIELDS.items():
-                    col_name = info.get('csv_name', key)
-                    valor = datos.get(key, info['default'])
-                    if key == 'X' or key == 'Y':
-                        valor = valor * escala
-                    valores.append(valor)
-
-                placeholders = ','.join(['?' for _ in NODO_FIELDS])
-                insert_sql = f"INSERT INTO nodos VALUES ({placeholders})"
-                cursor_nodos.execute(insert_sql, valores)
-
-            conn_nodos.commit()
-            conn_nodos.close()
-
-            # --- Exportar objetivos (nodos con objetivo != 0) ---
-            if os.path.join(carpeta, "objetivos.db") in rutas_a_generar:
-                conn_objetivos = sqlite3.connect(os.path.join(carpeta, "objetivos.db"))
-                cursor_objetivos = conn_objetivos.cursor()
-
-                cursor_objetivos.execute("DROP TABLE IF EXISTS objetivos")
-
-                # Construir tabla con campo nodo_id y los campos de OBJETIVO_FIELDS
-                column_defs = ["nodo_id INTEGER PRIMARY KEY"]
-                for key, info in OBJETIVO_FIELDS.items():
-                    col_name = info.get('csv_name', key)
-                    db_type = info.get('db_type', 'TEXT')
-                    column_defs.append(f"{col_name} {db_type}")
-                create_sql = f"CREATE TABLE objetivos ({', '.join(column_defs)})"
-                cursor_objetivos.execute(create_sql)
-
-                for nodo in proyecto.nodos:
-                    if hasattr(nodo, 'to_dict'):
-                        datos = nodo.to_dict()
-                    else:
-                        datos = nodo
-
-                    if datos.get('objetivo', 0) != 0:
-                        valores = [datos.get('id')]
-                        for key, info in OBJETIVO_FIELDS.items():
-                            valor = datos.get(key, info['default'])
-                            valores.append(valor)
-                        placeholders = ','.join(['?' for _ in range(len(valores))])
-                        insert_sql = f"INSERT INTO objetivos VALUES ({placeholders})"
-                        cursor_objetivos.execute(insert_sql, valores)
-
-                conn_objetivos.commit()
-                conn_objetivos.close()
-
-            # --- Exportar rutas (estructura fija, no usa esquema) ---
-            conn_rutas = sqlite3.connect(os.path.join(carpeta, "rutas.db"))
-            cursor_rutas = conn_rutas.cursor()
-
-            cursor_rutas.execute("DROP TABLE IF EXISTS rutas")
-            cursor_rutas.execute("""
-                CREATE TABLE rutas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    origen_id INTEGER,
-                    destino_id INTEGER,
-                    visitados TEXT
-                )
-            """)
-
-            for ruta in proyecto.rutas:
-                if hasattr(ruta, 'to_dict'):
-                    ruta_dict = ruta.to_dict()
-                else:
-                    ruta_dict = ruta
-
-                origen = ruta_dict.get('origen', {})
-                destino = ruta_dict.get('destino', {})
-                visita = ruta_dict.get('visita', [])
-
-                origen_id = origen.get('id') if isinstance(origen, dict) else None
-                destino_id = destino.get('id') if isinstance(destino, dict) else None
-
-                visitados_ids = []
-                if origen_id is not None:
-                    visitados_ids.append(str(origen_id))
-
-                for v in visita:
-                    if isinstance(v, dict):
-                        visitados_ids.append(str(v.get('id', '')))
-                    else:
-                        visitados_ids.append(str(v))
-
-                if destino_id is not None:
-                    visitados_ids.append(str(destino_id))
-
-                visitados_str = ','.join(visitados_ids)
-
-                cursor_rutas.execute("""
-                    INSERT INTO rutas (origen_id, destino_id, visitados)
-                    VALUES (?, ?, ?)
-                """, (origen_id, destino_id, visitados_str))
-
-            conn_rutas.commit()
-            conn_rutas.close()
-
-            # --- Exportar parámetros de playa (dinámico, igual que antes) ---
-            if os.path.join(carpeta, "playas.db") in rutas_a_generar:
-                parametros_playa = getattr(proyecto, 'parametros_playa', [])
-                if parametros_playa:
-                    conn_playa = sqlite3.connect(os.path.join(carpeta, "playas.db"))
-                    cursor_playa = conn_playa.cursor()
-
-                    cursor_playa.execute("DROP TABLE IF EXISTS parametros_playa")
-
-                    # Obtener todas las propiedades únicas de todos los registros
-                    todas_las_propiedades = set()
-                    for playa in parametros_playa:
-                        todas_las_propiedades.update(playa.keys())
-
-                    propiedades_ordenadas = sorted(todas_las_propiedades)
-                    if 'ID' in propiedades_ordenadas:
-                        propiedades_ordenadas.remove('ID')
-                        propiedades_ordenadas = ['ID'] + propiedades_ordenadas
-
-                    # Construir CREATE TABLE dinámico
-                    create_table_sql = f"""
-                        CREATE TABLE parametros_playa (
-                            {propiedades_ordenadas[0]} INTEGER PRIMARY KEY,
-                    """
-                    for i, prop in enumerate(propiedades_ordenadas[1:], 1):
-                        create_table_sql += f"\n    {prop} TEXT"
-                        if i < len(propiedades_ordenadas) - 1:
-                            create_table_sql += ","
-                    create_table_sql += "\n)"
-                    cursor_playa.execute(create_table_sql)
-
-                    for playa in parametros_playa:
-                        valores = []
-                        placeholders = []
-                        for prop in propiedades_ordenadas:
-                            placeholders.append("?")
-                            valor = playa.get(prop, "")
-                            valores.append(str(valor) if valor is not None else "")
-                        insert_sql = f"""
-                            INSERT INTO parametros_playa ({', '.join(propiedades_ordenadas)})
-                            VALUES ({', '.join(placeholders)})
-                        """
-                        cursor_playa.execute(insert_sql, tuple(valores))
-
-                    conn_playa.commit()
-                    conn_playa.close()
-
-            # --- Exportar parámetros generales (usando esquema, pero simple clave-valor) ---
-            if os.path.join(carpeta, "parametros.db") in rutas_a_generar:
-                parametros = getattr(proyecto, 'parametros', {})
-                if parametros:
-                    conn_param = sqlite3.connect(os.path.join(carpeta, "parametros.db"))
-                    cursor_param = conn_param.cursor()
-
-                    cursor_param.execute("DROP TABLE IF EXISTS parametros")
-                    cursor_param.execute("""
-                        CREATE TABLE parametros (
-                            clave TEXT PRIMARY KEY,
-                            valor TEXT
-                        )
-                    """)
-
-                    for clave, valor in parametros.items():
-                        cursor_param.execute("""
-                            INSERT OR REPLACE INTO parametros (clave, valor)
-                            VALUES (?, ?)
-                        """, (clave, str(valor)))
-
-                    conn_param.commit()
-                    conn_param.close()
-
-            # --- Exportar tipo_carga_descarga (dinámico, igual que antes) ---
-            if os.path.join(carpeta, "tipo_carga_descarga.db") in rutas_a_generar:
-                parametros_carga_descarga = getattr(proyecto, 'parametros_carga_descarga', [])
-                if parametros_carga_descarga:
-                    conn_carga = sqlite3.connect(os.path.join(carpeta, "tipo_carga_descarga.db"))
-                    cursor_carga = conn_carga.cursor()
-
-                    cursor_carga.execute("DROP TABLE IF EXISTS tipo_carga_descarga")
-
-                    # Obtener todas las propiedades únicas de todos los registros
-                    todas_las_propiedades = set()
-                    for item in parametros_carga_descarga:
-                        todas_las_propiedades.update(item.keys())
-
-                    propiedades_ordenadas = sorted(todas_las_propiedades)
-                    if 'ID' in propiedades_ordenadas:
-                        propiedades_ordenadas.remove('ID')
-                        propiedades_ordenadas = ['ID'] + propiedades_ordenadas
-
-                    # Construir CREATE TABLE dinámico
-                    create_table_sql = f"""
-                        CREATE TABLE tipo_carga_descarga (
-                            {propiedades_ordenadas[0]} INTEGER PRIMARY KEY,
-                    """
-                    for i, prop in enumerate(propiedades_ordenadas[1:], 1):
-                        create_table_sql += f"\n    {prop} TEXT"
-                        if i < len(propiedades_ordenadas) - 1:
-                            create_table_sql += ","
-                    create_table_sql += "\n)"
-                    cursor_carga.execute(create_table_sql)
-
-                    for item in parametros_carga_descarga:
-                        valores = []
-                        placeholders = []
-                        for prop in propiedades_ordenadas:
-                            placeholders.append("?")
-                            valor = item.get(prop, "")
-                            valores.append(str(valor) if valor is not None else "")
-                        insert_sql = f"""
-                            INSERT INTO tipo_carga_descarga ({', '.join(propiedades_ordenadas)})
-                            VALUES ({', '.join(placeholders)})
-                        """
-                        cursor_carga.execute(insert_sql, tuple(valores))
-
-                    conn_carga.commit()
-                    conn_carga.close()
+            ExportadorDB._exportar_con_progreso(datos, carpeta, escala, rutas_a_generar, view, incremental)
 
             # Mostrar mensaje de éxito
-            nodos_con_objetivo = sum(1 for n in proyecto.nodos if n.get("objetivo", 0) != 0)
+            total_filas = ExportadorDB.total_filas(datos)
+            nodos_con_objetivo = total_filas["objetivos.db"]
             archivos_creados = [
-                f"• {os.path.basename(rutas_a_generar[0])} ({len(proyecto.nodos)} nodos)",
-                f"• {os.path.basename(rutas_a_generar[1])} ({len(proyecto.rutas)} rutas)"
+                f"• {os.path.basename(rutas_a_generar[0])} ({len(datos['nodos'])} nodos)",
+                f"• {os.path.basename(rutas_a_generar[1])} ({len(datos['rutas'])} rutas)"
             ]
             if os.path.join(carpeta, "objetivos.db") in rutas_a_generar:
                 archivos_creados.append(f"• objetivos.db ({nodos_con_objetivo} nodos con objetivo)")
             if os.path.join(carpeta, "playas.db") in rutas_a_generar:
-                archivos_creados.append(f"• playas.db ({len(getattr(proyecto, 'parametros_playa', []))} playas)")
+                archivos_creados.append(f"• playas.db ({total_filas['playas.db']} playas)")
             if os.path.join(carpeta, "parametros.db") in rutas_a_generar:
-                archivos_creados.append(f"• parametros.db ({len(getattr(proyecto, 'parametros', {}))} parámetros)")
+                archivos_creados.append(f"• parametros.db ({total_filas['parametros.db']} parámetros)")
             if os.path.join(carpeta, "tipo_carga_descarga.db") in rutas_a_generar:
-                archivos_creados.append(f"• tipo_carga_descarga.db ({len(getattr(proyecto, 'parametros_carga_descarga', []))} tipos)")
+                archivos_creados.append(f"• tipo_carga_descarga.db ({total_filas['tipo_carga_descarga.db']} tipos)")
 
             QMessageBox.information(
                 view,
                 "Exportación completada",
                 f"Se han exportado:\n"
-                f"• Nodos: {len(proyecto.nodos)}\n"
-                f"• Rutas: {len(proyecto.rutas)}\n"
+                f"• Nodos: {len(datos['nodos'])}\n"
+                f"• Rutas: {len(datos['rutas'])}\n"
                 f"• Nodos con objetivo: {nodos_con_objetivo}\n"
-                f"• Playas: {len(getattr(proyecto, 'parametros_playa', []))}\n"
-                f"• Parámetros generales: {len(getattr(proyecto, 'parametros', {}))}\n"
-                f"• Tipos carga/descarga: {len(getattr(proyecto, 'parametros_carga_descarga', []))}\n\n"
+                f"• Playas: {total_filas['playas.db']}\n"
+                f"• Parámetros generales: {total_filas['parametros.db']}\n"
+                f"• Tipos carga/descarga: {total_filas['tipo_carga_descarga.db']}\n\n"
                 f"Archivos creados en:\n{carpeta}\n" + "\n".join(archivos_creados) + f"\n\n"
                 f"Coordenadas exportadas en METROS (escala: {escala})"
             )
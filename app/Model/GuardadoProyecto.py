@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Escritura atómica de proyectos y guardado en segundo plano.
+
+El guardado trabaja sobre una instantánea (Proyecto.instantanea()), una
+copia independiente del modelo, de modo que la serialización puede hacerse
+en otro hilo mientras se sigue editando. El archivo se escribe primero en
+un temporal del mismo directorio y después se sustituye con os.replace:
+un fallo a mitad de escritura nunca deja el archivo destino truncado.
+"""
+import json
+import os
+import stat
+import tempfile
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from .ContenedorProyecto import ContenedorProyecto
+from .Nodo import Nodo
+
+_SEPARADORES = (",", ":")
+_TAM_LOTE = 1000  # elementos de nodos/rutas serializados de una vez
+
+# Permisos de un archivo nuevo según la umask del proceso (mkstemp crea los
+# temporales solo legibles por el usuario). Se lee al importar, desde el
+# hilo principal: os.umask cambia un valor global del proceso
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def reemplazar_atomico(ruta_archivo, escribir_en):
+    """
+    Llama a escribir_en(ruta_temporal) y, si termina bien, sustituye
+    ruta_archivo por el temporal en una sola operación. El temporal tiene
+    un nombre único: dos escrituras a la vez en la misma ruta (un guardado
+    en segundo plano y otro síncrono, u otra instancia del editor) no
+    comparten archivo.
+    """
+    carpeta, nombre = os.path.split(os.path.abspath(ruta_archivo))
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix=nombre + ".", suffix=".tmp")
+    os.close(descriptor)
+    try:
+        escribir_en(temporal)
+        # Asegurar que los datos están en disco antes del cambio de nombre
+        with open(temporal, "rb+") as f:
+            os.fsync(f.fileno())
+        if os.path.exists(ruta_archivo):
+            os.chmod(temporal, stat.S_IMODE(os.stat(ruta_archivo).st_mode))
+        else:
+            os.chmod(temporal, 0o666 & ~_UMASK)
+        os.replace(temporal, ruta_archivo)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _escribir_json(ruta_archivo, datos):
+    """
+    JSON compacto escrito por partes: las listas se serializan por lotes
+    con json.dumps (codificador en C) para no retener el GIL durante todo
+    el guardado y que la interfaz siga respondiendo.
+    """
+    with open(ruta_archivo, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i, (clave, valor) in enumerate(datos.items()):
+            if i:
+                f.write(",")
+            f.write(json.dumps(clave, ensure_ascii=False) + ":")
+            if not isinstance(valor, list) or len(valor) <= _TAM_LOTE:
+                f.write(json.dumps(valor, separators=_SEPARADORES, ensure_ascii=False))
+                continue
+            f.write("[")
+            for inicio in range(0, len(valor), _TAM_LOTE):
+                if inicio:
+                    f.write(",")
+                lote = json.dumps(valor[inicio:inicio + _TAM_LOTE], separators=_SEPARADORES, ensure_ascii=False)
+                f.write(lote[1:-1])
+            f.write("]")
+        f.write("}")
+
+
+def datos_serializables(instantanea):
+    """Convierte Proyecto.instantanea() en la estructura JSON del formato de guardado."""
+    datos = dict(instantanea)
+    datos["nodos"] = [Nodo.dict_compacto(n) for n in instantanea.get("nodos", [])]
+    datos["rutas"] = [ruta.to_dict() for ruta in instantanea.get("rutas", [])]
+    return datos
+
+
+def escribir_instantanea(ruta_archivo, instantanea):
+    """Escribe de forma atómica una instantánea en JSON o en el contenedor SQLite según la extensión."""
+    datos = datos_serializables(instantanea)
+    if ruta_archivo.lower().endswith(ContenedorProyecto.EXTENSION):
+        reemplazar_atomico(ruta_archivo, lambda temporal: ContenedorProyecto.escribir(temporal, datos))
+    else:
+        reemplazar_atomico(ruta_archivo, lambda temporal: _escribir_json(temporal, datos))
+
+
+class HiloGuardado(QThread):
+    """Escribe una instantánea del proyecto fuera del hilo de la interfaz."""
+
+    guardado_terminado = pyqtSignal(str, bool, str)  # ruta, éxito, mensaje de error
+
+    def __init__(self, ruta_archivo, datos, parent=None):
+        super().__init__(parent)
+        self.ruta_archivo = ruta_archivo
+        self.datos = datos
+
+    def run(self):
+        try:
+            escribir_instantanea(self.ruta_archivo, self.datos)
+            self.guardado_terminado.emit(self.ruta_archivo, True, "")
+        except Exception as e:
+            self.guardado_terminado.emit(self.ruta_archivo, False, str(e))
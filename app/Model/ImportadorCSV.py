@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Importación de los archivos CSV generados por ExportadorCSV (también los
+comprimidos .csv.gz y .csv.zst) a un Proyecto. En CSV todo es texto: los
+valores se convierten a los tipos de schema.py y el resto de la
+construcción del proyecto es la de ImportadorDB.
+"""
+import csv
+import gzip
+import io
+import os
+
+from .ImportadorDB import ImportadorDB
+from .ExportadorCSV import ExportadorCSV, zstandard
+
+
+class ImportadorCSV:
+    @staticmethod
+    def _buscar(carpeta, nombre):
+        """Ruta del CSV nombre (sin comprimir o comprimido) y su compresión; (None, None) si no existe."""
+        for compresion, sufijo in ExportadorCSV.COMPRESIONES.items():
+            ruta = os.path.join(carpeta, nombre + ".csv" + sufijo)
+            if os.path.exists(ruta):
+                return ruta, compresion
+        return None, None
+
+    @staticmethod
+    def _abrir(ruta_archivo, compresion=None):
+        """Archivo de texto para csv.reader, descomprimido según compresion."""
+        if compresion is None:
+            return open(ruta_archivo, 'r', newline='', encoding='utf-8', buffering=ExportadorCSV.TAM_BUFFER)
+        if compresion == "gzip":
+            return gzip.open(ruta_archivo, 'rt', newline='', encoding='utf-8')
+        if compresion == "zstd":
+            if zstandard is None:
+                raise RuntimeError("La descompresión zstd requiere el paquete 'zstandard'")
+            crudo = zstandard.ZstdDecompressor().stream_reader(open(ruta_archivo, 'rb'), closefd=True)
+            return io.TextIOWrapper(io.BufferedReader(crudo, ExportadorCSV.TAM_BUFFER),
+                                    encoding='utf-8', newline='')
+        raise ValueError(f"Compresión desconocida: {compresion}")
+
+    @staticmethod
+    def _leer(carpeta, nombre):
+        """(columnas, filas) del CSV, con la cabecera como columnas; None si no existe."""
+        ruta, compresion = ImportadorCSV._buscar(carpeta, nombre)
+        if ruta is None:
+            return None
+        with ImportadorCSV._abrir(ruta, compresion) as f:
+            lector = csv.reader(f)
+            columnas = next(lector, [])
+            return columnas, list(lector)
+
+    @staticmethod
+    def importar_de_carpeta(carpeta, escala=0.05, mapa=""):
+        """Crea un Proyecto con los CSV de carpeta (sin interacción con el usuario)."""
+        if ImportadorCSV._buscar(carpeta, "puntos")[0] is None:
+            raise FileNotFoundError(f"No se encuentra puntos.csv en {carpeta}")
+
+        como_diccionarios = ImportadorDB.como_diccionarios
+        parametros = ImportadorCSV._leer(carpeta, "parametros")
+        if parametros is not None:
+            parametros = {fila["clave"]: fila["valor"] for fila in como_diccionarios(parametros)}
+
+        # rutas.csv no lleva el id de la tabla: es la posición empezando en 1
+        rutas = ((i, f["origen_id"], f["destino_id"], f["visitados"])
+                 for i, f in enumerate(como_diccionarios(ImportadorCSV._leer(carpeta, "rutas")), 1))
+
+        return ImportadorDB.construir_proyecto(
+            ImportadorCSV._leer(carpeta, "puntos"),
+            ImportadorCSV._leer(carpeta, "objetivos"),
+            rutas,
+            parametros,
+            como_diccionarios(ImportadorCSV._leer(carpeta, "playas")),
+            como_diccionarios(ImportadorCSV._leer(carpeta, "tipo_carga_descarga")),
+            escala,
+            mapa,
+        )
+
+    @staticmethod
+    def importar(view, escala=0.05, mapa=""):
+        """Pide la carpeta con los CSV e importa el proyecto. None si se cancela o falla."""
+        from PyQt5.QtWidgets import QFileDialog, QMessageBox
+
+        carpeta = QFileDialog.getExistingDirectory(view, "Seleccionar carpeta con los archivos CSV a importar")
+        if not carpeta:
+            return None  # El usuario canceló
+        try:
+            return ImportadorCSV.importar_de_carpeta(carpeta, escala, mapa)
+        except Exception as e:
+            QMessageBox.critical(view, "Error en la importación", f"Ocurrió un error al importar: {str(e)}")
+            return None
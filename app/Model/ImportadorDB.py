@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Importación de las bases de datos generadas por ExportadorDB (las que usan
+los vehículos) a un Proyecto, para comparar lo ajustado en campo con el
+diseño sin volver a introducir los datos a mano.
+
+Las columnas se asocian a los campos por su csv_name de schema.py y las
+coordenadas se pasan de metros a píxeles con la misma escala de la
+exportación. Cada tabla se lee de una vez y los índices del proyecto
+(IDs, rejilla espacial, rutas por nodo) se construyen una sola vez al final.
+"""
+import os
+import sqlite3
+
+from .schema import CODEC_NODO, CODEC_OBJETIVO, CODEC_PARAMETROS, convertir_valor
+from .Nodo import Nodo
+from .Ruta import Ruta
+from .Proyecto import Proyecto
+from .ValidadorEsquema import ValidadorEsquema
+
+
+class ImportadorDB:
+    # Archivo -> tabla que contiene (los nombres que escribe ExportadorDB)
+    TABLAS = {
+        "puntos.db": "nodos",
+        "objetivos.db": "objetivos",
+        "rutas.db": "rutas",
+        "playas.db": "parametros_playa",
+        "parametros.db": "parametros",
+        "tipo_carga_descarga.db": "tipo_carga_descarga",
+    }
+
+    # --- CONVERSIÓN DE VALORES ---
+
+    @staticmethod
+    def valor_desde_texto(valor):
+        """Recupera el número de un valor guardado como texto ("5" -> 5, "0.5" -> 0.5)."""
+        if not isinstance(valor, str):
+            return valor
+        try:
+            return int(valor)
+        except ValueError:
+            try:
+                return float(valor)
+            except ValueError:
+                return valor
+
+    @staticmethod
+    def _filas_a_datos(columnas, filas, codec):
+        """Genera un diccionario por fila con claves internas y valores convertidos al esquema."""
+        convertir = convertir_valor
+        campos_columnas = codec.campos_de_columnas(columnas)
+        for fila in filas:
+            # type() is tipo evita la llamada de conversión en el caso habitual (ya tiene el tipo)
+            yield {clave: valor if tipo is None or type(valor) is tipo else convertir(valor, tipo, defecto)
+                   for (clave, tipo, defecto), valor in zip(campos_columnas, fila)}
+
+    # --- CONSTRUCCIÓN DEL PROYECTO ---
+    @staticmethod
+    def construir_proyecto(tabla_nodos, tabla_objetivos=None, filas_rutas=(), parametros=None,
+                           parametros_playa=None, parametros_carga_descarga=None, escala=0.05, mapa=""):
+        """
+        Crea un Proyecto a partir de tablas ya leídas:
+        - tabla_nodos / tabla_objetivos: (columnas, filas) con los nombres de
+          columna del esquema (csv_name) y las filas como tuplas; la de
+          objetivos lleva además 'nodo_id'.
+        - filas_rutas: tuplas (id, origen_id, destino_id, visitados).
+        - parametros_playa / parametros_carga_descarga: listas de diccionarios.
+        Las columnas que no están en el esquema se conservan en el nodo.
+        """
+        convertir = convertir_valor
+
+        datos_por_id = {}
+        for datos in ImportadorDB._filas_a_datos(*tabla_nodos, CODEC_NODO):
+            # Metros -> píxeles, sin el ruido de coma flotante de la división
+            datos['X'] = round((datos.get('X') or 0) / escala, 9)
+            datos['Y'] = round((datos.get('Y') or 0) / escala, 9)
+            datos_por_id[datos.get('id')] = datos
+
+        if tabla_objetivos is not None:
+            for objetivo in ImportadorDB._filas_a_datos(*tabla_objetivos, CODEC_OBJETIVO):
+                nodo_id = objetivo.pop('nodo_id', None)
+                datos = datos_por_id.get(convertir(nodo_id, int))
+                if datos is None:
+                    print(f"⚠ Objetivo de un nodo inexistente ignorado: {nodo_id}")
+                    continue
+                datos.update(objetivo)
+
+        nodos = [Nodo(datos) for datos in datos_por_id.values()]
+
+        rutas = []
+        for id_ruta, origen_id, destino_id, visitados in filas_rutas:
+            try:
+                ids = [int(v) for v in str(visitados or "").split(",") if v.strip()]
+                if not ids:
+                    ids = [int(i) for i in (origen_id, destino_id) if i not in (None, "")]
+                rutas.append(Ruta(ids, f"Ruta {id_ruta}"))
+            except (TypeError, ValueError) as e:
+                print(f"⚠ Ruta {id_ruta} ignorada por datos inválidos: {e}")
+
+        # Lo que no se pudo convertir toma el valor por defecto y se informa
+        problemas, normalizados = ValidadorEsquema.revisar_nodos(nodos, corregir=True)
+
+        # El constructor y la asignación de rutas construyen los índices una sola vez
+        proyecto = Proyecto(mapa, nodos)
+        proyecto.rutas = rutas
+        if parametros is not None:
+            tipos = CODEC_PARAMETROS.tipos_por_clave
+            defaults = CODEC_PARAMETROS.defaults_por_clave
+            proyecto.parametros = {
+                clave: convertir(valor, tipos[clave], defaults[clave])
+                if clave in tipos else ImportadorDB.valor_desde_texto(valor)
+                for clave, valor in parametros.items()
+            }
+            problemas_parametros, _ = ValidadorEsquema.revisar_parametros(proyecto.parametros, corregir=True)
+            problemas += problemas_parametros
+        proyecto.valores_invalidos = problemas
+        ValidadorEsquema.avisar(problemas, normalizados, "Importación")
+        # Las tablas de playas y carga/descarga guardan todo como texto
+        proyecto.parametros_playa = [{k: ImportadorDB.valor_desde_texto(v) for k, v in fila.items()}
+                                     for fila in (parametros_playa or [])]
+        proyecto.parametros_carga_descarga = [{k: ImportadorDB.valor_desde_texto(v) for k, v in fila.items()}
+                                              for fila in (parametros_carga_descarga or [])]
+
+        for ruta in rutas:
+            faltantes = [i for i in ruta if not proyecto.existe_nodo(i)]
+            if faltantes:
+                print(f"⚠ La ruta '{ruta.nombre}' referencia nodos inexistentes: {faltantes}")
+
+        print(f"✓ Proyecto importado: {len(nodos)} nodos, {len(rutas)} rutas, "
+              f"{len(proyecto.parametros)} parámetros, {len(proyecto.parametros_playa)} playas, "
+              f"{len(proyecto.parametros_carga_descarga)} tipos de carga/descarga")
+        return proyecto
+
+    # --- LECTURA DE LAS BASES DE DATOS ---
+    @staticmethod
+    def _leer_tabla(ruta_db, tabla, orden=None):
+        """(columnas, filas) de la tabla en una sola lectura; None si el archivo no existe."""
+        if not os.path.exists(ruta_db):
+            return None
+        uri = "file:" + os.path.abspath(ruta_db).replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            cursor = conn.execute(f"SELECT * FROM {tabla}" + (f" ORDER BY {orden}" if orden else ""))
+            return [d[0] for d in cursor.description], cursor.fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def como_diccionarios(tabla):
+        """Filas de (columnas, filas) como diccionarios; [] si la tabla es None."""
+        if tabla is None:
+            return []
+        columnas, filas = tabla
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+    @staticmethod
+    def importar_de_carpeta(carpeta, escala=0.05, mapa=""):
+        """Crea un Proyecto con las bases de datos de carpeta (sin interacción con el usuario)."""
+        if not os.path.exists(os.path.join(carpeta, "puntos.db")):
+            raise FileNotFoundError(f"No se encuentra puntos.db en {carpeta}")
+
+        def leer(archivo, orden=None):
+            return ImportadorDB._leer_tabla(os.path.join(carpeta, archivo), ImportadorDB.TABLAS[archivo], orden)
+
+        parametros = leer("parametros.db")
+        if parametros is not None:
+            parametros = {fila["clave"]: fila["valor"] for fila in ImportadorDB.como_diccionarios(parametros)}
+        rutas = ImportadorDB.como_diccionarios(leer("rutas.db", "id"))
+
+        return ImportadorDB.construir_proyecto(
+            leer("puntos.db"),
+            leer("objetivos.db"),
+            ((f["id"], f["origen_id"], f["destino_id"], f["visitados"]) for f in rutas),
+            parametros,
+            ImportadorDB.como_diccionarios(leer("playas.db")),
+            ImportadorDB.como_diccionarios(leer("tipo_carga_descarga.db")),
+            escala,
+            mapa,
+        )
+
+    @staticmethod
+    def importar(view, escala=0.05, mapa=""):
+        """Pide la carpeta con las bases de datos e importa el proyecto. None si se cancela o falla."""
+        from PyQt5.QtWidgets import QFileDialog, QMessageBox
+
+        carpeta = QFileDialog.getExistingDirectory(view, "Seleccionar carpeta con las bases de datos a importar")
+        if not carpeta:
+            return None  # El usuario canceló
+        try:
+            return ImportadorDB.importar_de_carpeta(carpeta, escala, mapa)
+        except Exception as e:
+            QMessageBox.critical(view, "Error en la importación", f"Ocurrió un error al importar: {str(e)}")
+            return None
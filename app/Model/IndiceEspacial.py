@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Índice espacial de nodos basado en una rejilla uniforme (hash de celdas).
+
+Cada nodo se guarda en la celda que contiene su posición, de modo que las
+consultas por rectángulo, radio o vecino más cercano solo recorren las
+celdas que tocan el área buscada en lugar de todos los nodos.
+"""
+import math
+
+
+class IndiceEspacial:
+    def __init__(self, tam_celda=50.0):
+        self.tam_celda = float(tam_celda)
+        self._celdas = {}      # (cx, cy) -> {nodo_id: (x, y)}
+        self._posiciones = {}  # nodo_id -> (x, y)
+
+    def _celda(self, x, y):
+        return (math.floor(x / self.tam_celda), math.floor(y / self.tam_celda))
+
+    def __len__(self):
+        return len(self._posiciones)
+
+    def __contains__(self, nodo_id):
+        return nodo_id in self._posiciones
+
+    def posicion(self, nodo_id):
+        """Posición indexada de un nodo o None si no está en el índice."""
+        return self._posiciones.get(nodo_id)
+
+    # --- MANTENIMIENTO ---
+    def insertar(self, nodo_id, x, y):
+        if nodo_id in self._posiciones:
+            self.eliminar(nodo_id)
+        x, y = float(x), float(y)
+        self._posiciones[nodo_id] = (x, y)
+        self._celdas.setdefault(self._celda(x, y), {})[nodo_id] = (x, y)
+
+    def eliminar(self, nodo_id):
+        posicion = self._posiciones.pop(nodo_id, None)
+        if posicion is None:
+            return False
+        celda = self._celda(*posicion)
+        contenido = self._celdas.get(celda)
+        if contenido is not None:
+            contenido.pop(nodo_id, None)
+            if not contenido:
+                del self._celdas[celda]
+        return True
+
+    def mover(self, nodo_id, x, y):
+        """Actualiza la posición de un nodo (lo inserta si no estaba)."""
+        anterior = self._posiciones.get(nodo_id)
+        x, y = float(x), float(y)
+        if anterior is not None and self._celda(*anterior) == self._celda(x, y):
+            # Misma celda: basta con actualizar la posición
+            self._posiciones[nodo_id] = (x, y)
+            self._celdas[self._celda(x, y)][nodo_id] = (x, y)
+            return
+        self.insertar(nodo_id, x, y)
+
+    def reconstruir(self, nodos):
+        """Reconstruye el índice completo a partir de objetos Nodo."""
+        self._celdas = {}
+        self._posiciones = {}
+        for nodo in nodos:
+            nodo_id = nodo.get("id")
+            if nodo_id is None:
+                continue
+            try:
+                self.insertar(nodo_id, nodo.get("X", 0), nodo.get("Y", 0))
+            except (TypeError, ValueError):
+                print(f"⚠ Nodo {nodo_id} con coordenadas inválidas, no se indexa")
+
+    # --- CONSULTAS ---
+    def en_rectangulo(self, x1, y1, x2, y2):
+        """IDs de los nodos dentro del rectángulo [x1, x2] x [y1, y2]."""
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        cx1, cy1 = self._celda(x1, y1)
+        cx2, cy2 = self._celda(x2, y2)
+
+        resultado = []
+        # Si el rectángulo abarca más celdas de las que hay ocupadas, recorrer las ocupadas
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._celdas):
+            celdas = (contenido for (cx, cy), contenido in self._celdas.items()
+                      if cx1 <= cx <= cx2 and cy1 <= cy <= cy2)
+        else:
+            celdas = (self._celdas.get((cx, cy)) for cx in range(cx1, cx2 + 1)
+                      for cy in range(cy1, cy2 + 1))
+        for contenido in celdas:
+            if not contenido:
+                continue
+            for nodo_id, (x, y) in contenido.items():
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    resultado.append(nodo_id)
+        return resultado
+
+    def en_radio(self, x, y, radio):
+        """IDs de los nodos a distancia <= radio de (x, y), del más cercano al más lejano."""
+        radio2 = radio * radio
+        candidatos = []
+        for nodo_id in self.en_rectangulo(x - radio, y - radio, x + radio, y + radio):
+            px, py = self._posiciones[nodo_id]
+            d2 = (px - x) ** 2 + (py - y) ** 2
+            if d2 <= radio2:
+                candidatos.append((d2, nodo_id))
+        candidatos.sort(key=lambda c: c[0])
+        return [nodo_id for _, nodo_id in candidatos]
+
+    def mas_cercano(self, x, y, radio_max=None, excluir=()):
+        """
+        Devuelve (nodo_id, distancia) del nodo más cercano a (x, y), o None.
+        Recorre anillos de celdas crecientes y se detiene en cuanto ningún
+        anillo posterior puede contener un nodo más cercano.
+        """
+        if not self._celdas:
+            return None
+        cx0, cy0 = self._celda(x, y)
+
+        # Límite de anillos: hasta radio_max o hasta cubrir todas las celdas ocupadas
+        if radio_max is not None:
+            max_anillo = int(math.ceil(radio_max / self.tam_celda)) + 1
+        else:
+            max_anillo = max(max(abs(cx - cx0), abs(cy - cy0)) for cx, cy in self._celdas)
+
+        mejor_id, mejor_d2 = None, float("inf")
+        limite_d2 = radio_max * radio_max if radio_max is not None else float("inf")
+        for anillo in range(max_anillo + 1):
+            # Distancia mínima posible a cualquier punto de este anillo
+            if mejor_id is not None and ((anillo - 1) * self.tam_celda) ** 2 > mejor_d2:
+                break
+            for celda in self._celdas_anillo(cx0, cy0, anillo):
+                contenido = self._celdas.get(celda)
+                if not contenido:
+                    continue
+                for nodo_id, (px, py) in contenido.items():
+                    if nodo_id in excluir:
+                        continue
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 < mejor_d2 and d2 <= limite_d2:
+                        mejor_id, mejor_d2 = nodo_id, d2
+        if mejor_id is None:
+            return None
+        return mejor_id, math.sqrt(mejor_d2)
+
+    @staticmethod
+    def _celdas_anillo(cx0, cy0, anillo):
+        """Celdas del perímetro del cuadrado de lado 2*anillo+1 centrado en (cx0, cy0)."""
+        if anillo == 0:
+            yield (cx0, cy0)
+            return
+        for cx in range(cx0 - anillo, cx0 + anillo + 1):
+            yield (cx, cy0 - anillo)
+            yield (cx, cy0 + anillo)
+        for cy in range(cy0 - anillo + 1, cy0 + anillo):
+            yield (cx0 - anillo, cy)
+            yield (cx0 + anillo, cy)
+
+    def superpuestos(self, radio):
+        """Lista de pares (id_a, id_b) de nodos a distancia <= radio entre sí."""
+        pares = []
+        revisados = set()
+        for nodo_id, (x, y) in self._posiciones.items():
+            for otro_id in self.en_radio(x, y, radio):
+                # Cada par se informa una sola vez
+                if otro_id != nodo_id and otro_id not in revisados:
+                    pares.append((nodo_id, otro_id))
+            revisados.add(nodo_id)
+        return pares
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Lector incremental de archivos JSON de proyecto.
+
+Lee el archivo por bloques y decodifica cada valor con
+json.JSONDecoder.raw_decode, de modo que los arrays grandes ("nodos",
+"rutas") se recorren elemento a elemento sin cargar el documento completo
+en memoria. Informa del progreso en bytes y permite cancelar la lectura.
+"""
+import codecs
+import json
+import os
+import re
+
+_ESPACIOS = re.compile(r'[ \t\n\r]*')
+
+
+class CargaCancelada(Exception):
+    """Se lanza cuando el usuario cancela la lectura desde la callback de progreso."""
+
+
+class LectorJSON:
+    TAM_BLOQUE = 1 << 20  # 1 MiB
+
+    def __init__(self, archivo, progreso=None, total=None, tam_bloque=TAM_BLOQUE):
+        """
+        archivo: objeto de archivo abierto en modo binario.
+        progreso: callable(leidos, total) llamado tras cada bloque leído;
+                  si devuelve False se cancela la lectura con CargaCancelada.
+        total: tamaño del archivo en bytes (se calcula si es posible).
+        """
+        self._archivo = archivo
+        self._decodificador_utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._progreso = progreso
+        self._tam_bloque = tam_bloque
+        self._buffer = ""
+        self._pos = 0
+        self._fin = False
+        self.leidos = 0
+        if total is None:
+            try:
+                total = os.fstat(archivo.fileno()).st_size
+            except (AttributeError, OSError, ValueError):
+                total = 0
+        self.total = total
+
+    # --- BUFFER ---
+    def _rellenar(self, tam=None):
+        """Añade otro bloque al buffer descartando lo ya consumido. False si no hay más datos."""
+        if self._fin:
+            return False
+        bloque = self._archivo.read(tam or self._tam_bloque)
+        self._fin = not bloque
+        self.leidos += len(bloque)
+        texto = self._decodificador_utf8.decode(bloque, final=self._fin)
+        self._buffer = self._buffer[self._pos:] + texto
+        self._pos = 0
+        if self._progreso is not None and self._progreso(self.leidos, self.total) is False:
+            raise CargaCancelada("Lectura cancelada por el usuario")
+        return bool(texto) or not self._fin
+
+    def _siguiente_caracter(self):
+        """Salta espacios y devuelve el siguiente carácter sin consumirlo ('' al final)."""
+        while True:
+            self._pos = _ESPACIOS.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._rellenar():
+                return ""
+
+    def _esperar(self, caracter):
+        encontrado = self._siguiente_caracter()
+        if encontrado != caracter:
+            raise ValueError(f"JSON inválido: se esperaba '{caracter}' y se encontró "
+                             f"'{encontrado or 'fin de archivo'}' (byte ~{self.leidos})")
+        self._pos += 1
+
+    def _valor(self):
+        """Decodifica el siguiente valor JSON completo, leyendo más bloques si hace falta."""
+        self._siguiente_caracter()
+        tam = self._tam_bloque
+        while True:
+            try:
+                valor, fin = self._decoder.raw_decode(self._buffer, self._pos)
+                # Un número al final del buffer puede estar cortado: asegurarse con más datos
+                if fin < len(self._buffer) or self._fin:
+                    self._pos = fin
+                    return valor
+            except json.JSONDecodeError:
+                if self._fin:
+                    raise
+            # Valor incompleto: leer más (en bloques crecientes para valores muy grandes)
+            self._rellenar(tam)
+            tam *= 2
+
+    # --- RECORRIDO ---
+    def elementos(self):
+        """Genera los elementos del array que empieza en la posición actual."""
+        self._esperar("[")
+        if self._siguiente_caracter() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._valor()
+            separador = self._siguiente_caracter()
+            self._pos += 1
+            if separador == "]":
+                return
+            if separador != ",":
+                raise ValueError(f"JSON inválido: se esperaba ',' o ']' (byte ~{self.leidos})")
+
+    def secciones(self, en_streaming=()):
+        """
+        Recorre el objeto raíz y genera pares (clave, valor). Para las claves
+        de en_streaming el valor es un generador de sus elementos, que debe
+        consumirse antes de pedir la siguiente sección.
+        """
+        self._esperar("{")
+        if self._siguiente_caracter() == "}":
+            self._pos += 1
+            return
+        while True:
+            clave = self._valor()
+            self._esperar(":")
+            if clave in en_streaming and self._siguiente_caracter() == "[":
+                elementos = self.elementos()
+                yield clave, elementos
+                # Descartar lo que el consumidor no haya recorrido
+                for _ in elementos:
+                    pass
+            else:
+                yield clave, self._valor()
+            separador = self._siguiente_caracter()
+            self._pos += 1
+            if separador == "}":
+                return
+            if separador != ",":
+                raise ValueError(f"JSON inválido: se esperaba ',' o '}}' (byte ~{self.leidos})")
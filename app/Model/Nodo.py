@@ -1,37 +1,129 @@
-from .schema import NODO_FIELDS, OBJETIVO_FIELDS
+from operator import attrgetter
+
+from .schema import CODEC_NODO, CODEC_OBJETIVO
+
+# Campos fijos de todo nodo (uno por slot) y campos de objetivo
+CAMPOS_NODO = CODEC_NODO.claves
+CAMPOS_OBJETIVO = CODEC_OBJETIVO.claves
+_DEFAULTS_OBJETIVO = CODEC_OBJETIVO.defaults_por_clave  # solo lectura: se copia al materializar
+_DEFAULTS_NODO = CODEC_NODO.defaults
+_PARES_NODO = tuple(zip(CAMPOS_NODO, _DEFAULTS_NODO))
+_CLAVES_NODO = frozenset(CAMPOS_NODO)
+_CLAVES_OBJETIVO = frozenset(CAMPOS_OBJETIVO)
+_valores_campos = attrgetter(*CAMPOS_NODO)
+
 
 class Nodo:
+    """
+    Nodo compacto: los campos de NODO_FIELDS se guardan en __slots__ y los
+    de OBJETIVO_FIELDS solo se materializan cuando el nodo tiene objetivo
+    (o algún campo de objetivo con valor distinto del defecto). Los puntos
+    de paso simples no reservan memoria para esos campos, pero get/to_dict
+    siguen devolviendo sus valores por defecto.
+    """
+
+    __slots__ = CAMPOS_NODO + ('_objetivo', '_extra')
+
     def __init__(self, datos: dict = None):
         """
         Inicializa un nodo con los valores del esquema.
         Si se pasa un diccionario, se sobreescriben los valores por defecto.
         """
-        self._datos = {}
-        # Cargar valores por defecto de NODO_FIELDS
-        for key, info in NODO_FIELDS.items():
-            self._datos[key] = info['default']
-        # También los campos de objetivo (aunque sean 0 por defecto)
-        for key, info in OBJETIVO_FIELDS.items():
-            self._datos[key] = info['default']
+        # Los campos de objetivo no se crean hasta que hacen falta
+        self._objetivo = None
+        # Claves fuera del esquema (se conservan para no perder datos)
+        self._extra = None
+
+        # Valores por defecto ya compilados en schema (sin recorrer NODO_FIELDS)
+        for key, defecto in _PARES_NODO:
+            setattr(self, key, defecto)
 
         if datos:
-            self._datos.update(datos)
+            self.update(datos)
+
+    def _materializar_objetivo(self):
+        if self._objetivo is None:
+            self._objetivo = dict(_DEFAULTS_OBJETIVO)
+        return self._objetivo
 
     def get(self, clave, default=None):
-        return self._datos.get(clave, default)
+        if clave in _CLAVES_NODO:
+            return getattr(self, clave)
+        if clave in _CLAVES_OBJETIVO:
+            objetivo = self._objetivo if self._objetivo is not None else _DEFAULTS_OBJETIVO
+            return objetivo[clave]
+        if self._extra is not None:
+            return self._extra.get(clave, default)
+        return default
 
     def update(self, nuevos_datos: dict):
-        self._datos.update(nuevos_datos)
+        for clave, valor in nuevos_datos.items():
+            if clave in _CLAVES_NODO:
+                setattr(self, clave, valor)
+            elif clave in _CLAVES_OBJETIVO:
+                if self._objetivo is not None or valor != _DEFAULTS_OBJETIVO[clave]:
+                    self._materializar_objetivo()[clave] = valor
+            else:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[clave] = valor
+
+        # Un nodo con objetivo siempre lleva sus campos materializados
+        if self.objetivo and self._objetivo is None:
+            self._materializar_objetivo()
+
+    def tiene_campos_objetivo(self):
+        """Indica si los campos de objetivo están materializados."""
+        return self._objetivo is not None
+
+    def campos_objetivo(self):
+        """Diccionario de campos de objetivo (sin copiar, solo lectura) o None si no están materializados."""
+        return self._objetivo
 
     def to_dict(self):
-        return self._datos.copy()
+        datos = {key: getattr(self, key) for key in CAMPOS_NODO}
+        datos.update(self._objetivo if self._objetivo is not None else _DEFAULTS_OBJETIVO)
+        if self._extra:
+            datos.update(self._extra)
+        return datos
+
+    def to_dict_compacto(self):
+        """
+        Como to_dict pero omitiendo los campos con su valor por defecto
+        (el 'id' se incluye siempre). Nodo(datos) restaura los omitidos.
+        """
+        return Nodo.dict_compacto(self.instantanea())
+
+    def instantanea(self):
+        """
+        Copia ligera del estado del nodo: tupla con los valores de los campos
+        y copias de los diccionarios de objetivo y extra. Permite serializar
+        el nodo en otro hilo con dict_compacto() mientras se sigue editando.
+        """
+        return (_valores_campos(self),
+                dict(self._objetivo) if self._objetivo is not None else None,
+                dict(self._extra) if self._extra else None)
+
+    @staticmethod
+    def dict_compacto(instantanea):
+        """Diccionario sin campos por defecto a partir de Nodo.instantanea()."""
+        valores, objetivo, extra = instantanea
+        datos = {key: valor for key, valor, defecto in zip(CAMPOS_NODO, valores, _DEFAULTS_NODO)
+                 if valor != defecto or key == 'id'}
+        if objetivo is not None:
+            for key, valor in objetivo.items():
+                if valor != _DEFAULTS_OBJETIVO[key]:
+                    datos[key] = valor
+        if extra:
+            datos.update(extra)
+        return datos
 
     def set_posicion(self, x, y):
-        self._datos["X"] = x
-        self._datos["Y"] = y
+        self.X = x
+        self.Y = y
 
     def get_posicion(self):
-        return self._datos.get("X"), self._datos.get("Y")
+        return self.X, self.Y
 
     def __repr__(self):
-        return f"Nodo({self._datos})"
\ No newline at end of file
+        return f"Nodo({self.to_dict()})"
@@ -1,10 +1,22 @@
 # -*- coding: utf-8 -*-
-import json
+import copy
 from PyQt5.QtCore import QObject, pyqtSignal
 from Model.Nodo import Nodo
-from .schema import PARAMETROS_FIELDS, PLAYA_DEFAULT_FIELDS, CARGA_DESC_DEFAULT_FIELDS
+from Model.Ruta import Ruta
+from Model.ColumnasNodos import ColumnasNodos
+from Model.IndiceEspacial import IndiceEspacial
+from Model.LectorJSON import LectorJSON
+from Model.ContenedorProyecto import ContenedorProyecto
+from Model.GuardadoProyecto import escribir_instantanea
+from Model.ValidadorEsquema import ValidadorEsquema
+from .schema import CODEC_PARAMETROS, PLAYA_DEFAULT_FIELDS, CARGA_DESC_DEFAULT_FIELDS
 
 class Proyecto(QObject):  # Ahora hereda de QObject para usar señales
+    # Versión del formato de archivo que escribe guardar().
+    #   1: rutas con origen/visita/destino (copias de nodos o IDs), nodos completos, indentado
+    #   2: rutas {"nombre", "ids"}, nodos sin campos por defecto, JSON compacto
+    VERSION_FORMATO = 2
+
     # Señales para notificar cambios
     nodo_modificado = pyqtSignal(object)  # Emite el nodo modificado
     ruta_modificada = pyqtSignal(object)  # Emite la ruta modificada
@@ -13,19 +25,295 @@ class Proyecto(QObject):  # Ahora hereda de QObject para usar señales
     ruta_agregada = pyqtSignal(object)   # Nuevo: ruta agregada
     parametros_carga_descarga_modificados = pyqtSignal(list)  # Nuevo: parámetros carga/descarga modificados
     parametros_playa_modificados = pyqtSignal(list)          # Nuevo: parámetros playa modificados
+    nodos_transformados = pyqtSignal(list)  # Nodos movidos por una operación en bloque
+    parametros_modificados = pyqtSignal(dict)  # Parámetros generales modificados
+
+    # Señales de bajo nivel emitidas también por los métodos "silenciosos"
+    # (insertar/eliminar/mover...). La interfaz no las usa; sirven para
+    # registrar cada cambio del modelo (p. ej. el diario de autoguardado).
+    nodo_insertado = pyqtSignal(object)    # Nodo añadido (también al deshacer)
+    nodo_movido = pyqtSignal(object)       # Nodo con nueva posición (arrastre, deshacer)
+    nodo_eliminado = pyqtSignal(object)    # ID del nodo eliminado
+    ruta_insertada = pyqtSignal(int)       # Índice de la ruta añadida
+    ruta_reemplazada = pyqtSignal(int)     # Índice de la ruta sustituida
+    ruta_eliminada = pyqtSignal(int)       # Índice que tenía la ruta eliminada
+    rutas_reemplazadas = pyqtSignal()      # Lista completa de rutas sustituida
     
     def __init__(self, mapa=None, nodos=None, rutas=None):
         super().__init__()
         self.mapa = mapa
+        self._secciones_pendientes = {}  # nombre -> callable que carga la sección bajo demanda
+        self._nodos_por_id = {}   # Índice id -> Nodo para búsquedas O(1)
+        self._id_maximo = 0
+        self._indice_espacial = IndiceEspacial()  # Rejilla sobre las posiciones de los nodos
+        self._rutas_por_nodo = {}  # Índice inverso nodo_id -> {(ruta_idx, posición)}
+        self._ids_indexados = []   # IDs con los que se indexó cada ruta
+        self.valores_invalidos = []  # Problemas de ValidadorEsquema corregidos al cargar/importar
         self.nodos = nodos if nodos is not None else []
         self.rutas = rutas if rutas is not None else []
         self.parametros = self._parametros_por_defecto()
         self.parametros_playa = self._parametros_playa_por_defecto()   # ← ahora con datos
         self.parametros_carga_descarga = self._parametros_carga_descarga_por_defecto()   # ← ahora con datos
 
+    # --- ÍNDICE DE NODOS POR ID ---
+    @property
+    def nodos(self):
+        """Lista de nodos del proyecto"""
+        return self._nodos
+
+    @nodos.setter
+    def nodos(self, nodos):
+        """Al reemplazar la lista completa se reconstruye el índice por ID"""
+        self._nodos = nodos if nodos is not None else []
+        self._reindexar_nodos()
+
+    def _reindexar_nodos(self):
+        """Reconstruye el índice id -> Nodo a partir de la lista de nodos."""
+        self._nodos_por_id = {}
+        for nodo in self._nodos:
+            nodo_id = nodo.get("id")
+            if nodo_id in self._nodos_por_id:
+                print(f"⚠ ID de nodo duplicado en el proyecto: {nodo_id}")
+            self._nodos_por_id[nodo_id] = nodo
+        self._id_maximo = max((i for i in self._nodos_por_id if isinstance(i, int)), default=0)
+        self._indice_espacial.reconstruir(self._nodos)
+
+    def obtener_nodo(self, nodo_id):
+        """Devuelve el nodo con el ID indicado o None si no existe (O(1))."""
+        return self._nodos_por_id.get(nodo_id)
+
+    def existe_nodo(self, nodo_id):
+        """Indica si existe un nodo con el ID indicado."""
+        return nodo_id in self._nodos_por_id
+
+    def ids_nodos(self):
+        """Devuelve una vista de los IDs de nodo existentes."""
+        return self._nodos_por_id.keys()
+
+    def insertar_nodo(self, nodo):
+        """
+        Inserta un nodo ya construido (p. ej. al deshacer una eliminación)
+        manteniendo el índice. Solo emite nodo_insertado.
+        """
+        nodo_id = nodo.get("id")
+        if nodo_id in self._nodos_por_id:
+            print(f"⚠ El nodo {nodo_id} ya existe en el proyecto, no se inserta")
+            return self._nodos_por_id[nodo_id]
+        self._nodos.append(nodo)
+        self._nodos_por_id[nodo_id] = nodo
+        if isinstance(nodo_id, int) and nodo_id > self._id_maximo:
+            self._id_maximo = nodo_id
+        if nodo_id is not None:
+            self._indice_espacial.insertar(nodo_id, nodo.get("X", 0), nodo.get("Y", 0))
+        self.nodo_insertado.emit(nodo)
+        return nodo
+
+    def eliminar_nodo(self, nodo_id):
+        """
+        Quita un nodo de la lista y del índice. Devuelve el nodo eliminado o None.
+        No toca las rutas ni avisa a la interfaz (solo emite nodo_eliminado).
+        """
+        nodo = self._nodos_por_id.pop(nodo_id, None)
+        if nodo is None:
+            return None
+        try:
+            self._nodos.remove(nodo)
+        except ValueError:
+            self._nodos[:] = [n for n in self._nodos if n.get("id") != nodo_id]
+        if nodo_id == self._id_maximo:
+            self._id_maximo = max((i for i in self._nodos_por_id if isinstance(i, int)), default=0)
+        self._indice_espacial.eliminar(nodo_id)
+        self.nodo_eliminado.emit(nodo_id)
+        return nodo
+
+    # --- ÍNDICE ESPACIAL ---
+    def mover_nodo(self, nodo, x, y):
+        """
+        Cambia la posición de un nodo manteniendo el índice espacial.
+        Solo emite nodo_movido (se usa durante el arrastre, en cada movimiento).
+        """
+        nodo.set_posicion(x, y)
+        nodo_id = nodo.get("id")
+        if nodo_id in self._nodos_por_id:
+            self._indice_espacial.mover(nodo_id, x, y)
+            self.nodo_movido.emit(nodo)
+
+    def nodos_en_rectangulo(self, x1, y1, x2, y2):
+        """Nodos cuyo centro está dentro del rectángulo (coordenadas de escena)."""
+        return [self._nodos_por_id[i] for i in self._indice_espacial.en_rectangulo(x1, y1, x2, y2)]
+
+    def nodos_en_radio(self, x, y, radio):
+        """Nodos a distancia <= radio de (x, y), ordenados del más cercano al más lejano."""
+        return [self._nodos_por_id[i] for i in self._indice_espacial.en_radio(x, y, radio)]
+
+    def nodo_mas_cercano(self, x, y, radio_max=None, excluir=()):
+        """Nodo más cercano a (x, y) (opcionalmente dentro de radio_max) o None."""
+        resultado = self._indice_espacial.mas_cercano(x, y, radio_max, excluir)
+        return self._nodos_por_id[resultado[0]] if resultado else None
+
+    def nodos_superpuestos(self, radio, nodo_id=None):
+        """
+        Pares de nodos a distancia <= radio. Si se indica nodo_id, devuelve
+        solo los nodos que se solapan con ese nodo.
+        """
+        if nodo_id is None:
+            return [(self._nodos_por_id[a], self._nodos_por_id[b])
+                    for a, b in self._indice_espacial.superpuestos(radio)]
+        posicion = self._indice_espacial.posicion(nodo_id)
+        if posicion is None:
+            return []
+        return [self._nodos_por_id[i] for i in self._indice_espacial.en_radio(*posicion, radio)
+                if i != nodo_id]
+
+    # --- SECCIONES CON CARGA DIFERIDA (contenedor SQLite) ---
+    def _cargar_seccion(self, nombre):
+        """Carga la sección indicada si estaba pendiente de leer del contenedor."""
+        cargador = self._secciones_pendientes.pop(nombre, None)
+        if cargador is not None:
+            # Cargar no es modificar: no notificar el reemplazo de la sección
+            bloqueadas = self.blockSignals(True)
+            try:
+                setattr(self, nombre, cargador())
+            finally:
+                self.blockSignals(bloqueadas)
+            print(f"✓ Sección '{nombre}' cargada bajo demanda")
+
+    def secciones_pendientes(self):
+        """Nombres de las secciones que todavía no se han leído del contenedor."""
+        return list(self._secciones_pendientes)
+
+    def cargar_secciones_pendientes(self):
+        for nombre in self.secciones_pendientes():
+            self._cargar_seccion(nombre)
+
+    @property
+    def parametros(self):
+        self._cargar_seccion("parametros")
+        return self._parametros
+
+    @parametros.setter
+    def parametros(self, parametros):
+        self._secciones_pendientes.pop("parametros", None)
+        self._parametros = parametros
+
+    @property
+    def parametros_playa(self):
+        self._cargar_seccion("parametros_playa")
+        return self._parametros_playa
+
+    @parametros_playa.setter
+    def parametros_playa(self, parametros):
+        self._secciones_pendientes.pop("parametros_playa", None)
+        self._parametros_playa = parametros
+
+    @property
+    def parametros_carga_descarga(self):
+        self._cargar_seccion("parametros_carga_descarga")
+        return self._parametros_carga_descarga
+
+    @parametros_carga_descarga.setter
+    def parametros_carga_descarga(self, parametros):
+        self._secciones_pendientes.pop("parametros_carga_descarga", None)
+        self._parametros_carga_descarga = parametros
+
+    # --- ÍNDICE INVERSO NODO -> RUTAS ---
+    @property
+    def rutas(self):
+        """Lista de rutas del proyecto"""
+        self._cargar_seccion("rutas")
+        return self._rutas
+
+    @rutas.setter
+    def rutas(self, rutas):
+        """Al reemplazar la lista completa se reconstruye el índice inverso"""
+        self._secciones_pendientes.pop("rutas", None)
+        self._rutas = [self._como_ruta(r) for r in rutas] if rutas is not None else []
+        self._reindexar_rutas()
+        self.rutas_reemplazadas.emit()
+
+    @staticmethod
+    def _como_ruta(ruta):
+        """Convierte diccionarios (formato antiguo) en objetos Ruta."""
+        return ruta if isinstance(ruta, Ruta) else Ruta.desde_dict(ruta)
+
+    def _indexar_ruta(self, ruta_idx):
+        """Registra en el índice inverso los nodos de la ruta indicada."""
+        ids = tuple(self._rutas[ruta_idx])
+        while len(self._ids_indexados) <= ruta_idx:
+            self._ids_indexados.append(())
+        self._ids_indexados[ruta_idx] = ids
+        for posicion, nodo_id in enumerate(ids):
+            self._rutas_por_nodo.setdefault(nodo_id, set()).add((ruta_idx, posicion))
+
+    def _desindexar_ruta(self, ruta_idx):
+        """Quita del índice inverso las entradas de la ruta indicada."""
+        if ruta_idx >= len(self._ids_indexados):
+            return
+        for posicion, nodo_id in enumerate(self._ids_indexados[ruta_idx]):
+            entradas = self._rutas_por_nodo.get(nodo_id)
+            if entradas is None:
+                continue
+            entradas.discard((ruta_idx, posicion))
+            if not entradas:
+                del self._rutas_por_nodo[nodo_id]
+        self._ids_indexados[ruta_idx] = ()
+
+    def _reindexar_rutas(self):
+        """Reconstruye el índice inverso completo (carga o reemplazo de rutas)."""
+        self._rutas_por_nodo = {}
+        self._ids_indexados = []
+        for ruta_idx in range(len(self._rutas)):
+            self._indexar_ruta(ruta_idx)
+
+    def _indice_rutas(self):
+        """Índice inverso nodo_id -> {(ruta_idx, posición)}, con las rutas ya cargadas."""
+        self._cargar_seccion("rutas")
+        return self._rutas_por_nodo
+
+    def rutas_con_nodo(self, nodo_id):
+        """Devuelve los índices (ordenados) de las rutas que contienen el nodo."""
+        return sorted({ruta_idx for ruta_idx, _ in self._indice_rutas().get(nodo_id, ())})
+
+    def posiciones_nodo(self, nodo_id):
+        """Devuelve el conjunto de (ruta_idx, posición) donde aparece el nodo."""
+        return set(self._indice_rutas().get(nodo_id, ()))
+
+    def ruta_contiene_nodo(self, ruta_idx, nodo_id):
+        """Indica si la ruta ruta_idx contiene el nodo indicado."""
+        return any(idx == ruta_idx for idx, _ in self._indice_rutas().get(nodo_id, ()))
+
+    def insertar_ruta(self, ruta):
+        """Añade una ruta al final manteniendo el índice. Solo emite ruta_insertada."""
+        self._cargar_seccion("rutas")
+        ruta = self._como_ruta(ruta)
+        self._rutas.append(ruta)
+        self._indexar_ruta(len(self._rutas) - 1)
+        self.ruta_insertada.emit(len(self._rutas) - 1)
+        return ruta
+
+    def reemplazar_ruta(self, ruta_index, ruta):
+        """Sustituye una ruta manteniendo el índice. Solo emite ruta_reemplazada."""
+        self._cargar_seccion("rutas")
+        if not 0 <= ruta_index < len(self._rutas):
+            return False
+        self._desindexar_ruta(ruta_index)
+        self._rutas[ruta_index] = self._como_ruta(ruta)
+        self._indexar_ruta(ruta_index)
+        self.ruta_reemplazada.emit(ruta_index)
+        return True
+
+    def nodos_de_ruta(self, ruta):
+        """Resuelve los IDs de una ruta a objetos Nodo (omite IDs inexistentes)."""
+        nodos = []
+        for nodo_id in ruta:
+            nodo = self._nodos_por_id.get(nodo_id)
+            if nodo is not None:
+                nodos.append(nodo)
+        return nodos
+
     def _parametros_por_defecto(self):
         """Devuelve los parámetros por defecto del sistema usando el esquema"""
-        return {k: v['default'] for k, v in PARAMETROS_FIELDS.items()}
+        return dict(CODEC_PARAMETROS.defaults_por_clave)
     
     def _parametros_carga_descarga_por_defecto(self):
         """Devuelve los parámetros de carga/descarga por defecto"""
@@ -91,7 +379,7 @@ class Proyecto(QObject):  # Ahora hereda de QObject para usar señales
 
     def agregar_nodo(self, x, y):
         """Crea un nodo con atributos iniciales y lo añade al proyecto."""
-        nuevo_id = max((n.get("id") for n in self.nodos), default=0) + 1
+        nuevo_id = self._id_maximo + 1
 
         datos = {
             "id": nuevo_id,
@@ -100,7 +388,7 @@ class Proyecto(QObject):  # Ahora hereda de QObject para usar señales
         }
         # No es necesario incluir todos los campos, ya que Nodo los inicializa con defaults.
         nodo = Nodo(datos)
-        self.nodos.append(nodo)
+        self.insertar_nodo(nodo)
         
         # Notificar que se agregó un nodo
         self.nodo_agregado.emit(nodo)
@@ -109,43 +397,39 @@ class Proyecto(QObject):  # Ahora hereda de QObject para usar señales
 
     def actualizar_nodo(self, nodo_actualizado: dict):
         """Actualiza un nodo existente con los datos proporcionados."""
-        for nodo in self.nodos:
-            if nodo.get("id") == nodo_actualizado.get("id"):
-                # Actualizar solo las claves proporcionadas
-                for key, value in nodo_actualizado.items():
-                    if key != "id":  # No actualizar el ID
-                        if hasattr(nodo, 'update'):
-                            nodo.update({key: value})
-                        else:
-                            setattr(nodo, key, value)
-                
-                # Notificar que el nodo fue modificado
-                self.nodo_modificado.emit(nodo)
-                self.proyecto_cambiado.emit()
-                return nodo
-        return None
+        nodo = self.obtener_nodo(nodo_actualizado.get("id"))
+        if nodo is None:
+            return None
 
-    def agregar_ruta(self, ruta_dict):
-        """Agrega una ruta y notifica el cambio."""
-        if not hasattr(self, "rutas") or self.rutas is None:
-            self.rutas = []
-        
-        # Asegurar que la ruta tenga un nombre por defecto si no lo tiene
-        if "nombre" not in ruta_dict:
-            ruta_dict["nombre"] = "Ruta"
-        
-        self.rutas.append(ruta_dict)
+        # Actualizar solo las claves proporcionadas
+        for key, value in nodo_actualizado.items():
+            if key != "id":  # No actualizar el ID
+                if hasattr(nodo, 'update'):
+                    nodo.update({key: value})
+                else:
+                    setattr(nodo, key, value)
+
+        if "X" in nodo_actualizado or "Y" in nodo_actualizado:
+            self._indice_espacial.mover(nodo.get("id"), nodo.get("X", 0), nodo.get("Y", 0))
+
+        # Notificar que el nodo fue modificado
+        self.nodo_modificado.emit(nodo)
+        self.proyecto_cambiado.emit()
+        return nodo
+
+    def agregar_ruta(self, ruta):
+        """Agrega una ruta (Ruta o diccionario) y notifica el cambio."""
+        ruta = self.insertar_ruta(ruta)
         # Notificar que se agregó una ruta
-        self.ruta_agregada.emit(ruta_dict)
+        self.ruta_agregada.emit(ruta)
         self.proyecto_cambiado.emit()
-        return ruta_dict
+        return ruta
 
-    def actualizar_ruta(self, ruta_index, ruta_dict):
+    def actualizar_ruta(self, ruta_index, ruta):
         """Actualiza una ruta y notifica el cambio."""
-        if 0 <= ruta_index < len(self.rutas):
-            self.rutas[ruta_index] = ruta_dict
+        if self.reemplazar_ruta(ruta_index, ruta):
             # Notificar que la ruta fue modificada
-            self.ruta_modificada.emit(ruta_dict)
+            self.ruta_modificada.emit(self._rutas[ruta_index])
             self.proyecto_cambiado.emit()
             return True
         return False
@@ -153,12 +437,81 @@ class Proyecto(QObject):  # Ahora hereda de QObject para usar señales
     def eliminar_ruta(self, ruta_index):
         """Elimina una ruta y notifica el cambio."""
         if 0 <= ruta_index < len(self.rutas):
-            ruta_eliminada = self.rutas.pop(ruta_index)
+            # Quitar sus entradas y desplazar los índices de las rutas posteriores
+            self._desindexar_ruta(ruta_index)
+            for idx in range(ruta_index + 1, len(self._rutas)):
+                for posicion, nodo_id in enumerate(self._ids_indexados[idx]):
+                    entradas = self._rutas_por_nodo[nodo_id]
+                    entradas.discard((idx, posicion))
+                    entradas.add((idx - 1, posicion))
+            del self._ids_indexados[ruta_index]
+            ruta_eliminada = self._rutas.pop(ruta_index)
             # Notificar que se eliminó una ruta
+            self.ruta_eliminada.emit(ruta_index)
             self.proyecto_cambiado.emit()
             return ruta_eliminada
         return None
+
+    # --- OPERACIONES EN BLOQUE SOBRE LA GEOMETRÍA (vista columnar) ---
+    def columnas_nodos(self, campos=ColumnasNodos.CAMPOS_POR_DEFECTO, nodos=None):
+        """Devuelve una vista columnar (NumPy si está disponible) de los nodos."""
+        return ColumnasNodos(self._nodos if nodos is None else nodos, campos)
+
+    def _transformar_nodos(self, operacion, ids=None, campos=('X', 'Y')):
+        """
+        Ejecuta operacion(columnas) sobre los campos (X/Y, y A en rotaciones
+        y reflexiones) de los nodos indicados (todos si ids es None), escribe
+        el resultado en los Nodo y notifica.
+        """
+        if ids is None:
+            nodos = self._nodos
+        else:
+            nodos = [self._nodos_por_id[i] for i in ids if i in self._nodos_por_id]
+        if not nodos:
+            return []
+
+        columnas = self.columnas_nodos(campos, nodos)
+        operacion(columnas)
+        columnas.aplicar(campos)
+        for nodo in nodos:
+            x, y = nodo.get_posicion()
+            self._indice_espacial.mover(nodo.get("id"), x, y)
+
+        self.nodos_transformados.emit(nodos)
+        self.proyecto_cambiado.emit()
+        return nodos
+
+    def trasladar_nodos(self, dx, dy, ids=None):
+        """Desplaza (dx, dy) los nodos indicados (todos si ids es None)."""
+        return self._transformar_nodos(lambda c: c.trasladar(dx, dy), ids)
+
+    def rotar_nodos(self, grados, centro=None, ids=None):
+        """Rota los nodos indicados (posición y orientación) alrededor de centro (centroide por defecto)."""
+        return self._transformar_nodos(lambda c: c.rotar(grados, centro), ids, ('X', 'Y', 'A'))
+
+    def escalar_nodos(self, fx, fy=None, centro=None, ids=None):
+        """Escala los nodos indicados respecto a centro (centroide por defecto)."""
+        return self._transformar_nodos(lambda c: c.escalar(fx, fy, centro), ids)
+
+    def reflejar_nodos(self, eje='x', centro=None, ids=None):
+        """Refleja los nodos indicados (posición y orientación) respecto al eje horizontal ('x') o vertical ('y')."""
+        return self._transformar_nodos(lambda c: c.reflejar(eje, centro), ids, ('X', 'Y', 'A'))
+
+    def convertir_unidades_nodos(self, factor, ids=None):
+        """
+        Multiplica las coordenadas por factor respecto al origen, p. ej.
+        factor=escala para píxeles -> metros o 1/escala para metros -> píxeles.
+        """
+        return self._transformar_nodos(lambda c: c.escalar(factor, factor, (0.0, 0.0)), ids)
     
+    def actualizar_parametros(self, nuevos_parametros):
+        """Actualiza los parámetros generales (normalizados al tipo del esquema)"""
+        problemas, _ = ValidadorEsquema.revisar_parametros(nuevos_parametros, corregir=True)
+        ValidadorEsquema.avisar(problemas, 0, "Parámetros")
+        self.parametros = nuevos_parametros
+        self.parametros_modificados.emit(self.parametros)
+        self.proyecto_cambiado.emit()
+
     # NUEVO: Métodos para manejar parámetros de carga/descarga
     def actualizar_parametros_carga_descarga(self, nuevos_parametros):
         """Actualiza los parámetros de carga/descarga"""
@@ -187,230 +540,157 @@ class Proyecto(QObject):  # Ahora hereda de QObject para usar señales
             return self._parametros_playa_por_defecto()
         return self.parametros_playa
 
-    def guardar(self, ruta_archivo):
-        """Guarda el proyecto en un archivo JSON con nodos completos en rutas."""
-        # Preparar rutas con nodos completos
-        rutas_con_nodos_completos = []
-        for ruta in self.rutas:
-            try:
-                ruta_dict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-            except Exception:
-                ruta_dict = ruta
-            
-            # Crear copia de la ruta con nodos completos
-            ruta_completa = {}
-            
-            # Copiar nombre si existe, sino asignar "Ruta" por defecto
-            ruta_completa["nombre"] = ruta_dict.get("nombre", "Ruta")
-            
-            # Origen completo
-            origen = ruta_dict.get("origen")
-            if origen:
-                # Si origen es solo un ID, buscar el nodo completo
-                if isinstance(origen, int):
-                    nodo_completo = next((n for n in self.nodos if n.get('id') == origen), None)
-                    if nodo_completo:
-                        ruta_completa["origen"] = nodo_completo.to_dict() if hasattr(nodo_completo, "to_dict") else nodo_completo
-                    else:
-                        ruta_completa["origen"] = {"id": origen, "X": 0, "Y": 0}
-                elif isinstance(origen, dict):
-                    # Si ya es un diccionario, usarlo tal cual
-                    ruta_completa["origen"] = origen
-                else:
-                    # Si es un objeto Nodo
-                    ruta_completa["origen"] = origen.to_dict() if hasattr(origen, "to_dict") else origen
-            
-            # Destino completo
-            destino = ruta_dict.get("destino")
-            if destino:
-                if isinstance(destino, int):
-                    nodo_completo = next((n for n in self.nodos if n.get('id') == destino), None)
-                    if nodo_completo:
-                        ruta_completa["destino"] = nodo_completo.to_dict() if hasattr(nodo_completo, "to_dict") else nodo_completo
-                    else:
-                        ruta_completa["destino"] = {"id": destino, "X": 0, "Y": 0}
-                elif isinstance(destino, dict):
-                    ruta_completa["destino"] = destino
-                else:
-                    ruta_completa["destino"] = destino.to_dict() if hasattr(destino, "to_dict") else destino
-            
-            # Visita completa
-            visita = ruta_dict.get("visita", [])
-            if visita:
-                visita_completa = []
-                for nodo_visita in visita:
-                    if isinstance(nodo_visita, int):
-                        nodo_completo = next((n for n in self.nodos if n.get('id') == nodo_visita), None)
-                        if nodo_completo:
-                            visita_completa.append(nodo_completo.to_dict() if hasattr(nodo_completo, "to_dict") else nodo_completo)
-                        else:
-                            visita_completa.append({"id": nodo_visita, "X": 0, "Y": 0})
-                    elif isinstance(nodo_visita, dict):
-                        visita_completa.append(nodo_visita)
-                    else:
-                        visita_completa.append(nodo_visita.to_dict() if hasattr(nodo_visita, "to_dict") else nodo_visita)
-                ruta_completa["visita"] = visita_completa
-            
-            rutas_con_nodos_completos.append(ruta_completa)
-        
-        datos = {
+    def instantanea(self):
+        """
+        Copia independiente del modelo, tomada en el hilo de la interfaz lo
+        más rápido posible (nodos como Nodo.instantanea(), rutas como copias
+        de Ruta) para serializarla después en otro hilo mientras se sigue
+        editando el proyecto. Ver GuardadoProyecto.datos_serializables.
+        """
+        return {
+            "version": self.VERSION_FORMATO,
             "mapa": self.mapa,
-            "nodos": [n.to_dict() for n in self.nodos],
-            "rutas": rutas_con_nodos_completos,  # Nodos completos
-            "parametros": self.parametros,  # incluir parámetros
-            "parametros_playa": self.parametros_playa,  # incluir parámetros de playa
-            "parametros_carga_descarga": self.parametros_carga_descarga  # NUEVO: incluir parámetros de carga/descarga
+            "nodos": [n.instantanea() for n in self.nodos],
+            "rutas": [ruta.copia() for ruta in self.rutas],  # Solo IDs, las coordenadas están en "nodos"
+            "parametros": copy.deepcopy(self.parametros),  # incluir parámetros
+            "parametros_playa": copy.deepcopy(self.parametros_playa),  # incluir parámetros de playa
+            "parametros_carga_descarga": copy.deepcopy(self.parametros_carga_descarga)  # NUEVO: incluir parámetros de carga/descarga
         }
+
+    def guardar(self, ruta_archivo):
+        """
+        Guarda el proyecto en un archivo JSON con el formato VERSION_FORMATO:
+        rutas como listas de IDs, nodos sin los campos con valor por defecto
+        y sin indentación. Con la extensión de ContenedorProyecto se guarda
+        en el contenedor SQLite por secciones. La escritura es atómica
+        (archivo temporal + os.replace).
+        """
+        datos = self.instantanea()
+        escribir_instantanea(ruta_archivo, datos)
         
-        with open(ruta_archivo, "w", encoding="utf-8") as f:
-            json.dump(datos, f, indent=4, ensure_ascii=False)
-        
-        print(f"✓ Proyecto guardado con {len(rutas_con_nodos_completos)} rutas, "
-              f"{len(self.parametros)} parámetros, {len(self.parametros_playa)} parámetros de playa "
-              f"y {len(self.parametros_carga_descarga)} parámetros de carga/descarga")
+        print(f"✓ Proyecto guardado con {len(datos['nodos'])} nodos, {len(datos['rutas'])} rutas, "
+              f"{len(datos['parametros'])} parámetros, {len(datos['parametros_playa'])} parámetros de playa "
+              f"y {len(datos['parametros_carga_descarga'])} parámetros de carga/descarga")
 
     @classmethod
-    def cargar(cls, ruta_archivo):
-        """Carga un proyecto desde un archivo JSON."""
-        with open(ruta_archivo, "r", encoding="utf-8") as f:
-            datos = json.load(f)
-
-        mapa = datos.get("mapa", "")
-        nodos_data = datos.get("nodos", [])
-        rutas_simplificadas = datos.get("rutas", [])    
-        
-        # Cargar parámetros o usar por defecto
-        parametros = datos.get("parametros")
-        if parametros is None:
-            # Crear instancia temporal para obtener parámetros por defecto
-            proyecto_temp = cls()
-            parametros = proyecto_temp._parametros_por_defecto()
+    def cargar(cls, ruta_archivo, progreso=None):
+        """
+        Carga un proyecto desde un archivo JSON (formato 1 o 2; los archivos
+        sin clave "version" son del formato 1) o desde un contenedor SQLite.
+        Los arrays "nodos" y "rutas" se leen de forma incremental, creando los
+        Nodo y las rutas por IDs a medida que se decodifican. progreso es un
+        callable(leidos, total) opcional; si devuelve False la carga se
+        cancela con CargaCancelada.
+        """
+        mapa = ""
+        nodos = []
+        rutas = []
+        parametros = None
+        parametros_playa = []
+        parametros_carga_descarga = []
 
-        # Cargar parámetros de playa
-        parametros_playa = datos.get("parametros_playa", [])
+        if ContenedorProyecto.es_contenedor(ruta_archivo):
+            return cls.cargar_contenedor(ruta_archivo)
 
-        # NUEVO: Cargar parámetros de carga/descarga
-        parametros_carga_descarga = datos.get("parametros_carga_descarga", [])
+        with open(ruta_archivo, "rb") as f:
+            lector = LectorJSON(f, progreso)
+            for clave, valor in lector.secciones(en_streaming=("nodos", "rutas")):
+                if clave == "version":
+                    if isinstance(valor, int) and valor > cls.VERSION_FORMATO:
+                        print(f"⚠ Formato de proyecto v{valor} más reciente que el soportado "
+                              f"(v{cls.VERSION_FORMATO}); se intenta cargar igualmente")
+                elif clave == "mapa":
+                    mapa = valor
+                elif clave == "nodos":
+                    # Convertir nodos del JSON en objetos Nodo según se leen
+                    nodos.extend(Nodo(nd) for nd in valor)
+                elif clave == "rutas":
+                    # Convertir rutas a secuencias de IDs. Los proyectos antiguos guardan
+                    # copias completas de los nodos en origen/visita/destino: solo se
+                    # conserva su ID, las coordenadas se resuelven con el índice de nodos.
+                    for ruta_datos in valor:
+                        try:
+                            rutas.append(Ruta.desde_dict(ruta_datos))
+                        except (TypeError, ValueError) as e:
+                            print(f"⚠ Ruta ignorada por datos inválidos: {e}")
+                elif clave == "parametros":
+                    parametros = valor
+                elif clave == "parametros_playa":
+                    parametros_playa = valor
+                elif clave == "parametros_carga_descarga":
+                    parametros_carga_descarga = valor
 
-        # Convertir nodos del JSON en objetos Nodo
-        nodos = [Nodo(nd) for nd in nodos_data]
-        
-        # Crear diccionario de nodos por ID para búsqueda rápida
-        nodos_por_id = {nodo.get('id'): nodo for nodo in nodos}
-        
-        # Reconstruir rutas completas
-        rutas_completas = []
-        for ruta_simp in rutas_simplificadas:
-            ruta_completa = {}
-            
-            # Nombre de la ruta (si no existe, asignar "Ruta" por defecto)
-            ruta_completa['nombre'] = ruta_simp.get('nombre', 'Ruta')
-            
-            # Origen
-            origen = ruta_simp.get('origen')
-            if origen:
-                if isinstance(origen, dict) and 'id' in origen:
-                    # Si ya es un diccionario con nodo completo
-                    ruta_completa['origen'] = origen
-                elif isinstance(origen, int):
-                    # Si es solo un ID, buscar el nodo
-                    nodo_origen = nodos_por_id.get(origen)
-                    if nodo_origen:
-                        ruta_completa['origen'] = nodo_origen.to_dict() if hasattr(nodo_origen, "to_dict") else nodo_origen
-                    else:
-                        ruta_completa['origen'] = {"id": origen, "X": 0, "Y": 0}
-            
-            # Destino
-            destino = ruta_simp.get('destino')
-            if destino:
-                if isinstance(destino, dict) and 'id' in destino:
-                    ruta_completa['destino'] = destino
-                elif isinstance(destino, int):
-                    nodo_destino = nodos_por_id.get(destino)
-                    if nodo_destino:
-                        ruta_completa['destino'] = nodo_destino.to_dict() if hasattr(nodo_destino, "to_dict") else nodo_destino
-                    else:
-                        ruta_completa['destino'] = {"id": destino, "X": 0, "Y": 0}
-            
-            # Visita
-            visita = ruta_simp.get('visita', [])
-            if visita:
-                visita_completa = []
-                for item in visita:
-                    if isinstance(item, dict) and 'id' in item:
-                        visita_completa.append(item)
-                    elif isinstance(item, int):
-                        nodo_visita = nodos_por_id.get(item)
-                        if nodo_visita:
-                            visita_completa.append(nodo_visita.to_dict() if hasattr(nodo_visita, "to_dict") else nodo_visita)
-                        else:
-                            visita_completa.append({"id": item, "X": 0, "Y": 0})
-                ruta_completa['visita'] = visita_completa
-            
-            rutas_completas.append(ruta_completa)
+        # Normalizar los tipos una sola vez, antes de indexar los nodos
+        problemas, normalizados = ValidadorEsquema.revisar_nodos(nodos, corregir=True)
+
+        # Crear instancia del proyecto (construye el índice de nodos por ID)
+        proyecto = cls(mapa, nodos)
+
+        # Cargar parámetros o usar por defecto
+        if parametros is None:
+            parametros = proyecto._parametros_por_defecto()
+        else:
+            problemas_parametros, normalizados_parametros = ValidadorEsquema.revisar_parametros(parametros, True)
+            problemas += problemas_parametros
+            normalizados += normalizados_parametros
+        proyecto.valores_invalidos = problemas
+        ValidadorEsquema.avisar(problemas, normalizados, "Carga del proyecto")
+
+        proyecto._avisar_nodos_inexistentes(rutas)
         
-        # Crear instancia del proyecto
-        proyecto = cls(mapa, nodos, rutas_completas)
+        proyecto.rutas = rutas
         proyecto.parametros = parametros  # asignar parámetros cargados
         proyecto.parametros_playa = parametros_playa  # asignar parámetros de playa cargados
         proyecto.parametros_carga_descarga = parametros_carga_descarga  # NUEVO: asignar parámetros de carga/descarga cargados
         
-        print(f"✓ Proyecto cargado: {len(nodos)} nodos, {len(rutas_completas)} rutas, "
+        print(f"✓ Proyecto cargado: {len(nodos)} nodos, {len(rutas)} rutas, "
               f"{len(parametros)} parámetros, {len(parametros_playa)} parámetros de playa, "
               f"{len(parametros_carga_descarga)} parámetros de carga/descarga")
         return proyecto
-    
-    def _update_routes_for_node(self, nodo_id):
+
+    def _avisar_nodos_inexistentes(self, rutas):
+        """Avisa de las rutas cargadas que referencian nodos que no existen; devuelve rutas."""
+        for ruta in rutas:
+            faltantes = [i for i in ruta if not self.existe_nodo(i)]
+            if faltantes:
+                print(f"⚠ La ruta '{ruta.nombre}' referencia nodos inexistentes: {faltantes}")
+        return rutas
+
+    def _revisar_parametros_cargados(self, parametros):
         """
-        Recorre proyecto.rutas y actualiza las referencias al nodo movido.
+        Normaliza los parámetros leídos del contenedor (o devuelve los de
+        por defecto si no hay) y añade sus problemas a valores_invalidos.
         """
-        try:
-            # Buscar nodo actual en proyecto.nodos
-            nodo_actual = next((n for n in self.nodos if n.get("id") == nodo_id), None)
-            if not nodo_actual:
-                return
-
-            for ruta in self.rutas:
-                try:
-                    rdict = ruta.to_dict() if hasattr(ruta, "to_dict") else ruta
-                except Exception:
-                    rdict = ruta
-
-                changed = False
-                # origen
-                origen = rdict.get("origen")
-                if isinstance(origen, dict) and origen.get("id") == nodo_id:
-                    origen.update({"X": nodo_actual.get("X"), "Y": nodo_actual.get("Y")})
-                    changed = True
-
-                # destino
-                destino = rdict.get("destino")
-                if isinstance(destino, dict) and destino.get("id") == nodo_id:
-                    destino.update({"X": nodo_actual.get("X"), "Y": nodo_actual.get("Y")})
-                    changed = True
-
-                # visita (lista)
-                visita = rdict.get("visita", []) or []
-                for idx, v in enumerate(visita):
-                    if isinstance(v, dict) and v.get("id") == nodo_id:
-                        v.update({"X": nodo_actual.get("X"), "Y": nodo_actual.get("Y")})
-                        changed = True
-
-                if changed:
-                    # Actualizar referencia en proyecto.rutas
-                    try:
-                        for i, r in enumerate(self.rutas):
-                            try:
-                                rdict2 = r.to_dict() if hasattr(r, "to_dict") else r
-                            except Exception:
-                                rdict2 = r
-                            if rdict2 is rdict or r is rdict:
-                                # Mantener el nombre si ya existe
-                                if "nombre" in rdict:
-                                    rdict["nombre"] = rdict.get("nombre", "Ruta")
-                                self.rutas[i] = rdict
-                                break
-                    except Exception:
-                        pass
-        except Exception as err:
-            print("Error en _update_routes_for_node:", err)
\ No newline at end of file
+        if not parametros:
+            return self._parametros_por_defecto()
+        problemas, normalizados = ValidadorEsquema.revisar_parametros(parametros, True)
+        self.valores_invalidos += problemas
+        ValidadorEsquema.avisar(problemas, normalizados, "Carga de los parámetros")
+        return parametros
+
+    @classmethod
+    def cargar_contenedor(cls, ruta_archivo):
+        """
+        Abre un contenedor SQLite leyendo solo el mapa y la tabla de nodos.
+        Las rutas y las tablas de parámetros se leen la primera vez que se
+        accede a ellas (o con cargar_secciones_pendientes).
+        """
+        contenedor = ContenedorProyecto(ruta_archivo)
+        meta = contenedor.leer_meta()
+        nodos = contenedor.leer_nodos()
+        problemas, normalizados = ValidadorEsquema.revisar_nodos(nodos, corregir=True)
+        proyecto = cls(meta["mapa"], nodos)
+        proyecto.valores_invalidos = problemas
+        ValidadorEsquema.avisar(problemas, normalizados, "Carga del proyecto")
+
+        # Las secciones diferidas pasan las mismas comprobaciones que en cargar()
+        # la primera vez que se leen
+        proyecto._secciones_pendientes = {
+            "rutas": lambda: proyecto._avisar_nodos_inexistentes(contenedor.leer_rutas()),
+            "parametros": lambda: proyecto._revisar_parametros_cargados(contenedor.leer_seccion("parametros")),
+            "parametros_playa": lambda: contenedor.leer_seccion("parametros_playa") or [],
+            "parametros_carga_descarga": lambda: contenedor.leer_seccion("parametros_carga_descarga") or [],
+        }
+        print(f"✓ Contenedor de proyecto abierto: {len(nodos)} nodos "
+              f"(pendientes: {', '.join(proyecto.secciones_pendientes())})")
+        return proyecto
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from array import array
+
+
+class Ruta:
+    """
+    Ruta guardada como secuencia compacta de IDs de nodo
+    (origen, visita..., destino). Las coordenadas no se copian:
+    se resuelven a través del índice de nodos del proyecto.
+    """
+
+    def __init__(self, ids=None, nombre="Ruta"):
+        self.nombre = nombre if nombre else "Ruta"
+        self._ids = array('q', [int(i) for i in ids] if ids else [])
+
+    @staticmethod
+    def _id_de_referencia(ref):
+        """Obtiene el ID de una referencia antigua a nodo (dict, Nodo o ID)."""
+        if ref is None:
+            return None
+        if isinstance(ref, int):
+            return ref
+        if hasattr(ref, "get"):
+            return ref.get("id")
+        return getattr(ref, "id", None)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """
+        Crea una ruta desde un diccionario. Acepta el formato compacto
+        {"nombre", "ids"} y el antiguo {"origen", "visita", "destino"}
+        con copias completas de nodos o solo IDs.
+        """
+        if isinstance(datos, Ruta):
+            return datos.copia()
+
+        nombre = datos.get("nombre", "Ruta")
+        if datos.get("ids") is not None:
+            return cls(datos.get("ids"), nombre)
+
+        origen_id = cls._id_de_referencia(datos.get("origen"))
+        destino_id = cls._id_de_referencia(datos.get("destino"))
+        visita_ids = [cls._id_de_referencia(v) for v in datos.get("visita", []) or []]
+        visita_ids = [i for i in visita_ids if i is not None]
+
+        ids = []
+        if origen_id is not None:
+            ids.append(origen_id)
+        ids.extend(visita_ids)
+        if destino_id is not None:
+            # Una ruta de un solo nodo se guardaba con destino == origen
+            if not (ids and not visita_ids and destino_id == ids[0]):
+                ids.append(destino_id)
+        return cls(ids, nombre)
+
+    # --- ACCESO A LA SECUENCIA ---
+    def ids(self):
+        """Devuelve la secuencia completa de IDs como lista."""
+        return self._ids.tolist()
+
+    def set_ids(self, ids):
+        """Reemplaza la secuencia completa de IDs."""
+        self._ids = array('q', [int(i) for i in ids])
+
+    @property
+    def origen_id(self):
+        return self._ids[0] if self._ids else None
+
+    @property
+    def destino_id(self):
+        return self._ids[-1] if self._ids else None
+
+    @property
+    def visita_ids(self):
+        return self._ids[1:-1].tolist() if len(self._ids) > 2 else []
+
+    def quitar_posicion(self, posicion):
+        """Quita el nodo en la posición indicada de la secuencia."""
+        del self._ids[posicion]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, nodo_id):
+        return nodo_id in self._ids
+
+    # --- COMPATIBILIDAD CON LA API DE DICCIONARIO ---
+    def get(self, clave, default=None):
+        if clave == "nombre":
+            return self.nombre
+        if clave == "origen":
+            return self.origen_id
+        if clave == "destino":
+            return self.destino_id
+        if clave == "visita":
+            return self.visita_ids
+        if clave == "ids":
+            return self.ids()
+        return default
+
+    def to_dict(self):
+        """Formato compacto de guardado: nombre y secuencia de IDs."""
+        return {"nombre": self.nombre, "ids": self._ids.tolist()}
+
+    def copia(self):
+        copia = Ruta(nombre=self.nombre)
+        copia._ids = array('q', self._ids)
+        return copia
+
+    def __repr__(self):
+        return f"Ruta({self.nombre!r}, {self.ids()})"
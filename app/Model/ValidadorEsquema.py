@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Validación y normalización en bloque de los valores de un proyecto según
+el 'type' de schema.py.
+
+Se trabaja por columnas: los valores de un campo se extraen de todos los
+nodos y se comprueba de una vez (set(map(type, ...))) si alguno no tiene
+el tipo del esquema; solo esas filas pasan por normalizar_valor. Cargar un
+proyecto bien formado apenas paga la validación, y el resto del código
+(dibujo, exportación) puede fiarse de que Tipo_curva es un int, X un
+número, etc.
+
+Cada problema es una tupla (tabla, fila, campo, valor, motivo): tabla es
+"nodos" (fila = id del nodo) o "parametros" (fila = None).
+"""
+import math
+from operator import attrgetter, itemgetter
+
+from .schema import CODEC_NODO, CODEC_OBJETIVO, CODEC_PARAMETROS, normalizar_valor
+
+
+class ValidadorEsquema:
+    # Líneas del informe que se escriben como máximo en la consola
+    MAX_LINEAS_AVISO = 20
+
+    @staticmethod
+    def _filas_invalidas(valores, aceptados, tipo):
+        """Índices de los valores que no tienen un tipo aceptado (o son float no finitos)."""
+        if set(map(type, valores)) <= aceptados:
+            # Una suma finita garantiza que no hay nan ni inf (si no, se mira uno a uno)
+            if tipo is not float or math.isfinite(sum(valores)):
+                return []
+        return [i for i, valor in enumerate(valores)
+                if type(valor) not in aceptados or tipo is float and not math.isfinite(valor)]
+
+    @staticmethod
+    def _revisar_columnas(nodos, filas, obtener, codec, corregir, problemas):
+        """
+        Revisa los campos de codec en nodos. filas[i] es el objeto del que se
+        leen los campos del nodo i con obtener(clave) (attrgetter sobre el
+        propio nodo, itemgetter sobre su diccionario de objetivo). Devuelve
+        cuántos valores se han normalizado (o se normalizarían, si corregir
+        es False).
+        """
+        normalizados = 0
+        for clave, tipo, defecto, aceptados in zip(codec.claves, codec.tipos, codec.defaults,
+                                                   codec.tipos_aceptados):
+            valores = list(map(obtener(clave), filas))
+            for i in ValidadorEsquema._filas_invalidas(valores, aceptados, tipo):
+                nodo, valor = nodos[i], valores[i]
+                try:
+                    nuevo = normalizar_valor(valor, tipo)
+                    normalizados += 1
+                except ValueError as e:
+                    problemas.append(("nodos", nodo.get('id'), clave, valor, str(e)))
+                    if defecto is None:
+                        continue  # Sin valor por defecto (id): se deja como está
+                    nuevo = defecto
+                if corregir:
+                    nodo.update({clave: nuevo})
+        return normalizados
+
+    @staticmethod
+    def revisar_nodos(nodos, corregir=False):
+        """
+        Comprueba los campos de esquema de todos los nodos. Con corregir=True
+        los valores convertibles sin pérdida ("3", 3.0 en un int...) se
+        normalizan y los que no lo son toman el valor por defecto. Devuelve
+        (problemas, normalizados): los problemas son solo los valores no
+        convertibles.
+        """
+        nodos = list(nodos)
+        problemas = []
+        normalizados = ValidadorEsquema._revisar_columnas(
+            nodos, nodos, attrgetter, CODEC_NODO, corregir, problemas)
+        # Los campos de objetivo solo se revisan en los nodos que los tienen materializados
+        con_objetivo = [nodo for nodo in nodos if nodo.tiene_campos_objetivo()]
+        normalizados += ValidadorEsquema._revisar_columnas(
+            con_objetivo, [nodo.campos_objetivo() for nodo in con_objetivo], itemgetter,
+            CODEC_OBJETIVO, corregir, problemas)
+        return problemas, normalizados
+
+    @staticmethod
+    def revisar_parametros(parametros, corregir=False):
+        """Como revisar_nodos para el diccionario de parámetros generales (se modifica en su sitio)."""
+        problemas = []
+        normalizados = 0
+        for clave, valor in list(parametros.items()):
+            tipo = CODEC_PARAMETROS.tipos_por_clave.get(clave)
+            if tipo is None or type(valor) is tipo:
+                continue
+            try:
+                nuevo = normalizar_valor(valor, tipo)
+                normalizados += 1
+            except ValueError as e:
+                problemas.append(("parametros", None, clave, valor, str(e)))
+                nuevo = CODEC_PARAMETROS.defaults_por_clave[clave]
+            if corregir:
+                parametros[clave] = nuevo
+        return problemas, normalizados
+
+    @staticmethod
+    def revisar_proyecto(proyecto, corregir=False):
+        """Revisa nodos y parámetros de un proyecto. Devuelve (problemas, normalizados)."""
+        problemas, normalizados = ValidadorEsquema.revisar_nodos(proyecto.nodos, corregir)
+        problemas_parametros, normalizados_parametros = ValidadorEsquema.revisar_parametros(
+            proyecto.parametros, corregir)
+        return problemas + problemas_parametros, normalizados + normalizados_parametros
+
+    @staticmethod
+    def describir(problema):
+        """Texto de un problema del informe."""
+        tabla, fila, campo, valor, motivo = problema
+        donde = f"Nodo {fila}" if tabla == "nodos" else "Parámetros"
+        return f"{donde}: {campo} = {valor!r} ({motivo})"
+
+    @staticmethod
+    def avisar(problemas, normalizados, origen):
+        """Escribe en la consola el resultado de una revisión con corrección."""
+        if normalizados:
+            print(f"✓ {origen}: {normalizados} valores convertidos al tipo del esquema")
+        if not problemas:
+            return
+        print(f"⚠ {origen}: {len(problemas)} valores no válidos sustituidos por su valor por defecto:")
+        for problema in problemas[:ValidadorEsquema.MAX_LINEAS_AVISO]:
+            print(f"    {ValidadorEsquema.describir(problema)}")
+        if len(problemas) > ValidadorEsquema.MAX_LINEAS_AVISO:
+            print(f"    ... y {len(problemas) - ValidadorEsquema.MAX_LINEAS_AVISO} más")
@@ -6,7 +6,11 @@ Cada entrada define:
     - type: tipo de dato esperado (int, float, str, etc.)
     - csv_name: nombre de la columna en el archivo CSV (si es diferente a la clave)
     - db_type: tipo de columna SQLite (para crear la tabla)
+Al final del módulo se compilan los códecs (CODEC_NODO, ...) que usan los
+bucles por nodo.
 """
+import math
+from operator import itemgetter
 
 # --- Nodos (todos los campos que aparecen en la tabla 'puntos' y en la estructura interna) ---
 NODO_FIELDS = {
@@ -76,4 +80,131 @@ PLAYA_DEFAULT_FIELDS = [
 ]
 
 # --- Columnas por defecto para la tabla de parámetros de carga/descarga ---
-CARGA_DESC_DEFAULT_FIELDS = ['ID'] + [f'p_{chr(97+i)}' for i in range(20)]  # p_a .. p_t
\ No newline at end of file
+CARGA_DESC_DEFAULT_FIELDS = ['ID'] + [f'p_{chr(97+i)}' for i in range(20)]  # p_a .. p_t
+
+# =====================================================================
+# CÓDECS COMPILADOS
+# Se generan una sola vez al importar el módulo a partir de los
+# diccionarios anteriores (que siguen siendo la única definición de los
+# campos). Nodo, los exportadores, los importadores y la tabla de
+# propiedades usan estas tuplas en sus bucles por nodo en lugar de
+# recorrer los diccionarios con info.get(...) en cada fila, y todos los
+# formatos comparten el mismo orden de columnas.
+# =====================================================================
+
+
+def convertir_valor(valor, tipo, defecto=None):
+    """
+    Convierte valor al tipo del esquema (int, float, str) con
+    normalizar_valor. El texto vacío toma el valor por defecto; si no se
+    puede convertir sin pérdida se deja tal cual (ValidadorEsquema lo
+    informa).
+    """
+    if valor == "":
+        return defecto
+    try:
+        return normalizar_valor(valor, tipo)
+    except ValueError:
+        return valor
+
+
+def normalizar_valor(valor, tipo):
+    """
+    Valor llevado al tipo del esquema sin pérdida de información:
+    - int: enteros, bool, floats sin parte decimal y texto numérico ("3", "3.0")
+    - float: cualquier número finito (los int se conservan tal cual) y texto numérico
+    - str: cualquier valor salvo None
+    Lanza ValueError si no se puede convertir (p. ej. 2.5 o "abc" para int).
+    """
+    tipo_valor = type(valor)
+    if tipo is None or tipo_valor is tipo and (tipo is not float or math.isfinite(valor)):
+        return valor
+    if tipo is str and valor is not None:
+        return str(valor)
+
+    numero = None
+    if tipo_valor is int or tipo_valor is bool:
+        numero = int(valor)
+    elif tipo_valor is float:
+        numero = valor
+    elif tipo_valor is str:
+        texto = valor.strip()
+        try:
+            numero = tipo(texto)  # int("3") o float("0.5"): el caso habitual
+        except ValueError:
+            try:
+                numero = float(texto)  # "3.0" para un int
+            except ValueError:
+                pass
+    if type(numero) is float and not math.isfinite(numero):
+        numero = None
+
+    if numero is not None:
+        if tipo is float:
+            return numero
+        if tipo is int and (type(numero) is int or numero.is_integer()):
+            return int(numero)
+    raise ValueError(f"{valor!r} no es un {tipo.__name__} válido")
+
+
+class CodecCampos:
+    """Forma compilada (tuplas en el orden del esquema) de un diccionario de campos."""
+
+    __slots__ = ('claves', 'columnas', 'tipos', 'defaults', 'db_types', 'indices',
+                 'defaults_por_clave', 'tipos_por_clave', 'campos_por_columna', 'valores_de',
+                 'tipos_aceptados')
+
+    def __init__(self, campos):
+        self.claves = tuple(campos)
+        self.columnas = tuple(info.get('csv_name', key) for key, info in campos.items())
+        self.tipos = tuple(info.get('type') for info in campos.values())
+        self.defaults = tuple(info.get('default') for info in campos.values())
+        self.db_types = tuple(info.get('db_type', 'TEXT') for info in campos.values())
+        self.indices = {clave: i for i, clave in enumerate(self.claves)}
+        self.defaults_por_clave = dict(zip(self.claves, self.defaults))
+        self.tipos_por_clave = dict(zip(self.claves, self.tipos))
+        # csv_name -> (clave interna, tipo, valor por defecto)
+        self.campos_por_columna = {columna: (clave, tipo, defecto) for columna, clave, tipo, defecto
+                                   in zip(self.columnas, self.claves, self.tipos, self.defaults)}
+        # Diccionario -> tupla de valores en el orden de claves (siempre una tupla)
+        self.valores_de = itemgetter(*self.claves) if len(self.claves) > 1 else \
+            (lambda datos, _clave=self.claves[0]: (datos[_clave],))
+        # Tipos que ya son válidos sin conversión (un float admite también int)
+        self.tipos_aceptados = tuple(frozenset((tipo, int) if tipo is float else (tipo,)) for tipo in self.tipos)
+
+    def campos_de_columnas(self, columnas):
+        """
+        (clave interna, tipo, valor por defecto) de cada columna de un
+        archivo. Las columnas fuera del esquema se conservan con su nombre y
+        sin conversión.
+        """
+        return [self.campos_por_columna.get(columna, (columna, None, None)) for columna in columnas]
+
+    def definiciones_sql(self, clave_primaria=None):
+        """Definiciones de columna para CREATE TABLE; clave_primaria lleva PRIMARY KEY."""
+        definiciones = []
+        for clave, columna, db_type in zip(self.claves, self.columnas, self.db_types):
+            db_type = db_type.replace('PRIMARY KEY', '').strip()
+            if clave == clave_primaria:
+                db_type += ' PRIMARY KEY'
+            definiciones.append(f"{columna} {db_type}")
+        return definiciones
+
+
+CODEC_NODO = CodecCampos(NODO_FIELDS)
+CODEC_OBJETIVO = CodecCampos(OBJETIVO_FIELDS)
+CODEC_PARAMETROS = CodecCampos(PARAMETROS_FIELDS)
+
+# Tabla 'nodos' (puntos.db / puntos.csv)
+COLUMNAS_NODOS = CODEC_NODO.columnas
+SQL_CREAR_NODOS = f"CREATE TABLE nodos ({', '.join(CODEC_NODO.definiciones_sql('id'))})"
+
+# Tabla 'objetivos' (objetivos.db / objetivos.csv): nodo_id seguido de OBJETIVO_FIELDS
+COLUMNAS_OBJETIVOS = ('nodo_id',) + CODEC_OBJETIVO.columnas
+SQL_CREAR_OBJETIVOS = f"CREATE TABLE objetivos ({', '.join(['nodo_id INTEGER PRIMARY KEY'] + CODEC_OBJETIVO.definiciones_sql())})"
+
+# Tipo de cada campo editable de un nodo (fijos y de objetivo)
+TIPOS_CAMPOS_NODO = {**CODEC_NODO.tipos_por_clave, **CODEC_OBJETIVO.tipos_por_clave}
+
+# Propiedades de la tabla lateral (los campos de objetivo van en el diálogo avanzado)
+CLAVES_PROPIEDADES_NODO = tuple(k for k in CODEC_NODO.claves if k != 'id' and k not in OBJETIVO_FIELDS)
@@ -0,0 +1,84 @@
+from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtCore import QRectF, QPointF, Qt
+from PyQt5.QtGui import QColor, QPen, QPolygonF
+from View.node_item import NodoItem
+from View.zoom_view import escala_de
+
+
+class GrupoNodosItem(QGraphicsItem):
+    """
+    Los nodos de la escena agrupados, para el zoom lejano en mapas grandes.
+
+    Aunque cada NodoItem se pinte como un punto, con miles de nodos a la
+    vista cuesta una llamada a paint por nodo y fotograma. Mientras este
+    elemento está visible los NodoItem no tienen contenido
+    (ItemHasNoContents) y aquí se dibujan agrupados en celdas de CELDA
+    píxeles de pantalla: un punto por celda ocupada, en el centro de sus
+    nodos y más grande cuantos más nodos contiene. Los puntos del mismo
+    tamaño van en un solo drawPoints.
+
+    La agrupación se reutiliza mientras no cambie la escala ni ningún nodo
+    (NodoItem._version_geometria).
+    """
+    CELDA = 8
+    # (mínimo de nodos en la celda, diámetro del punto en píxeles de pantalla)
+    TAMANOS = ((64, 12), (16, 9), (4, 6), (1, 4))
+    # boundingRect fijo: cubre cualquier plano sin recalcularlo al mover nodos
+    LIMITE = 1e6
+
+    def __init__(self, items_por_id, color=QColor(0, 120, 215)):
+        super().__init__()
+        self._items = items_por_id
+        self._pens = {}
+        for _, diametro in self.TAMANOS:
+            pen = QPen(QColor(color), diametro, Qt.SolidLine, Qt.RoundCap)
+            pen.setCosmetic(True)
+            self._pens[diametro] = pen
+
+        self._clave = None
+        self._puntos = []  # [(diámetro, QPolygonF)]
+
+        # Solo dibuja: los clics siguen llegando a los NodoItem
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setFlag(QGraphicsItem.ItemIsSelectable, False)
+        self.setFlag(QGraphicsItem.ItemIsFocusable, False)
+        self.setZValue(1)
+
+    def _agrupar(self, celda):
+        celdas = {}  # (columna, fila) -> [nodos, suma x, suma y]
+        escena = self.scene()
+        for item in list(self._items.values()):
+            if not item.isVisible() or item.scene() is not escena:
+                continue
+            pos = item.pos()
+            x = pos.x() + item.size / 2
+            y = pos.y() + item.size / 2
+            acumulado = celdas.get((x // celda, y // celda))
+            if acumulado is None:
+                celdas[(x // celda, y // celda)] = [1, x, y]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += x
+                acumulado[2] += y
+
+        grupos = {diametro: [] for _, diametro in self.TAMANOS}
+        for n, suma_x, suma_y in celdas.values():
+            diametro = next(d for minimo, d in self.TAMANOS if n >= minimo)
+            grupos[diametro].append(QPointF(suma_x / n, suma_y / n))
+        return [(diametro, QPolygonF(puntos)) for diametro, puntos in grupos.items() if puntos]
+
+    def boundingRect(self):
+        return QRectF(-self.LIMITE, -self.LIMITE, 2 * self.LIMITE, 2 * self.LIMITE)
+
+    def paint(self, painter, option, widget=None):
+        celda = self.CELDA / max(escala_de(painter.worldTransform()), 1e-6)
+        clave = (round(celda, 6), NodoItem._version_geometria, len(self._items))
+        if clave != self._clave:
+            self._puntos = self._agrupar(celda)
+            self._clave = clave
+
+        # La vista no guarda el estado del pintor entre elementos (DontSavePainterState)
+        painter.setBrush(Qt.NoBrush)
+        for diametro, puntos in self._puntos:
+            painter.setPen(self._pens[diametro])
+            painter.drawPoints(puntos)
@@ -0,0 +1,490 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtCore import QRect, QRectF, QSize, QStandardPaths, Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QImage, QImageIOHandler, QImageReader, QPainter, QPixmap
+from View.zoom_view import escala_de
+
+
+class ConstruccionCancelada(Exception):
+    """Se lanza cuando se cancela la construcción de una pirámide desde la callback cancelado."""
+
+
+class PiramideMapa:
+    """
+    El plano cortado en teselas de TAM_TESELA píxeles a varias resoluciones:
+    el nivel 0 es la imagen original y cada nivel es la mitad del anterior,
+    hasta que el plano entero cabe en una tesela.
+
+    Las teselas se guardan en disco como píxeles en bruto (FORMATO, sin
+    cabecera: el tamaño se deduce del nivel y la posición), así que en
+    memoria solo están las que MapaItem tiene a la vista. Solo usa QImage y
+    QPainter sobre imágenes, por lo que puede construirse fuera del hilo de
+    la interfaz.
+
+    abrir() guarda las pirámides en una caché persistente (carpeta_cache())
+    con una subcarpeta por huella del contenido de la imagen: al volver a
+    abrir el mismo plano no se decodifica nada, y si la imagen cambia su
+    huella también y se construye una pirámide nueva.
+    """
+    TAM_TESELA = 512
+    FORMATO = QImage.Format_ARGB32_Premultiplied
+    BYTES_PIXEL = 4
+    # Memoria máxima de cada lectura por franjas del plano original
+    MAX_BYTES_FRANJA = 256 * 1024 * 1024
+    # Lado mayor de la vista previa que se muestra mientras se construye la pirámide
+    TAM_VISTA_PREVIA = 2048
+
+    # Caché persistente: se cambia VERSION_CACHE si cambia el formato de las teselas
+    VERSION_CACHE = 1
+    ARCHIVO_METADATOS = "piramide.json"  # se escribe el último: marca la pirámide como completa
+    MAX_BYTES_CACHE = 10 * 1024 * 1024 * 1024
+
+    def __init__(self, carpeta, ancho, alto):
+        self.carpeta = carpeta
+        self.ancho = ancho
+        self.alto = alto
+        # Tamaño de cada nivel: la mitad (redondeando hacia arriba) del anterior
+        self.tamanos = [(ancho, alto)]
+        while max(self.tamanos[-1]) > self.TAM_TESELA:
+            w, h = self.tamanos[-1]
+            self.tamanos.append(((w + 1) // 2, (h + 1) // 2))
+        self._temporal = None  # TemporaryDirectory que se borra con la pirámide
+
+    @property
+    def niveles(self):
+        return len(self.tamanos)
+
+    def teselas_nivel(self, nivel):
+        """(columnas, filas) de teselas del nivel."""
+        w, h = self.tamanos[nivel]
+        return -(-w // self.TAM_TESELA), -(-h // self.TAM_TESELA)
+
+    def rect_tesela(self, nivel, columna, fila):
+        """QRect de la tesela en píxeles de su nivel (las del borde son más pequeñas)."""
+        w, h = self.tamanos[nivel]
+        x = columna * self.TAM_TESELA
+        y = fila * self.TAM_TESELA
+        return QRect(x, y, min(self.TAM_TESELA, w - x), min(self.TAM_TESELA, h - y))
+
+    def ruta_tesela(self, nivel, columna, fila):
+        return os.path.join(self.carpeta, f"{nivel}_{columna}_{fila}.raw")
+
+    def leer_tesela(self, nivel, columna, fila):
+        """QImage de la tesela; None si no está en disco."""
+        try:
+            with open(self.ruta_tesela(nivel, columna, fila), "rb") as f:
+                datos = f.read()
+        except OSError:
+            return None
+        rect = self.rect_tesela(nivel, columna, fila)
+        if len(datos) != rect.width() * rect.height() * self.BYTES_PIXEL:
+            return None
+        # copy(): la imagen no debe depender del buffer de bytes leído
+        return QImage(datos, rect.width(), rect.height(), rect.width() * self.BYTES_PIXEL, self.FORMATO).copy()
+
+    def _escribir_tesela(self, nivel, columna, fila, imagen):
+        imagen = imagen.convertToFormat(self.FORMATO)
+        bits = imagen.constBits()
+        bits.setsize(imagen.sizeInBytes())
+        with open(self.ruta_tesela(nivel, columna, fila), "wb") as f:
+            f.write(bytes(bits))
+
+    @staticmethod
+    def _comprobar(cancelado):
+        if cancelado is not None and cancelado():
+            raise ConstruccionCancelada()
+
+    def _tamano_vista_previa(self):
+        return QSize(self.ancho, self.alto).scaled(QSize(self.TAM_VISTA_PREVIA, self.TAM_VISTA_PREVIA),
+                                                   Qt.KeepAspectRatio)
+
+    def _cortar(self, nivel, imagen, y_origen=0, cancelado=None):
+        """Guarda las teselas del nivel contenidas en imagen (una franja que empieza en la fila y_origen)."""
+        columnas, _ = self.teselas_nivel(nivel)
+        for fila_franja in range(0, imagen.height(), self.TAM_TESELA):
+            self._comprobar(cancelado)
+            fila = (y_origen + fila_franja) // self.TAM_TESELA
+            for columna in range(columnas):
+                rect = self.rect_tesela(nivel, columna, fila)
+                self._escribir_tesela(nivel, columna, fila, imagen.copy(rect.translated(0, -y_origen)))
+
+    def _construir_nivel_0(self, ruta_imagen, al_vista_previa=None, cancelado=None):
+        """
+        Decodifica el plano y lo corta en teselas. Si la imagen decodificada
+        ocupa más de MAX_BYTES_FRANJA y el formato permite leer una región
+        (ClipRect, p. ej. JPEG), se lee por franjas de filas de teselas para
+        no tener la imagen entera en memoria. Si se decodifica entera, la
+        vista previa (si aún hace falta) se saca de ella antes de cortarla.
+        """
+        bytes_fila = self.ancho * self.BYTES_PIXEL
+        if (bytes_fila * self.alto > self.MAX_BYTES_FRANJA
+                and QImageReader(ruta_imagen).supportsOption(QImageIOHandler.ClipRect)):
+            alto_franja = max(1, self.MAX_BYTES_FRANJA // (bytes_fila * self.TAM_TESELA)) * self.TAM_TESELA
+            for y in range(0, self.alto, alto_franja):
+                self._comprobar(cancelado)
+                lector = QImageReader(ruta_imagen)
+                lector.setClipRect(QRect(0, y, self.ancho, min(alto_franja, self.alto - y)))
+                franja = lector.read()
+                if franja.isNull():
+                    raise ValueError(lector.errorString())
+                self._cortar(0, franja, y, cancelado)
+            return
+
+        # La decodificación no se puede interrumpir: se comprueba antes y después
+        self._comprobar(cancelado)
+        lector = QImageReader(ruta_imagen)
+        imagen = lector.read()
+        if imagen.isNull():
+            raise ValueError(lector.errorString())
+        self._comprobar(cancelado)
+        if al_vista_previa is not None:
+            al_vista_previa(imagen.scaled(self._tamano_vista_previa(), Qt.IgnoreAspectRatio,
+                                          Qt.SmoothTransformation))
+        self._cortar(0, imagen, 0, cancelado)
+
+    def leer_vista_previa(self, ruta_imagen):
+        """
+        La imagen reducida a TAM_VISTA_PREVIA leída directamente a esa escala
+        (ScaledSize); None si el formato no lo permite sin decodificarla entera.
+        """
+        lector = QImageReader(ruta_imagen)
+        if not lector.supportsOption(QImageIOHandler.ScaledSize):
+            return None
+        lector.setScaledSize(self._tamano_vista_previa())
+        imagen = lector.read()
+        return None if imagen.isNull() else imagen
+
+    def _construir_nivel(self, nivel, cancelado=None):
+        """Cada tesela del nivel se obtiene reduciendo a la mitad las (hasta) cuatro que cubre en el anterior."""
+        columnas, filas = self.teselas_nivel(nivel)
+        ancho_anterior, alto_anterior = self.tamanos[nivel - 1]
+        lado = 2 * self.TAM_TESELA
+        for fila in range(filas):
+            self._comprobar(cancelado)
+            for columna in range(columnas):
+                w = min(lado, ancho_anterior - columna * lado)
+                h = min(lado, alto_anterior - fila * lado)
+                bloque = QImage(w, h, self.FORMATO)
+                bloque.fill(Qt.transparent)
+                painter = QPainter(bloque)
+                for df in (0, 1):
+                    for dc in (0, 1):
+                        tesela = self.leer_tesela(nivel - 1, 2 * columna + dc, 2 * fila + df)
+                        if tesela is not None:
+                            painter.drawImage(dc * self.TAM_TESELA, df * self.TAM_TESELA, tesela)
+                painter.end()
+                reducida = bloque.scaled(QSize((w + 1) // 2, (h + 1) // 2),
+                                         Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+                self._escribir_tesela(nivel, columna, fila, reducida)
+
+    @staticmethod
+    def tamano_imagen(ruta_imagen):
+        """QSize de la imagen leído de su cabecera (sin decodificarla). Lanza ValueError si no se puede leer."""
+        # Los planos escaneados superan el límite de memoria por imagen de Qt (128 MB)
+        if hasattr(QImageReader, "setAllocationLimit"):
+            QImageReader.setAllocationLimit(0)
+        tamano = QImageReader(ruta_imagen).size()
+        if not tamano.isValid() or tamano.isEmpty():
+            raise ValueError(f"No se puede leer la imagen: {ruta_imagen}")
+        return tamano
+
+    @classmethod
+    def construir(cls, ruta_imagen, carpeta=None, al_vista_previa=None, cancelado=None):
+        """
+        Crea la pirámide de ruta_imagen en carpeta (en una carpeta temporal
+        que se borra con la pirámide si es None). Lanza ValueError si la
+        imagen no se puede leer y ConstruccionCancelada si cancelado()
+        devuelve True.
+
+        al_vista_previa(QImage) recibe cuanto antes una versión reducida del
+        plano: leída ya reducida si el formato lo permite o, si no, en cuanto
+        se decodifica la imagen completa.
+        """
+        tamano = cls.tamano_imagen(ruta_imagen)
+
+        temporal = None
+        if carpeta is None:
+            temporal = tempfile.TemporaryDirectory(prefix="editor_trafico_mapa_")
+            carpeta = temporal.name
+        os.makedirs(carpeta, exist_ok=True)
+
+        piramide = cls(carpeta, tamano.width(), tamano.height())
+        piramide._temporal = temporal
+        if al_vista_previa is not None:
+            vista_previa = piramide.leer_vista_previa(ruta_imagen)
+            if vista_previa is not None:
+                al_vista_previa(vista_previa)
+                al_vista_previa = None
+        piramide._construir_nivel_0(ruta_imagen, al_vista_previa, cancelado)
+        for nivel in range(1, piramide.niveles):
+            piramide._construir_nivel(nivel, cancelado)
+        return piramide
+
+
+    # --- CACHÉ PERSISTENTE ---
+    @staticmethod
+    def carpeta_cache():
+        """Carpeta de la caché de pirámides del usuario; None si no se puede crear."""
+        base = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation) or tempfile.gettempdir()
+        carpeta = os.path.join(base, "editor_trafico", "mapas")
+        try:
+            os.makedirs(carpeta, exist_ok=True)
+        except OSError:
+            return None
+        return carpeta
+
+    @classmethod
+    def huella(cls, ruta_imagen, cancelado=None):
+        """
+        Huella del contenido de la imagen (y del formato de las teselas) que
+        da nombre a su carpeta de caché. Lanza ConstruccionCancelada si
+        cancelado() devuelve True entre bloques.
+        """
+        resumen = hashlib.blake2b(digest_size=20)
+        resumen.update(f"{cls.VERSION_CACHE}:{cls.TAM_TESELA}:{int(cls.FORMATO)}:".encode())
+        with open(ruta_imagen, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                cls._comprobar(cancelado)
+                resumen.update(bloque)
+        return resumen.hexdigest()
+
+    def _guardar_metadatos(self):
+        datos = {"version": self.VERSION_CACHE, "ancho": self.ancho, "alto": self.alto,
+                 "tam_tesela": self.TAM_TESELA}
+        with open(os.path.join(self.carpeta, self.ARCHIVO_METADATOS), "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+
+    @classmethod
+    def cargar(cls, carpeta):
+        """Pirámide completa guardada en carpeta; None si no existe o es de otra versión."""
+        try:
+            with open(os.path.join(carpeta, cls.ARCHIVO_METADATOS), encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if datos.get("version") != cls.VERSION_CACHE or datos.get("tam_tesela") != cls.TAM_TESELA:
+            return None
+        return cls(carpeta, datos["ancho"], datos["alto"])
+
+    @classmethod
+    def abrir(cls, ruta_imagen, al_vista_previa=None, cancelado=None, carpeta_cache=None):
+        """
+        Pirámide de ruta_imagen desde la caché persistente, o construida y
+        guardada en ella si no está. Se construye en una carpeta temporal
+        junto a la definitiva y se renombra al terminar, así que una
+        construcción interrumpida nunca deja una pirámide a medias. Sin
+        carpeta de caché se construye en una temporal, como construir().
+        """
+        if carpeta_cache is None:
+            carpeta_cache = cls.carpeta_cache()
+        if carpeta_cache is None:
+            return cls.construir(ruta_imagen, None, al_vista_previa, cancelado)
+
+        clave = cls.huella(ruta_imagen, cancelado)
+        carpeta = os.path.join(carpeta_cache, clave)
+        piramide = cls.cargar(carpeta)
+        if piramide is not None:
+            # La fecha de los metadatos marca el último uso para la poda
+            os.utime(os.path.join(carpeta, cls.ARCHIVO_METADATOS))
+            return piramide
+
+        # Carpeta propia de esta construcción: otras en curso (de otro hilo o
+        # de otra instancia) tienen la suya y nunca se borran entre sí
+        temporal = tempfile.mkdtemp(dir=carpeta_cache, prefix=clave + ".tmp")
+        try:
+            piramide = cls.construir(ruta_imagen, temporal, al_vista_previa, cancelado)
+            piramide._guardar_metadatos()
+            if cls.cargar(carpeta) is None:
+                shutil.rmtree(carpeta, ignore_errors=True)  # restos de una versión anterior
+            # Si otra construcción ya la terminó (y puede estar en uso), el
+            # cambio de nombre falla porque la carpeta no está vacía
+            os.rename(temporal, carpeta)
+        except BaseException:
+            shutil.rmtree(temporal, ignore_errors=True)
+            # Otro hilo u otra instancia del editor puede haberla terminado a la vez
+            piramide = cls.cargar(carpeta)
+            if piramide is None:
+                raise
+            return piramide
+        piramide.carpeta = carpeta
+
+        try:
+            cls.podar_cache(carpeta_cache, conservar=clave)
+        except OSError as e:
+            print(f"⚠ No se pudo podar la caché de mapas: {e}")
+        return piramide
+
+    @classmethod
+    def podar_cache(cls, carpeta_cache, conservar=None):
+        """Borra las pirámides usadas hace más tiempo hasta que la caché ocupa como mucho MAX_BYTES_CACHE."""
+        entradas = []  # (último uso, bytes, carpeta)
+        total = 0
+        for entrada in os.scandir(carpeta_cache):
+            # Las .tmp son construcciones en curso (de esta u otra instancia)
+            if not entrada.is_dir() or entrada.name == conservar or ".tmp" in entrada.name:
+                continue
+            metadatos = os.path.join(entrada.path, cls.ARCHIVO_METADATOS)
+            uso = os.path.getmtime(metadatos) if os.path.exists(metadatos) else 0
+            tamano = sum(archivo.stat().st_size for archivo in os.scandir(entrada.path) if archivo.is_file())
+            entradas.append((uso, tamano, entrada.path))
+            total += tamano
+        if conservar is not None:
+            total += sum(archivo.stat().st_size for archivo in os.scandir(os.path.join(carpeta_cache, conservar))
+                         if archivo.is_file())
+
+        for uso, tamano, carpeta in sorted(entradas):
+            if total <= cls.MAX_BYTES_CACHE:
+                break
+            shutil.rmtree(carpeta, ignore_errors=True)
+            total -= tamano
+
+
+class HiloPiramideMapa(QThread):
+    """
+    Abre (de la caché) o construye la PiramideMapa de un plano fuera del
+    hilo de la interfaz. Si hay que construirla emite primero la vista
+    previa; después, la pirámide (o el error). Se cancela con
+    requestInterruption().
+    """
+
+    vista_previa_lista = pyqtSignal(str, QImage)    # ruta, imagen reducida
+    piramide_lista = pyqtSignal(str, object)        # ruta, PiramideMapa
+    error = pyqtSignal(str, str)                    # ruta, mensaje de error
+
+    def __init__(self, ruta_imagen, parent=None):
+        super().__init__(parent)
+        self.ruta_imagen = ruta_imagen
+
+    def run(self):
+        try:
+            piramide = PiramideMapa.abrir(
+                self.ruta_imagen,
+                al_vista_previa=lambda imagen: self.vista_previa_lista.emit(self.ruta_imagen, imagen),
+                cancelado=self.isInterruptionRequested,
+            )
+            self.piramide_lista.emit(self.ruta_imagen, piramide)
+        except ConstruccionCancelada:
+            pass
+        except Exception as e:
+            self.error.emit(self.ruta_imagen, str(e))
+
+
+class MapaItem(QGraphicsItem):
+    """
+    Fondo del mapa dibujado con las teselas de una PiramideMapa.
+
+    En cada paint() se elige el nivel cuya resolución es la más cercana por
+    encima a la de la pantalla y solo se cargan las teselas que cortan la
+    zona expuesta. Las teselas cargadas se guardan como QPixmap en una LRU
+    limitada a PRESUPUESTO_BYTES, así que la memoria no depende del tamaño
+    del plano. Ocupa el rectángulo (0, 0, ancho, alto) de la escena, como
+    el QGraphicsPixmapItem al que sustituye.
+
+    La pirámide puede llegar más tarde (HiloPiramideMapa): hasta entonces,
+    y para las teselas que falten, se dibuja la vista previa ampliada.
+    """
+    PRESUPUESTO_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, ancho, alto, piramide=None):
+        super().__init__()
+        self.ancho = ancho
+        self.alto = alto
+        self.piramide = piramide
+        self._vista_previa = None      # QPixmap reducido del plano completo
+        self._teselas = OrderedDict()  # (nivel, columna, fila) -> QPixmap
+        self._bytes = 0
+
+        # El mapa queda al fondo sin interceptar clics
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setFlag(QGraphicsItem.ItemIsSelectable, False)
+        self.setFlag(QGraphicsItem.ItemIsFocusable, False)
+        # Para recibir option.exposedRect
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+        self.setZValue(0)
+
+    def establecer_vista_previa(self, imagen):
+        """Muestra imagen (QImage del plano reducido) hasta que estén las teselas."""
+        self._vista_previa = QPixmap.fromImage(imagen)
+        self.update()
+
+    def establecer_piramide(self, piramide):
+        self.piramide = piramide
+        self.liberar_teselas()
+        self.update()
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.ancho, self.alto)
+
+    def nivel_para(self, escala):
+        """Nivel cuyos píxeles son como mucho tan grandes como los de la pantalla."""
+        if escala >= 1:
+            return 0
+        return min(int(math.log2(1 / escala)), self.piramide.niveles - 1)
+
+    def _pixmap(self, nivel, columna, fila):
+        clave = (nivel, columna, fila)
+        pixmap = self._teselas.get(clave)
+        if pixmap is not None:
+            self._teselas.move_to_end(clave)
+            return pixmap
+
+        imagen = self.piramide.leer_tesela(nivel, columna, fila)
+        if imagen is None:
+            return None
+        pixmap = QPixmap.fromImage(imagen)
+        self._teselas[clave] = pixmap
+        self._bytes += imagen.sizeInBytes()
+        while self._bytes > self.PRESUPUESTO_BYTES and len(self._teselas) > 1:
+            _, descartado = self._teselas.popitem(last=False)
+            self._bytes -= descartado.width() * descartado.height() * PiramideMapa.BYTES_PIXEL
+        return pixmap
+
+    def liberar_teselas(self):
+        """Vacía la caché de teselas (se vuelven a leer del disco al pintar)."""
+        self._teselas.clear()
+        self._bytes = 0
+
+    def _pintar_vista_previa(self, painter, destino):
+        """La parte destino (en la escena) del plano, sacada de la vista previa."""
+        if self._vista_previa is None:
+            return
+        escala_x = self._vista_previa.width() / self.ancho
+        escala_y = self._vista_previa.height() / self.alto
+        origen = QRectF(destino.x() * escala_x, destino.y() * escala_y,
+                        destino.width() * escala_x, destino.height() * escala_y)
+        painter.drawPixmap(destino, self._vista_previa, origen)
+
+    def paint(self, painter, option, widget=None):
+        expuesto = option.exposedRect.intersected(self.boundingRect())
+        if expuesto.isEmpty():
+            return
+        if self.piramide is None:
+            self._pintar_vista_previa(painter, expuesto)
+            return
+
+        nivel = self.nivel_para(escala_de(painter.worldTransform()))
+        factor = 2 ** nivel
+        lado = PiramideMapa.TAM_TESELA * factor  # lado de una tesela en la escena
+        columnas, filas = self.piramide.teselas_nivel(nivel)
+        columna_inicio = max(0, int(expuesto.left() // lado))
+        columna_fin = min(columnas, int(math.ceil(expuesto.right() / lado)))
+        fila_inicio = max(0, int(expuesto.top() // lado))
+        fila_fin = min(filas, int(math.ceil(expuesto.bottom() / lado)))
+
+        for fila in range(fila_inicio, fila_fin):
+            for columna in range(columna_inicio, columna_fin):
+                pixmap = self._pixmap(nivel, columna, fila)
+                if pixmap is None:
+                    rect = self.piramide.rect_tesela(nivel, columna, fila)
+                    self._pintar_vista_previa(painter, QRectF(columna * lado, fila * lado,
+                                                              rect.width() * factor, rect.height() * factor))
+                    continue
+                destino = QRectF(columna * lado, fila * lado, pixmap.width() * factor, pixmap.height() * factor)
+                painter.drawPixmap(destino, pixmap, QRectF(pixmap.rect()))
@@ -1,7 +1,10 @@
 from PyQt5.QtWidgets import QGraphicsObject, QMessageBox, QGraphicsItem
 from PyQt5.QtCore import QRectF, Qt, pyqtSignal, QPointF
-from PyQt5.QtGui import QBrush, QPainter, QPainterPath, QPen, QColor, QFont, QCursor, QPixmap, QImage
+from PyQt5.QtGui import (QBrush, QPainter, QPainterPath, QPen, QColor, QFont, QCursor, QPixmap, QImage,
+                         QStaticText, QTransform)
 from Model.Nodo import Nodo
+from View.zoom_view import DETALLE_LEJOS, DETALLE_COMPLETO, escala_de, nivel_detalle
+from collections import OrderedDict
 import os
 
 class NodoItem(QGraphicsObject):
@@ -11,6 +14,36 @@ class NodoItem(QGraphicsObject):
     _recorte_cache = {}
     _cache_stats = {'hits': 0, 'misses': 0}
 
+    # Sprites: la figura del nodo (círculo con horquilla o icono, borde y
+    # anillo de selección, ya girada) pre-renderizada y compartida por todos
+    # los nodos con el mismo aspecto. Clave: (tipo visual, color del borde,
+    # seleccionado, tamaño, ángulo en grados enteros). LRU acotada.
+    _sprite_cache = OrderedDict()
+    MAX_SPRITES = 256
+    # Resolución de los sprites respecto a la escena; con más zoom que esto
+    # se pinta en vivo para que no se vean pixelados
+    ESCALA_SPRITE = 2
+    # Fuente y lápiz de la etiqueta del ID (se crean con la primera pintura)
+    _fuente_etiqueta = None
+    _pen_etiqueta = None
+
+    # Lado en píxeles de pantalla del punto que representa al nodo con el zoom lejano
+    TAM_PUNTO = 4
+    # Color del punto de los nodos con icono (los demás usan su color de relleno)
+    COLORES_PUNTO = {
+        "cargador": QColor(46, 160, 67),
+        "cargar": QColor(0, 120, 215),
+        "descargar": QColor(230, 120, 0),
+        "cargador_io": QColor(140, 80, 200),
+    }
+
+    # Aumenta cada vez que un nodo cambia de posición, visibilidad o escena;
+    # GrupoNodosItem lo usa para saber si tiene que volver a agrupar
+    _version_geometria = 0
+    _CAMBIOS_GEOMETRIA = (QGraphicsItem.ItemPositionHasChanged,
+                          QGraphicsItem.ItemVisibleHasChanged,
+                          QGraphicsItem.ItemSceneHasChanged)
+
     moved = pyqtSignal(object)
     movimiento_iniciado = pyqtSignal(object, int, int)
     nodo_seleccionado = pyqtSignal(object)
@@ -63,6 +96,7 @@ class NodoItem(QGraphicsObject):
     def limpiar_cache_iconos(cls):
         cls._icon_cache.clear()
         cls._recorte_cache.clear()
+        cls._sprite_cache.clear()
         cls._cache_stats = {'hits': 0, 'misses': 0}
         print("✓ Cache de iconos limpiado completamente")
 
@@ -74,6 +108,7 @@ class NodoItem(QGraphicsObject):
         return {
             'total_iconos_cacheados': len(cls._icon_cache),
             'total_recortes_cacheados': len(cls._recorte_cache),
+            'total_sprites_cacheados': len(cls._sprite_cache),
             'cache_hits': cls._cache_stats['hits'],
             'cache_misses': cls._cache_stats['misses'],
             'tasa_hit': f"{tasa_hit:.1f}%"
@@ -234,27 +269,35 @@ class NodoItem(QGraphicsObject):
     # -------------------------------------------------------------------------
 
     def _determinar_visualizacion(self):
+        # La etiqueta se vuelve a componer con el texto actual al pintar
+        self._etiqueta = None
+
         if self.es_cargador != 0:
             self.mostrar_icono = True
             self.icono_actual = self._cargador_pixmap
+            self._tipo_visual = "cargador"
             return
 
         if self.objetivo == 1:
             self.mostrar_icono = True
             self.icono_actual = self._cargar_pixmap
+            self._tipo_visual = "cargar"
             return
 
         if self.objetivo == 2:
             self.mostrar_icono = True
             self.icono_actual = self._descargar_pixmap
+            self._tipo_visual = "descargar"
             return
 
         if self.objetivo == 3:
             self.mostrar_icono = True
             self.icono_actual = self._cargador_io_pixmap
+            self._tipo_visual = "cargador_io"
             return
 
         self.mostrar_icono = False
+        self._tipo_visual = "punto"
         self.color_default = QColor(0, 120, 215)
         self.texto = str(self.nodo.get('id', ''))
         self.con_horquilla = True
@@ -266,7 +309,65 @@ class NodoItem(QGraphicsObject):
                       self.size + extra_margin * 2)
 
     def paint(self, painter: QPainter, option, widget=None):
-        painter.save()
+        escala = escala_de(painter.worldTransform())
+        nivel = nivel_detalle(escala)
+        if nivel == DETALLE_LEJOS:
+            self._pintar_punto(painter, escala)
+            return
+
+        angle = int(self.nodo.get("A", 0))
+        if escala > self.ESCALA_SPRITE:
+            # Con mucho zoom el sprite se vería pixelado: se pinta en vivo
+            painter.save()
+            self._pintar_figura(painter, angle, self.isSelected())
+            painter.restore()
+        else:
+            sprite = self._obtener_sprite(angle)
+            painter.drawPixmap(self.boundingRect(), sprite, QRectF(sprite.rect()))
+
+        # Las etiquetas solo con todo el detalle
+        if nivel == DETALLE_COMPLETO and not self.mostrar_icono:
+            self._pintar_etiqueta(painter, angle)
+
+    def _pintar_punto(self, painter: QPainter, escala):
+        """El nodo como un cuadrado de TAM_PUNTO píxeles de pantalla, sin icono ni etiqueta."""
+        if self.isSelected():
+            color = self.color_selected
+        elif self.mostrar_icono:
+            color = self.COLORES_PUNTO[self._tipo_visual]
+        else:
+            color = self.color_default
+        lado = self.TAM_PUNTO / max(escala, 1e-6)
+        centro = self.size / 2
+        painter.fillRect(QRectF(centro - lado / 2, centro - lado / 2, lado, lado), color)
+
+    def _obtener_sprite(self, angle):
+        """QPixmap de la figura del nodo desde la caché compartida (se renderiza si no está)."""
+        seleccionado = self.isSelected()
+        clave = (self._tipo_visual, QColor(self.border_color).rgba(), seleccionado, self.size, angle % 360)
+        cache = NodoItem._sprite_cache
+        sprite = cache.get(clave)
+        if sprite is not None:
+            cache.move_to_end(clave)
+            return sprite
+
+        rect = self.boundingRect()
+        escala = self.ESCALA_SPRITE
+        sprite = QPixmap(int(rect.width() * escala), int(rect.height() * escala))
+        sprite.fill(Qt.transparent)
+        painter = QPainter(sprite)
+        painter.scale(escala, escala)
+        painter.translate(-rect.x(), -rect.y())
+        self._pintar_figura(painter, angle, seleccionado)
+        painter.end()
+
+        cache[clave] = sprite
+        if len(cache) > self.MAX_SPRITES:
+            cache.popitem(last=False)
+        return sprite
+
+    def _pintar_figura(self, painter: QPainter, angle, seleccionado):
+        """Icono o círculo con horquilla, girados según A, y el anillo de selección (sin el ID)."""
         painter.setRenderHints(
             QPainter.Antialiasing |
             QPainter.TextAntialiasing |
@@ -276,7 +377,6 @@ class NodoItem(QGraphicsObject):
         margin = 10
 
         painter.translate(self.size / 2, self.size / 2)
-        angle = int(self.nodo.get("A", 0))
         painter.rotate(360 - angle)
         painter.translate(-self.size / 2, -self.size / 2)
 
@@ -315,16 +415,7 @@ class NodoItem(QGraphicsObject):
                 painter.drawLine(QPointF(x_start, y_top), QPointF(x_end, y_top))
                 painter.drawLine(QPointF(x_start, y_bottom), QPointF(x_end, y_bottom))
 
-            font = QFont()
-            font.setPointSize(9)
-            font.setBold(True)
-            painter.setFont(font)
-
-            text_rect = self.boundingRect().adjusted(margin, margin, -margin, -margin)
-            painter.setPen(QPen(Qt.white, 1))
-            painter.drawText(text_rect, Qt.AlignCenter, self.texto)
-
-        if self.isSelected():
+        if seleccionado:
             painter.setBrush(Qt.NoBrush)
             painter.setPen(QPen(self.color_selected, 3))
             if self.mostrar_icono:
@@ -336,7 +427,33 @@ class NodoItem(QGraphicsObject):
                 painter.drawEllipse(self.boundingRect().adjusted(margin + 2, margin + 2,
                                                                  -margin - 2, -margin - 2))
 
-        painter.restore()
+    def _pintar_etiqueta(self, painter: QPainter, angle):
+        """ID del nodo, centrado y girado con la figura, con un QStaticText compuesto una sola vez."""
+        cls = self.__class__
+        if cls._fuente_etiqueta is None:
+            cls._fuente_etiqueta = QFont()
+            cls._fuente_etiqueta.setPointSize(9)
+            cls._fuente_etiqueta.setBold(True)
+            cls._pen_etiqueta = QPen(Qt.white, 1)
+
+        if self._etiqueta is None:
+            self._etiqueta = QStaticText(self.texto)
+            self._etiqueta.setTextFormat(Qt.PlainText)
+            self._etiqueta.prepare(QTransform(), cls._fuente_etiqueta)
+
+        tam = self._etiqueta.size()
+        posicion = QPointF((self.size - tam.width()) / 2, (self.size - tam.height()) / 2)
+        painter.setFont(cls._fuente_etiqueta)
+        painter.setPen(cls._pen_etiqueta)
+        if angle % 360:
+            painter.save()
+            painter.translate(self.size / 2, self.size / 2)
+            painter.rotate(360 - angle)
+            painter.translate(-self.size / 2, -self.size / 2)
+            painter.drawStaticText(posicion, self._etiqueta)
+            painter.restore()
+        else:
+            painter.drawStaticText(posicion, self._etiqueta)
 
         
     def set_selected_color(self):
@@ -398,6 +515,8 @@ class NodoItem(QGraphicsObject):
         super().mousePressEvent(event)
 
     def itemChange(self, change, value):
+        if change in NodoItem._CAMBIOS_GEOMETRIA:
+            NodoItem._version_geometria += 1
         try:
             if change == QGraphicsObject.ItemSelectedChange:
                 # Cuando el nodo es seleccionado
@@ -429,7 +548,9 @@ class NodoItem(QGraphicsObject):
                     print(f"DEBUG NodoItem: nodo tipo={type(self.nodo)}")
                 
                 # Actualizar modelo temporalmente durante el arrastre
-                if hasattr(self.nodo, "set_posicion"):
+                if self._mover_en_proyecto(cx, cy):
+                    pass
+                elif hasattr(self.nodo, "set_posicion"):
                     self.nodo.set_posicion(cx, cy)
                 elif hasattr(self.nodo, "update"):
                     # Asegurar que el nodo tenga ID antes de actualizar
@@ -464,7 +585,9 @@ class NodoItem(QGraphicsObject):
                 print(f"DEBUG NodoItem: ItemPositionHasChanged - posición final ({cx}, {cy})")
                 
                 # Actualizar modelo
-                if hasattr(self.nodo, "set_posicion"):
+                if self._mover_en_proyecto(cx, cy):
+                    pass
+                elif hasattr(self.nodo, "set_posicion"):
                     self.nodo.set_posicion(cx, cy)
                 elif hasattr(self.nodo, "update"):
                     if isinstance(self.nodo, dict):
@@ -480,6 +603,20 @@ class NodoItem(QGraphicsObject):
         except Exception as err:
             print("Error en itemChange:", err)
             return super().itemChange(change, value)
+
+    def _mover_en_proyecto(self, cx, cy):
+        """Mueve el nodo a través del proyecto para mantener su índice espacial al día."""
+        proyecto = getattr(self.editor, "proyecto", None) if self.editor else None
+        if proyecto is None or not hasattr(proyecto, "mover_nodo"):
+            return False
+        proyecto.mover_nodo(self.nodo, cx, cy)
+        return True
+
+    def _nodos_bajo_cursor(self, pos):
+        """NodoItems bajo una posición de escena (por índice espacial si hay editor)."""
+        if self.editor and hasattr(self.editor, "_nodo_items_en_posicion"):
+            return self.editor._nodo_items_en_posicion(pos.x(), pos.y())
+        return [it for it in self.scene().items(pos) if isinstance(it, NodoItem)]
     
     def mouseReleaseEvent(self, event):
         print(f"MouseRelease en nodo {self.nodo.get('id')}")
@@ -509,8 +646,7 @@ class NodoItem(QGraphicsObject):
                 self.editor._arrastrando_nodo = False
                 # Primero actualizar estado hover
                 pos = event.scenePos()
-                items = self.scene().items(pos)
-                hay_nodo = any(isinstance(it, NodoItem) for it in items)
+                hay_nodo = bool(self._nodos_bajo_cursor(pos))
                 self.editor._cursor_sobre_nodo = hay_nodo
                 # Luego actualizar cursor
                 self.editor._actualizar_cursor()
@@ -533,10 +669,9 @@ class NodoItem(QGraphicsObject):
             if self.editor:
                 # Verificar si el cursor realmente salió de TODOS los nodos
                 pos = event.scenePos()
-                items = self.scene().items(pos)
                 
                 # Contar nodos bajo el cursor
-                nodos_bajo_cursor = [it for it in items if isinstance(it, NodoItem)]
+                nodos_bajo_cursor = self._nodos_bajo_cursor(pos)
                 
                 if len(nodos_bajo_cursor) == 0:
                     # Realmente salió de todos los nodos
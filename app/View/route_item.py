@@ -0,0 +1,114 @@
+from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtGui import QPainterPath, QPainterPathStroker, QPen
+from View.zoom_view import DETALLE_LEJOS, escala_de, nivel_detalle
+
+
+class RutaItem(QGraphicsItem):
+    """
+    Una ruta completa como un único elemento de la escena.
+
+    Los segmentos se agrupan por estilo de lápiz en dos QPainterPath
+    (continuo y discontinuo: un segmento es discontinuo si su nodo destino
+    tiene Tipo_curva != 0) que se dibujan con dos drawPath. Para cada
+    posición de la ruta se guardan los elementos de los caminos que le
+    corresponden, así que al arrastrar un nodo solo se mueven esos vértices
+    (setElementPositionAt) sin reconstruir la ruta.
+    """
+    CONTINUO = 0
+    DISCONTINUO = 1
+
+    # Holgura del rectángulo para el grosor de los lápices cosméticos
+    MARGEN = 4
+
+    def __init__(self, nodos, pen, discontinuas=True):
+        super().__init__()
+        self._pens = (QPen(pen), QPen(pen))
+        self._pens[self.CONTINUO].setStyle(Qt.SolidLine)
+        self._pens[self.DISCONTINUO].setStyle(Qt.DashLine)
+        self._discontinuas = discontinuas
+
+        self._caminos = (QPainterPath(), QPainterPath())
+        self._elementos = []    # posición en la ruta -> [(camino, índice de elemento)]
+        self._posiciones = {}   # nodo_id -> posiciones en la ruta (una ruta puede repetir nodos)
+        self._rect = QRectF()
+        self._forma = None      # shape() calculada bajo demanda
+
+        # Las rutas no interceptan clics: los recibe el nodo o el fondo
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setFlag(QGraphicsItem.ItemIsSelectable, False)
+        self.setFlag(QGraphicsItem.ItemIsFocusable, False)
+
+        self.establecer_nodos(nodos)
+
+    def establecer_nodos(self, nodos):
+        """Reconstruye los caminos con la lista de nodos (en orden) de la ruta."""
+        self.prepareGeometryChange()
+        caminos = (QPainterPath(), QPainterPath())
+        elementos = [[] for _ in nodos]
+        posiciones = {}
+
+        anterior = None
+        for i, nodo in enumerate(nodos):
+            posiciones.setdefault(nodo.get('id'), []).append(i)
+            if i == 0:
+                continue
+            estilo = self.DISCONTINUO if self._discontinuas and nodo.get('Tipo_curva', 0) != 0 else self.CONTINUO
+            camino = caminos[estilo]
+            if estilo != anterior:
+                # Empieza un tramo de este estilo en el nodo anterior
+                origen = nodos[i - 1]
+                elementos[i - 1].append((estilo, camino.elementCount()))
+                camino.moveTo(origen.get('X', 0), origen.get('Y', 0))
+            elementos[i].append((estilo, camino.elementCount()))
+            camino.lineTo(nodo.get('X', 0), nodo.get('Y', 0))
+            anterior = estilo
+
+        self._caminos = caminos
+        self._elementos = elementos
+        self._posiciones = posiciones
+        self._actualizar_rect()
+
+    def contiene_nodo(self, nodo_id):
+        return nodo_id in self._posiciones
+
+    def mover_nodo(self, nodo_id, x, y):
+        """Mueve los vértices del nodo a (x, y). Devuelve False si el nodo no está en la ruta."""
+        posiciones = self._posiciones.get(nodo_id)
+        if not posiciones:
+            return False
+        self.prepareGeometryChange()
+        for posicion in posiciones:
+            for estilo, indice in self._elementos[posicion]:
+                self._caminos[estilo].setElementPositionAt(indice, x, y)
+        self._actualizar_rect()
+        return True
+
+    def _actualizar_rect(self):
+        rect = self._caminos[self.CONTINUO].controlPointRect().united(
+            self._caminos[self.DISCONTINUO].controlPointRect())
+        self._rect = rect.adjusted(-self.MARGEN, -self.MARGEN, self.MARGEN, self.MARGEN)
+        self._forma = None
+
+    def boundingRect(self):
+        return self._rect
+
+    def shape(self):
+        # Solo el trazo, no el rectángulo: itemAt/collidingItems no deben
+        # encontrar la ruta en el hueco entre sus segmentos
+        if self._forma is None:
+            trazador = QPainterPathStroker()
+            trazador.setWidth(self.MARGEN)
+            self._forma = trazador.createStroke(self._caminos[self.CONTINUO])
+            self._forma.addPath(trazador.createStroke(self._caminos[self.DISCONTINUO]))
+        return self._forma
+
+    def paint(self, painter, option, widget=None):
+        # La vista no guarda el estado del pintor entre elementos (DontSavePainterState)
+        painter.setBrush(Qt.NoBrush)
+        # Con el zoom lejano las discontinuas no se distinguen: todo continuo
+        lejos = nivel_detalle(escala_de(painter.worldTransform())) == DETALLE_LEJOS
+        for camino, pen in zip(self._caminos, self._pens):
+            if not camino.isEmpty():
+                painter.setPen(self._pens[self.CONTINUO] if lejos else pen)
+                painter.drawPath(camino)
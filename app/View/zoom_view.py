@@ -1,8 +1,37 @@
 from PyQt5.QtWidgets import QGraphicsView
-from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtCore import Qt, QPoint, pyqtSignal
 from PyQt5.QtGui import QPainter, QWheelEvent, QCursor
+import math
+
+# Niveles de detalle según la escala de la vista (píxeles de pantalla por
+# píxel de escena). Los elementos lo calculan en paint() con la escala del
+# pintor, así que una vista con otra escala dibuja con su propio nivel.
+DETALLE_LEJOS = 0     # Nodos como puntos (o agrupados), rutas sin discontinuas
+DETALLE_MEDIO = 1     # Iconos y figuras sin etiquetas
+DETALLE_COMPLETO = 2  # Todo: etiquetas, iconos y discontinuas
+
+ESCALA_DETALLE_MEDIO = 0.3
+ESCALA_DETALLE_COMPLETO = 0.6
+
+
+def nivel_detalle(escala):
+    """Nivel de detalle para una escala de la vista."""
+    if escala < ESCALA_DETALLE_MEDIO:
+        return DETALLE_LEJOS
+    if escala < ESCALA_DETALLE_COMPLETO:
+        return DETALLE_MEDIO
+    return DETALLE_COMPLETO
+
+
+def escala_de(transform):
+    """Escala de una QTransform (también con rotación)."""
+    return math.hypot(transform.m11(), transform.m12())
+
 
 class ZoomGraphicsView(QGraphicsView):
+    # Se emite con el nuevo nivel cuando el zoom cruza un umbral de detalle
+    nivel_detalle_cambiado = pyqtSignal(int)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setDragMode(QGraphicsView.ScrollHandDrag)
@@ -23,6 +52,7 @@ class ZoomGraphicsView(QGraphicsView):
         self.zoom_factor = 1.25
         self.min_zoom = 0.1
         self.max_zoom = 10.0
+        self.nivel_detalle = DETALLE_COMPLETO
 
         # --- NUEVO: Variables para pan con botón central ---
         self._pan = False
@@ -43,9 +73,19 @@ class ZoomGraphicsView(QGraphicsView):
         
         if self.min_zoom <= new_scale <= self.max_zoom:
             self.scale(factor, factor)
+            self._actualizar_nivel_detalle()
         
         event.accept()
 
+    def escala_actual(self):
+        return escala_de(self.transform())
+
+    def _actualizar_nivel_detalle(self):
+        nivel = nivel_detalle(self.escala_actual())
+        if nivel != self.nivel_detalle:
+            self.nivel_detalle = nivel
+            self.nivel_detalle_cambiado.emit(nivel)
+
     # --- NUEVOS MÉTODOS PARA NAVEGACIÓN CON BOTÓN CENTRAL ---
 
     def mousePressEvent(self, event):
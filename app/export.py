@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Exportador de proyectos sin interfaz gráfica (integración continua, lotes).
+
+Reutiliza la lógica de tablas de ExportadorDB y ExportadorCSV sin abrir
+diálogos, así que funciona en una máquina sin pantalla:
+
+    python export.py proyecto.json --out carpeta --format sqlite,csv --scale 0.05
+    python -m app.export proyectos/ --out salida --jobs 8
+
+Si la entrada es una carpeta se exportan todos los proyectos que contiene
+(.json y .sqlite), cada uno en su subcarpeta de --out y en procesos en
+paralelo. Código de salida: 0 si todo va bien, 1 si algún proyecto no pasa
+la validación y 2 si alguno no se pudo cargar o exportar.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Los módulos de la aplicación se importan como en main.py (desde app/)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Model.Proyecto import Proyecto
+from Model.ContenedorProyecto import ContenedorProyecto
+from Model.ExportadorDB import ExportadorDB
+from Model.ExportadorCSV import ExportadorCSV
+from Model.ValidadorEsquema import ValidadorEsquema
+
+FORMATOS = ("sqlite", "csv")
+ESCALA = 0.05  # Misma conversión píxeles -> metros que EditorController.ESCALA
+EXTENSIONES_PROYECTO = (".json", ContenedorProyecto.EXTENSION)
+
+SALIDA_OK = 0
+SALIDA_VALIDACION = 1
+SALIDA_ERROR = 2
+
+
+def validar_proyecto(proyecto):
+    """
+    Lista de problemas que impiden exportar el proyecto (vacía si es
+    válido): valores que no tienen el tipo del esquema (también los que se
+    sustituyeron por su valor por defecto al cargar) y rutas incorrectas.
+    """
+    problemas, _ = ValidadorEsquema.revisar_proyecto(proyecto)
+    errores = [ValidadorEsquema.describir(problema) for problema in proyecto.valores_invalidos + problemas]
+    for indice, ruta in enumerate(proyecto.rutas):
+        if len(ruta) < 2:
+            errores.append(f"Ruta {indice} ({ruta.nombre}): menos de dos nodos")
+        inexistentes = sorted({nodo_id for nodo_id in ruta.ids() if not proyecto.existe_nodo(nodo_id)})
+        if inexistentes:
+            errores.append(f"Ruta {indice} ({ruta.nombre}): nodos inexistentes {inexistentes}")
+    return errores
+
+
+def exportar_proyecto(ruta_proyecto, carpeta_salida, formatos=FORMATOS, escala=ESCALA, validar=True,
+                      incremental=False, compresion=None):
+    """
+    Carga, valida y exporta un proyecto. Se ejecuta en un proceso del pool,
+    por eso recibe y devuelve solo datos simples: (ruta, código, mensajes).
+    """
+    mensajes = []
+    try:
+        proyecto = Proyecto.cargar(ruta_proyecto)
+        if validar:
+            errores = validar_proyecto(proyecto)
+            if errores:
+                return ruta_proyecto, SALIDA_VALIDACION, errores
+
+        os.makedirs(carpeta_salida, exist_ok=True)
+        datos = proyecto.instantanea()
+        if "sqlite" in formatos:
+            filas = ExportadorDB.exportar_a_carpeta(datos, carpeta_salida, escala, incremental=incremental)
+            mensajes.extend(f"{nombre}: {n} filas" for nombre, n in filas.items())
+        if "csv" in formatos:
+            archivos = ExportadorCSV.exportar_a_carpeta(datos, carpeta_salida, escala, compresion=compresion)
+            mensajes.extend(f"{os.path.basename(ruta)}: {n} filas en {segundos:.2f} s"
+                            for ruta, (n, segundos) in archivos.items())
+        return ruta_proyecto, SALIDA_OK, mensajes
+    except Exception as e:
+        return ruta_proyecto, SALIDA_ERROR, mensajes + [f"{type(e).__name__}: {e}"]
+
+
+def proyectos_en(carpeta):
+    """Archivos de proyecto de una carpeta (sin recorrer subcarpetas), ordenados."""
+    return sorted(
+        os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta)
+        if nombre.lower().endswith(EXTENSIONES_PROYECTO) and os.path.isfile(os.path.join(carpeta, nombre))
+    )
+
+
+def _formatos(texto):
+    formatos = tuple(f.strip().lower() for f in texto.split(",") if f.strip())
+    desconocidos = [f for f in formatos if f not in FORMATOS]
+    if not formatos or desconocidos:
+        raise argparse.ArgumentTypeError(f"formatos válidos: {', '.join(FORMATOS)}")
+    return formatos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta proyectos del editor de tráfico a SQLite/CSV sin interfaz gráfica.")
+    parser.add_argument("entrada", help="archivo de proyecto (.json/.sqlite) o carpeta con proyectos")
+    parser.add_argument("--out", required=True, help="carpeta de salida")
+    parser.add_argument("--format", type=_formatos, default=FORMATOS, help="formatos separados por comas (sqlite,csv)")
+    parser.add_argument("--scale", type=float, default=ESCALA, help=f"metros por píxel (por defecto {ESCALA})")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="procesos en paralelo para una carpeta")
+    parser.add_argument("--incremental", action="store_true",
+                        help="actualizar las bases de datos SQLite existentes con solo los cambios")
+    parser.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                        help="comprimir los CSV (zstd requiere el paquete zstandard)")
+    parser.add_argument("--no-validate", action="store_true", help="exportar aunque el proyecto no pase la validación")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.entrada):
+        proyectos = proyectos_en(args.entrada)
+        if not proyectos:
+            print(f"✗ No hay proyectos en {args.entrada}", file=sys.stderr)
+            return SALIDA_ERROR
+        # Un proyecto por subcarpeta de salida, con el nombre del archivo
+        tareas = [(ruta, os.path.join(args.out, os.path.splitext(os.path.basename(ruta))[0])) for ruta in proyectos]
+    else:
+        tareas = [(args.entrada, args.out)]
+
+    parametros = (args.format, args.scale, not args.no_validate, args.incremental, args.compress)
+    if len(tareas) == 1 or args.jobs <= 1:
+        resultados = [exportar_proyecto(ruta, salida, *parametros) for ruta, salida in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(tareas))) as pool:
+            futuros = [pool.submit(exportar_proyecto, ruta, salida, *parametros) for ruta, salida in tareas]
+            resultados = [futuro.result() for futuro in futuros]
+
+    codigo = SALIDA_OK
+    for ruta, resultado, mensajes in resultados:
+        if resultado == SALIDA_OK:
+            print(f"✓ {ruta}")
+        else:
+            estado = "no pasa la validación" if resultado == SALIDA_VALIDACION else "error"
+            print(f"✗ {ruta}: {estado}", file=sys.stderr)
+        for mensaje in mensajes:
+            print(f"    {mensaje}", file=sys.stderr if resultado != SALIDA_OK else sys.stdout)
+        codigo = max(codigo, resultado)
+
+    print(f"{sum(1 for _, r, _ in resultados if r == SALIDA_OK)}/{len(resultados)} proyectos exportados")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+La orientación A de los nodos debe seguir a su posición en las
+transformaciones de ColumnasNodos. NodoItem pinta con rotate(360 - A) y
+la escena tiene Y hacia abajo, así que A apunta en la dirección
+(cos A, -sin A). Un nodo en (x, y) que mira desde el origen hacia sí mismo
+tiene que seguir mirando hacia fuera tras rotar o reflejar respecto al
+origen.
+
+Se ejecuta desde app/: python -m pytest -q tests
+"""
+import math
+import unittest
+
+from Model.ColumnasNodos import ColumnasNodos
+from Model.Nodo import Nodo
+
+
+def _orientacion_hacia(x, y):
+    """A con la que un nodo en (x, y) mira en dirección opuesta al origen."""
+    return math.degrees(math.atan2(-y, x)) % 360
+
+
+def _diferencia_angular(a, b):
+    return abs((a - b + 180) % 360 - 180)
+
+
+class TestOrientacionTransformaciones(unittest.TestCase):
+    POSICIONES = ((1, 0), (0, 1), (-3, 2), (2, -5))
+
+    def _nodos(self):
+        return [Nodo({"id": i + 1, "X": x, "Y": y, "A": round(_orientacion_hacia(x, y))})
+                for i, (x, y) in enumerate(self.POSICIONES)]
+
+    def _comprobar_hacia_fuera(self, nodos):
+        for nodo in nodos:
+            esperada = _orientacion_hacia(nodo.get("X"), nodo.get("Y"))
+            self.assertLess(_diferencia_angular(nodo.get("A"), esperada), 1.0,
+                            f"nodo {nodo.get('id')} en ({nodo.get('X'):.2f}, {nodo.get('Y'):.2f}): "
+                            f"A={nodo.get('A')}, esperada {esperada:.1f}")
+
+    def test_rotar_90(self):
+        nodos = self._nodos()
+        columnas = ColumnasNodos(nodos)
+        columnas.rotar(90, centro=(0, 0))
+        columnas.aplicar(('X', 'Y', 'A'))
+        # (1, 0) pasa a (0, 1): en pantalla, de mirar a la derecha a mirar abajo
+        self.assertAlmostEqual(nodos[0].get("X"), 0.0)
+        self.assertAlmostEqual(nodos[0].get("Y"), 1.0)
+        self.assertAlmostEqual(nodos[0].get("A"), 270.0)
+        self._comprobar_hacia_fuera(nodos)
+
+    def test_rotar_grados_con_decimales(self):
+        nodos = self._nodos()
+        columnas = ColumnasNodos(nodos)
+        columnas.rotar(-37.5, centro=(0, 0))
+        columnas.aplicar(('X', 'Y', 'A'))
+        self._comprobar_hacia_fuera(nodos)
+        self.assertTrue(all(isinstance(nodo.get("A"), float) for nodo in nodos))
+
+    def test_reflejar(self):
+        for eje in ('x', 'y'):
+            with self.subTest(eje=eje):
+                nodos = self._nodos()
+                columnas = ColumnasNodos(nodos)
+                columnas.reflejar(eje, centro=(0, 0))
+                columnas.aplicar(('X', 'Y', 'A'))
+                self._comprobar_hacia_fuera(nodos)
+
+    def test_seleccion(self):
+        nodos = self._nodos()
+        columnas = ColumnasNodos(nodos)
+        columnas.rotar(90, centro=(0, 0), indices=columnas.seleccion([1]))
+        columnas.aplicar(('X', 'Y', 'A'))
+        self._comprobar_hacia_fuera(nodos[:1])
+        # Los no seleccionados no cambian
+        self.assertEqual((nodos[1].get("X"), nodos[1].get("Y"), nodos[1].get("A")), (0, 1, 270))
+
+
+if __name__ == "__main__":
+    unittest.main()